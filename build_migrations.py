@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Regenerate only the migration .sql files whose inputs changed (CSV, orders JSON, template
+definitions, generator source). Targets: migration_tools/build_targets.json; state:
+.cache/build_state.json (see migration_tools/build.py).
+
+  python3 build_migrations.py                 # rebuild stale targets, in parallel
+  python3 build_migrations.py -n              # list what would rebuild and why
+  python3 build_migrations.py p004p-march     # one target (+ the targets it depends on)
+  python3 build_migrations.py --touch         # adopt existing outputs as up to date
+  python3 build_migrations.py --force         # rebuild everything, incl. hand-edited outputs
+"""
+import argparse
+import os
+import sys
+import time
+
+from migration_tools.build import (
+    DEFAULT_STATE_PATH,
+    DEFAULT_TARGETS_PATH,
+    BuildError,
+    BuildState,
+    build,
+    load_targets,
+    select_targets,
+)
+
+
+def print_results(results, verbose=False):
+    for r in results:
+        line = f"{r.status:<12} {r.target.name}"
+        if r.reason:
+            line += f" ({r.reason})"
+        if r.status in ('built', 'failed') and r.seconds:
+            line += f" {r.seconds:.2f} s"
+        print(line)
+        if r.log and (verbose or r.status == 'failed'):
+            tail = r.log.rstrip().splitlines()
+            print('\n'.join(f"    {l}" for l in (tail if verbose else tail[-15:])))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Rebuild stale generated migrations')
+    parser.add_argument('targets', nargs='*', help='Target names (default: all)')
+    parser.add_argument('--targets-file', default=str(DEFAULT_TARGETS_PATH), help='Build targets JSON')
+    parser.add_argument('--state', default=str(DEFAULT_STATE_PATH), help='Build state JSON (safe to delete)')
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1, help='Generators run at once')
+    parser.add_argument('-n', '--dry-run', action='store_true', help='Only report what would rebuild')
+    parser.add_argument('--force', action='store_true', help='Rebuild even up-to-date and hand-edited outputs')
+    parser.add_argument('--touch', action='store_true',
+                        help='Record current inputs/outputs as built without running generators')
+    parser.add_argument('--verbose', action='store_true', help='Print each generator log')
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    try:
+        targets = select_targets(load_targets(args.targets_file), args.targets)
+        results = build(targets, BuildState(args.state), jobs=args.jobs, dry_run=args.dry_run,
+                        force=args.force, touch=args.touch)
+    except BuildError as e:
+        print(f"ERROR: {e}")
+        sys.exit(1)
+    print_results(results, args.verbose)
+
+    counts = {}
+    for r in results:
+        counts[r.status] = counts.get(r.status, 0) + 1
+    print(f"\n{', '.join(f'{n} {s}' for s, n in counts.items())} in {time.perf_counter() - t0:.2f} s")
+    if any(r.status in ('failed', 'skipped', 'modified') for r in results):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
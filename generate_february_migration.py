@@ -2,14 +2,15 @@
 Backward-compatible entry point for February Plant 2 pumping migration.
 Delegates to generate_plant2_pumping_migration.py with February defaults.
 
-Run from repo root: python3 generate_february_migration.py
+Run from repo root: python3 generate_february_migration.py [--stream]
+Extra flags are forwarded to generate_plant2_pumping_migration.main.
 Requires: archive/data/february_orders.json (from scripts/fetch-february-orders.ts)
 """
 import sys
 from pathlib import Path
 
 _SCRIPT_DIR = Path(__file__).resolve().parent
-_REPO_ROOT = _SCRIPT_DIR.parent
+_REPO_ROOT = _SCRIPT_DIR
 _DATA = _REPO_ROOT / 'archive' / 'data'
 
 if str(_SCRIPT_DIR) not in sys.path:
@@ -30,6 +31,7 @@ if __name__ == '__main__':
         str(_REPO_ROOT / 'supabase/migrations/20260203_february_pumping_remisiones_p2.sql'),
         '--title',
         'FEBRUARY 2026',
+        *argv[1:],
     ]
     try:
         main()
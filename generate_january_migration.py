@@ -1,157 +1,79 @@
-import csv
-from datetime import datetime
-from collections import defaultdict
+import argparse
 import json
 from pathlib import Path
+import sys
+
+from migration_tools.cache import add_cache_args, cache_from_args, cached_records, cached_value
+from migration_tools.clients import default_resolver
+from migration_tools.columnar import add_group_backend_args, group_columns
+from migration_tools.ingest import PLANTS, read_remisiones
+from migration_tools.orders import OrderIndex
+from migration_tools.profiling import add_profile_args, finish_profile, profiler_from_args
+from migration_tools.records import PumpGroup, Remision, order_refs
+from migration_tools.sql import add_order_totals_arg, iter_order_totals_sql
+from migration_tools.validate import ValidationError, add_validate_args, check_migration, snapshot_for_validation
 
 _REPO_ROOT = Path(__file__).resolve().parent
 _DATA = _REPO_ROOT / 'archive' / 'data'
 
-# Fixed IDs from database queries
-CLIENT_IDS = {
-    'SEDENA': '241d39e9-ec9b-41b9-a93b-7c20e3638f1c',  # FIDEICOMISO DE ADMINISTRACION Y PAGO SEDENA 80778
-    'JESUS OCHOA': '2690972d-b975-4a69-a35d-5c4461a7554c',
-    'IMPULSORA TLAXTALECA': '573922b3-e5d0-4b43-8567-38b075e89de7',  # IMPULSORA TLAXCALTECA DE INDUSTRIAS
-    'IMPULSORA TLAXCALTECA': '573922b3-e5d0-4b43-8567-38b075e89de7',  # Alternative spelling
-}
+# Fixed IDs from database queries (clients: migration_tools/client_aliases.json)
+CLIENT_IDS = default_resolver('january').client_ids()
 
-PLANT_IDS = {
-    'P002': '836cbbcf-67b2-4534-97cc-b83e71722ff7',  # Tijuana Planta 2
-    'P003': 'baf175a7-fcf7-4e71-b18f-e952d8802129',  # Tijuana Planta 3
-}
+PLANT_IDS = {code: PLANTS[code].id for code in ('P002', 'P003')}
 
-def normalize_unit(unit_str):
-    """Normalize unit names: BP2 -> BP02, BP1 -> BP01"""
-    if not unit_str:
-        return None
-    unit = unit_str.strip().upper()
-    if unit == 'BP2':
-        return 'BP02'
-    elif unit == 'BP1':
-        return 'BP01'
-    return unit
+# Bump when this script's parsing changes (invalidates the parse cache); edits to the shared
+# parsing modules already change every key (migration_tools/cache.py PARSER_SOURCES)
+PARSER_VERSION = 5
 
-def parse_csv(file_path):
-    """Parse CSV file with proper encoding and BOM handling"""
-    remisiones_data = []
-    with open(file_path, mode='r', encoding='utf-8-sig') as csvfile:
-        reader = csv.DictReader(csvfile)
-        for row in reader:
-            # Skip empty rows
-            if not row.get('REMISION', '').strip():
-                continue
-            remisiones_data.append(row)
-    return remisiones_data
+# CSV -> Remision rules (year_map {25: 2026}: the export wrote January 2026 as M/D/25): migration_tools/ingest.py
+INGEST_PROFILE = 'january-2026'
 
-def parse_remision(row):
-    """Parse a single remision row and return structured data"""
-    try:
-        remision_num = row['REMISION'].strip()
-        fecha_str = row['FECHA'].strip()
-        cliente = row['CLIENTE'].strip()
-        m3 = float(row['M3'].strip())
-        pu_str = row[' P.U '].strip().replace('$', '').replace(',', '').strip()
-        unidad_raw = row[' UNIDAD '].strip()
-        operador_raw = row[' OPERADOR '].strip()
-        planta_raw = row[' PLANTA  '].strip()
-        
-        # Parse date (MM/DD/YY format) - Note: dates show /25 but this is January 2026
-        # Need to handle year correctly
-        fecha_parts = fecha_str.split('/')
-        month = int(fecha_parts[0])
-        day = int(fecha_parts[1])
-        year_part = int(fecha_parts[2])
-        
-        # If year is 25, it's actually 2025 but context says January so it's 2026
-        # If year is 26, it's 2026
-        year = 2026 if year_part == 26 else 2026  # January 2026
-        
-        fecha = datetime(year, month, day).date()
-        
-        # Parse price
-        unit_price = float(pu_str)
-        
-        # Normalize unit
-        unidad = normalize_unit(unidad_raw)
-        
-        # Handle operator (keep multiple as-is, NULL if empty)
-        operador = operador_raw if operador_raw else None
-        
-        # Normalize plant code
-        planta = planta_raw.strip()
-        
-        return {
-            'remision_number': remision_num,
-            'fecha': fecha,
-            'cliente': cliente,
-            'volumen_fabricado': m3,
-            'unit_price': unit_price,
-            'unidad': unidad,
-            'operador': operador,
-            'planta': planta
-        }
-    except Exception as e:
-        print(f"Error parsing remision {row.get('REMISION', 'unknown')}: {e}")
-        return None
+def parse_remisiones(file_path, errors=None):
+    """Every parsed remision of the CSV, dropping rows that fail to parse"""
+    return read_remisiones(file_path, INGEST_PROFILE, errors)
 
-def group_remisiones(remisiones):
-    """Group remisiones by (date, client, plant)"""
-    groups = defaultdict(lambda: {
-        'remisiones': [],
-        'total_volume': 0.0,
-        'unit_price': 0.0,
-        'client_name': None,
-        'client_id': None,
-        'plant_code': None,
-        'plant_id': None,
-        'date': None
-    })
+def group_remisiones(remisiones, backend='dict'):
+    """Group remisiones by (date, client, plant) into PumpGroups (backend: 'dict' or 'columnar')"""
+    resolve_client = default_resolver('january').resolve
+    if backend == 'columnar':
+        groups, skipped = group_columns(remisiones, resolve_client, PLANT_IDS)
+        for remision, reason in skipped:
+            if reason == 'client':
+                print(f"WARNING: Unknown client '{remision.cliente}'. Skipping remision {remision.remision_number}")
+            else:
+                print(f"WARNING: Unknown plant code '{remision.planta}'. Skipping remision {remision.remision_number}")
+        return groups
+
+    groups = {}
     
     for remision in remisiones:
         if remision is None:
             continue
         
         # Map client name
-        client_name = remision['cliente']
-        client_id = None
-        
-        if 'SEDENA' in client_name.upper():
-            client_id = CLIENT_IDS['SEDENA']
-            client_name = 'FIDEICOMISO DE ADMINISTRACION Y PAGO SEDENA 80778'
-        elif 'JESUS OCHOA' in client_name.upper():
-            client_id = CLIENT_IDS['JESUS OCHOA']
-            client_name = 'JESUS OCHOA'
-        elif 'IMPULSORA' in client_name.upper():
-            client_id = CLIENT_IDS['IMPULSORA TLAXTALECA']
-            client_name = 'IMPULSORA TLAXCALTECA DE INDUSTRIAS'
-        
-        if not client_id:
-            print(f"WARNING: Unknown client '{remision['cliente']}'. Skipping remision {remision['remision_number']}")
+        client = resolve_client(remision.cliente)
+        if client is None:
+            print(f"WARNING: Unknown client '{remision.cliente}'. Skipping remision {remision.remision_number}")
             continue
         
         # Get plant ID
-        plant_code = remision['planta']
+        plant_code = remision.planta
         plant_id = PLANT_IDS.get(plant_code)
         if not plant_id:
-            print(f"WARNING: Unknown plant code '{plant_code}'. Skipping remision {remision['remision_number']}")
+            print(f"WARNING: Unknown plant code '{plant_code}'. Skipping remision {remision.remision_number}")
             continue
         
         # Create group key
-        date_str = remision['fecha'].strftime('%Y-%m-%d')
-        key = (date_str, client_id, plant_id)
-        
-        # Initialize group if needed
-        if groups[key]['date'] is None:
-            groups[key]['date'] = remision['fecha']
-            groups[key]['client_name'] = client_name
-            groups[key]['client_id'] = client_id
-            groups[key]['plant_code'] = plant_code
-            groups[key]['plant_id'] = plant_id
-            groups[key]['unit_price'] = remision['unit_price']
+        date_str = remision.fecha.strftime('%Y-%m-%d')
+        key = (date_str, client.id, plant_id)
         
-        # Add remision to group
-        groups[key]['remisiones'].append(remision)
-        groups[key]['total_volume'] += remision['volumen_fabricado']
+        # Initialize group if needed, then add remision
+        group = groups.get(key)
+        if group is None:
+            group = groups[key] = PumpGroup(
+                remision.fecha, client.id, client.name, plant_code, plant_id, remision.unit_price,
+            )
+        group.add(remision)
     
     return groups
 
@@ -159,44 +81,10 @@ def find_closest_order(orders, target_date, client_id, plant_id):
     """Find the closest order by date for the given client/plant"""
     if not orders:
         return None, None
-    
-    # Filter orders for same client and plant
-    candidate_orders = [
-        o for o in orders
-        if o['client_id'] == client_id and o['plant_id'] == plant_id
-    ]
-    
-    if not candidate_orders:
-        return None, None
-    
-    # Calculate date differences
-    if isinstance(target_date, str):
-        target_date_obj = datetime.strptime(target_date, '%Y-%m-%d').date()
-    else:
-        target_date_obj = target_date
-    
-    best_order = None
-    min_diff = None
-    
-    for order in candidate_orders:
-        order_date = order['delivery_date']
-        if isinstance(order_date, str):
-            order_date = datetime.strptime(order_date, '%Y-%m-%d').date()
-        
-        diff = abs((order_date - target_date_obj).days)
-        
-        if min_diff is None or diff < min_diff:
-            min_diff = diff
-            best_order = order
-        elif diff == min_diff:
-            # Prefer orders before the remision date if tie
-            if order_date < target_date_obj:
-                best_order = order
-    
-    return best_order, min_diff
+    return OrderIndex(orders).closest(target_date, client_id, plant_id)
 
-def generate_migration_sql(groups, orders_data):
-    """Generate SQL migration file"""
+def generate_migration_sql(groups, orders_data, order_totals='per-order', rows=None):
+    """Generate SQL migration file. ``rows``: optional (order_item_rows, remision_rows) lists to collect STEP 1/2 rows into (--validate)"""
     sql_parts = []
     
     sql_parts.append("-- ============================================================================")
@@ -216,18 +104,8 @@ def generate_migration_sql(groups, orders_data):
     sql_parts.append("-- ============================================================================")
     sql_parts.append("")
     
-    # Group orders by date/client/plant for easy lookup
-    orders_by_key = {}
-    for order in orders_data:
-        date_str = order['delivery_date']
-        if isinstance(date_str, str):
-            date_str = datetime.strptime(date_str, '%Y-%m-%d').date().strftime('%Y-%m-%d')
-        else:
-            date_str = date_str.strftime('%Y-%m-%d')
-        key = (date_str, order['client_id'], order['plant_id'])
-        if key not in orders_by_key:
-            orders_by_key[key] = []
-        orders_by_key[key].append(order)
+    # Index orders once: exact date/client/plant lookup + nearest date per client/plant
+    order_index = OrderIndex(orders_data)
     
     order_items_inserts = []
     remisiones_inserts = []
@@ -236,46 +114,36 @@ def generate_migration_sql(groups, orders_data):
     
     # Process each group
     for (date_str, client_id, plant_id), group_data in sorted(groups.items()):
-        # Try exact match first
-        target_order = None
-        date_diff = None
-        
-        key = (date_str, client_id, plant_id)
-        if key in orders_by_key and orders_by_key[key]:
-            target_order = orders_by_key[key][0]
-            date_diff = 0
-        else:
-            # Fallback to closest date
-            all_orders = [o for o in orders_data if o['client_id'] == client_id and o['plant_id'] == plant_id]
-            result = find_closest_order(all_orders, date_str, client_id, plant_id)
-            if result[0]:
-                target_order, date_diff = result
+        # Exact match first, then closest date
+        target_order, date_diff = order_index.match(date_str, client_id, plant_id)
         
         if not target_order:
             unmatched_groups.append({
                 'date': date_str,
-                'client': group_data['client_name'],
-                'plant': group_data['plant_code'],
-                'volume': group_data['total_volume']
+                'client': group_data.client_name,
+                'plant': group_data.plant_code,
+                'volume': group_data.total_volume
             })
-            print(f"WARNING: No order found for {date_str} | {group_data['client_name']} | {group_data['plant_code']}")
+            print(f"WARNING: No order found for {date_str} | {group_data.client_name} | {group_data.plant_code}")
             continue
         
-        order_id = target_order['id']
+        order_id = target_order.id
         orders_to_update.add(order_id)
         
         if date_diff and date_diff > 0:
-            print(f"INFO: Using closest order (date diff: {date_diff} days) for {date_str} | {group_data['client_name']} | {group_data['plant_code']}")
+            print(f"INFO: Using closest order (date diff: {date_diff} days) for {date_str} | {group_data.client_name} | {group_data.plant_code}")
         
         # Create order_item
-        total_volume = group_data['total_volume']
-        unit_price = group_data['unit_price']
+        total_volume = group_data.total_volume
+        unit_price = group_data.unit_price
         total_price = total_volume * unit_price
         
-        sql_parts.append(f"-- Date: {date_str} | Client: {group_data['client_name']} | Plant: {group_data['plant_code']} | Volume: {total_volume:.2f} m³ | Price: ${total_price:,.2f}")
+        sql_parts.append(f"-- Date: {date_str} | Client: {group_data.client_name} | Plant: {group_data.plant_code} | Volume: {total_volume:.2f} m³ | Price: ${total_price:,.2f}")
         if date_diff and date_diff > 0:
             sql_parts.append(f"-- NOTE: Using closest order (date difference: {date_diff} days)")
         
+        if rows is not None:
+            rows[0].append((order_id, total_volume, unit_price, total_price))
         order_items_inserts.append(f"""
 INSERT INTO order_items (
   order_id,
@@ -305,12 +173,15 @@ VALUES (
 );""")
         
         # Create remisiones
-        for remision in group_data['remisiones']:
-            conductor_value = f"'{remision['operador']}'" if remision['operador'] else 'NULL'
-            sql_parts.append(f"-- Remision {remision['remision_number']} | {remision['volumen_fabricado']:.2f} m³ | {remision['unidad']}")
+        for remision in group_data.remisiones:
+            conductor_value = f"'{remision.operador}'" if remision.operador else 'NULL'
+            if rows is not None:
+                rows[1].append((order_id, remision.remision_number, date_str, remision.volumen_fabricado,
+                                remision.operador, remision.unidad, plant_id))
+            sql_parts.append(f"-- Remision {remision.remision_number} | {remision.volumen_fabricado:.2f} m³ | {remision.unidad}")
             remisiones_inserts.append(f"""
 INSERT INTO remisiones (order_id, remision_number, fecha, hora_carga, volumen_fabricado, tipo_remision, conductor, unidad, plant_id, created_at)
-VALUES ('{order_id}', '{remision['remision_number']}', '{date_str}'::date, '08:00:00'::time, {remision['volumen_fabricado']:.2f}, 'BOMBEO', {conductor_value}, '{remision['unidad']}', '{plant_id}', NOW());""")
+VALUES ('{order_id}', '{remision.remision_number}', '{date_str}'::date, '08:00:00'::time, {remision.volumen_fabricado:.2f}, 'BOMBEO', {conductor_value}, '{remision.unidad}', '{plant_id}', NOW());""")
     
     sql_parts.extend(order_items_inserts)
     sql_parts.append("")
@@ -323,15 +194,7 @@ VALUES ('{order_id}', '{remision['remision_number']}', '{date_str}'::date, '08:0
     sql_parts.append("-- ============================================================================")
     sql_parts.append("")
     
-    for order_id in sorted(orders_to_update):
-        sql_parts.append(f"""
-UPDATE orders
-SET total_amount = (
-  SELECT COALESCE(SUM(total_price), 0)
-  FROM order_items
-  WHERE order_id = '{order_id}'
-)
-WHERE id = '{order_id}';""")
+    sql_parts.extend(iter_order_totals_sql(sorted(orders_to_update), order_totals))
     
     sql_parts.append("")
     sql_parts.append("COMMIT;")
@@ -347,11 +210,27 @@ WHERE id = '{order_id}';""")
     return '\n'.join(sql_parts), unmatched_groups
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Generate January 2026 pumping remisiones SQL migration (P2/P3)')
+    add_order_totals_arg(parser)
+    add_cache_args(parser)
+    add_profile_args(parser)
+    add_validate_args(parser)
+    add_group_backend_args(parser)
+    args = parser.parse_args()
+    cache = cache_from_args(args)
+    profiler = profiler_from_args(args)
+
+    def load_orders(path):
+        with open(path, 'r') as f:
+            return order_refs(json.load(f))
+
     # Load orders from JSON file (saved from database query)
     orders_file = str(_DATA / 'january_orders.json')
     try:
-        with open(orders_file, 'r') as f:
-            orders_data = json.load(f)
+        with profiler.stage('load_orders') as st:
+            orders_data, _ = cached_value(cache, 'orders-json', PARSER_VERSION, [orders_file],
+                                          lambda: load_orders(orders_file))
+            st.rows_out = len(orders_data)
         print(f"Loaded {len(orders_data)} orders from {orders_file}")
     except FileNotFoundError:
         print(f"ERROR: {orders_file} not found. Please save orders data first.")
@@ -361,27 +240,40 @@ if __name__ == "__main__":
     # Parse CSV
     csv_file_path = str(_DATA / 'RELACION DE BOMBEO 2026 (1).csv')
     print(f"Parsing CSV: {csv_file_path}")
-    csv_rows = parse_csv(csv_file_path)
-    
-    # Parse remisiones
-    remisiones = []
-    for row in csv_rows:
-        remision = parse_remision(row)
-        if remision:
-            remisiones.append(remision)
+    with profiler.stage('parse') as st:
+        remisiones = cached_records(
+            cache, 'january-remisiones', PARSER_VERSION, [csv_file_path],
+            lambda errors: parse_remisiones(csv_file_path, errors),
+            Remision,
+        )
+        st.rows_out = len(remisiones)
     
     print(f"Parsed {len(remisiones)} remisiones")
     
     # Group remisiones
-    groups = group_remisiones(remisiones)
+    with profiler.stage('group', rows_in=len(remisiones)) as st:
+        groups = group_remisiones(remisiones, args.group_backend)
+        st.rows_out = len(groups)
     print(f"Grouped into {len(groups)} groups")
     
     # Generate migration
-    migration_sql, unmatched = generate_migration_sql(groups, orders_data)
+    rows = ([], []) if args.validate else None
+    with profiler.stage('render', rows_in=len(groups)) as st:
+        migration_sql, unmatched = generate_migration_sql(groups, orders_data, order_totals=args.order_totals, rows=rows)
+        st.rows_out = len(groups) - len(unmatched)
     
     migration_file = str(_REPO_ROOT / 'supabase/migrations/20260102_january_pumping_remisiones_p2_p3.sql')
-    with open(migration_file, 'w', encoding='utf-8') as f:
-        f.write(migration_sql)
+    if args.validate:
+        with profiler.stage('validate', rows_in=len(rows[0])):
+            try:
+                check_migration(rows[0], rows[1], snapshot_for_validation(args.validate_snapshot or orders_file))
+            except ValidationError as e:
+                print(f"ERROR: {e}. Nothing written to {migration_file}")
+                sys.exit(1)
+    
+    with profiler.stage('write'):
+        with open(migration_file, 'w', encoding='utf-8') as f:
+            f.write(migration_sql)
     
     print(f"\nMigration file generated: {migration_file}")
     print(f"Total groups: {len(groups)}")
@@ -390,3 +282,4 @@ if __name__ == "__main__":
         print("\nUnmatched groups:")
         for group in unmatched:
             print(f"  {group['date']} | {group['client']} | {group['plant']} | {group['volume']:.2f} m³")
+    finish_profile(profiler, args, script='generate_january_migration', output_sql=migration_file)
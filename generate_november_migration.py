@@ -1,87 +1,58 @@
-import csv
-from collections import defaultdict
+import argparse
 from pathlib import Path
 
-# Plant IDs
-PLANT_2_ID = '836cbbcf-67b2-4534-97cc-b83e71722ff7'  # Tijuana Planta 2
-PLANT_4_ID = '78fba7b9-645a-4006-96e7-e6c4d5a9d10e'  # Tijuana Planta 4
-SEDENA_CLIENT_ID = '241d39e9-ec9b-41b9-a93b-7c20e3638f1c'  # FIDEICOMISO DE ADMINISTRACION Y PAGO SEDENA 80778
-JESUS_OCHOA_CLIENT_ID = '2690972d-b975-4a69-a35d-5c4461a7554c'  # JESUS OCHOA
+from migration_tools.clients import default_resolver
+from migration_tools.ingest import PLANTS, route_csv
+from migration_tools.profiling import add_profile_args, finish_profile, profiler_from_args
+from migration_tools.records import PumpGroup
 
-# Read CSV
-remisiones = []
+# BOMBEO P2 Y P4.csv has no PLANTA column: the ingest profile routes BP02 -> P004, BP01/BP03 -> P002.
+# Remision.planta stays the plant code; these labels are only for the printed summary.
+PLANT_NAMES = {'P002': 'P2', 'P004': 'P4'}
+resolve_client = default_resolver('november').resolve
+SEDENA_CLIENT_ID = default_resolver('november').client_ids()['SEDENA']  # FIDEICOMISO DE ADMINISTRACION Y PAGO SEDENA 80778
+
+parser = argparse.ArgumentParser(description='Summarize November 2025 pumping remisiones (P2/P4) by date/client/plant')
+add_profile_args(parser)
+args = parser.parse_args()
+profiler = profiler_from_args(args)
 
 _ROOT = Path(__file__).resolve().parent
 _CSV = _ROOT / 'archive' / 'data' / 'BOMBEO P2 Y P4.csv'
 
-with open(_CSV, 'r', encoding='utf-8-sig') as f:
-    reader = csv.DictReader(f)
-    for row in reader:
-        remision_num = row['REMISION'].strip()
-        fecha_str = row['FECHA'].strip()
-        cliente = row['CLIENTE'].strip()
-        volumen = float(row['M3'].strip())
-        precio_str = row[' P.U '].strip().replace('$', '').replace(',', '').replace(' ', '')
-        precio = float(precio_str)
-        unidad = row[' UNIDAD '].strip()
-        operador = row[' OPERADOR '].strip()
-        
-        # Parse date (11/1/25 -> 2025-11-01)
-        fecha_parts = fecha_str.split('/')
-        month = int(fecha_parts[0])
-        day = int(fecha_parts[1])
-        year = 2000 + int(fecha_parts[2])
-        fecha = f'{year}-{month:02d}-{day:02d}'
-        
-        # Determine plant based on unit
-        # BP02 -> Plant 4, BP01/BP03 -> Plant 2 (based on filename P2 Y P4)
-        if unidad == 'BP02':
-            plant_id = PLANT_4_ID
-            plant_name = 'P4'
-        else:  # BP01, BP03
-            plant_id = PLANT_2_ID
-            plant_name = 'P2'
-        
-        # Determine client ID
-        if cliente == 'SEDENA':
-            client_id = SEDENA_CLIENT_ID
-        elif cliente == 'JESUS OCHOA':
-            client_id = JESUS_OCHOA_CLIENT_ID
-        else:
-            client_id = SEDENA_CLIENT_ID  # Default to SEDENA
-        
-        remisiones.append({
-            'remision': remision_num,
-            'fecha': fecha,
-            'cliente': cliente,
-            'client_id': client_id,
-            'volumen': volumen,
-            'precio': precio,
-            'unidad': unidad,
-            'operador': operador,
-            'plant_id': plant_id,
-            'plant_name': plant_name
-        })
+# One pass over the mixed CSV, split by plant (migration_tools/ingest.py)
+remisiones = []
+with profiler.stage('parse') as st:
+    for plant_code, rows in route_csv(_CSV, 'november-2025').items():
+        plant_id = PLANTS[plant_code].id
+        for r in rows:
+            # Determine client ID
+            client = resolve_client(r.cliente)
+            client_id = client.id if client else SEDENA_CLIENT_ID  # Default to SEDENA
+            remisiones.append((r, client_id, plant_id))
+    st.rows_out = len(remisiones)
 
 # Group by date, client, and plant
-groups = defaultdict(lambda: {'remisiones': [], 'total_volumen': 0, 'precio': 0, 'plant_id': None, 'client_id': None})
-
-for r in remisiones:
-    key = (r['fecha'], r['cliente'], r['plant_name'])
-    groups[key]['remisiones'].append(r)
-    groups[key]['total_volumen'] += r['volumen']
-    groups[key]['precio'] = r['precio']
-    groups[key]['plant_id'] = r['plant_id']
-    groups[key]['client_id'] = r['client_id']
+with profiler.stage('group', rows_in=len(remisiones)) as st:
+    groups = {}
+
+    for r, client_id, plant_id in remisiones:
+        key = (r.fecha, r.cliente, r.planta)
+        group = groups.get(key)
+        if group is None:
+            group = groups[key] = PumpGroup(r.fecha, client_id, r.cliente, r.planta, plant_id)
+        group.add(r)
+        group.unit_price = r.unit_price
+        group.plant_id = plant_id
+        group.client_id = client_id
+    st.rows_out = len(groups)
 
 # Print summary
 print(f'Total remisiones: {len(remisiones)}')
 print(f'Total groups: {len(groups)}')
 print()
 print('Groups by date/client/plant:')
-for (fecha, cliente, plant), data in sorted(groups.items()):
-    print(f'{fecha} | {cliente} | {plant} | {len(data["remisiones"])} remisiones | {data["total_volumen"]:.2f} m³ | ${data["precio"]:.2f}')
-
-
-
+for (fecha, cliente, plant_code), data in sorted(groups.items()):
+    print(f'{fecha} | {cliente} | {PLANT_NAMES[plant_code]} | {len(data.remisiones)} remisiones | {data.total_volume:.2f} m³ | ${data.unit_price:.2f}')
 
+finish_profile(profiler, args, script='generate_november_migration')
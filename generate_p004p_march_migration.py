@@ -5,17 +5,47 @@ from BOMBEO P4p MARZO 2026.csv.
 
 Volume-based match to orders (see plan). Same procedure as February:
 order_items first, remisiones second, total_amount updates.
+
+REMISION_TO_ORDER below is the reviewed map this migration was generated with. For a new
+month, point --csv / --output / --title (and --ingest-profile, for the blank-cell defaults)
+at that month's export and migration, and either --concrete-remisiones <export> attaches
+each pump remision to the order of the concrete remision with the same number
+(migration_tools.remision_index; --max-number-gap for numbering gaps), or --orders-json <snapshot> solves the map from
+date, client, volume and number proximity (migration_tools.assignment) and lists
+low-confidence pairs to review; if there are any (or unmatched remisiones) nothing is
+written and the script exits 1 unless --accept-low-confidence.
+
+--validate reconciles the order_items against their remisiones (and, with
+--validate-snapshot / an --orders-json carrying total_amount + order_items, the resulting
+orders.total_amount) before the file is written; mismatches exit 1 (migration_tools.validate).
 """
 
-import csv
-from datetime import datetime
-from collections import defaultdict
+import argparse
+import sys
 from pathlib import Path
 
+from migration_tools.assignment import LowConfidenceError, add_assignment_args, solve_remision_map
+from migration_tools.ingest import PLANTS, PROFILES, read_remisiones
+from migration_tools.profiling import add_profile_args, finish_profile, profiler_from_args
+from migration_tools.records import PumpGroup
+from migration_tools.remision_index import add_concrete_index_args, remision_map_from_export
+from migration_tools.sql import (
+    add_sql_format_args,
+    iter_order_items_sql,
+    iter_order_totals_sql,
+    iter_remisiones_sql,
+)
+from migration_tools.validate import ValidationError, add_validate_args, check_migration, snapshot_for_validation
+
 _REPO_ROOT = Path(__file__).resolve().parent
 _DATA = _REPO_ROOT / 'archive' / 'data'
+DEFAULT_CSV = _DATA / 'BOMBEO P4p MARZO 2026.csv'
+DEFAULT_OUTPUT = _REPO_ROOT / 'supabase/migrations/20260407_p004p_march_pumping_remisiones.sql'
+DEFAULT_TITLE = 'MARCH 2026'
 
-PLANT_P004P_ID = 'af86c90f-c76f-44fb-9e2d-d5460ae51aca'
+PLANT_P004P_ID = PLANTS['P004P'].id
+INGEST_PROFILE = 'p004p-march-2026'  # migration_tools/ingest.py
+UNIT_PRICE_DEFAULT = 310.0  # when no P.U parsed for an order
 
 # Pump remision_number -> order_id (March 2026 P004P)
 REMISION_TO_ORDER = {
@@ -44,172 +74,138 @@ REMISION_TO_ORDER = {
 }
 
 
-def extract_remision_num(csv_val):
-    """Plain '1857' or 'P004-006287' -> normalized string."""
-    s = str(csv_val).strip()
-    parts = s.split('-')
-    if len(parts) >= 2:
-        return str(int(parts[-1]))
-    return str(int(parts[0])) if parts else ''
-
-
-def normalize_key(d):
-    return {k.strip(): v for k, v in d.items()} if isinstance(d, dict) else d
-
-
-def parse_csv(file_path):
-    rows = []
-    with open(file_path, 'r', encoding='utf-8-sig') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            row = normalize_key(row)
-            rem_key = None
-            for k in ('REMISION', 'Remision', 'remision'):
-                if row.get(k, '').strip():
-                    rem_key = k
-                    break
-            if not rem_key:
-                continue
-            try:
-                remision_raw = row[rem_key].strip()
-                remision_num = extract_remision_num(remision_raw)
-                fecha_key = next((k for k in ('FECHA', 'Fecha', 'fecha') if k in row), 'FECHA')
-                fecha_str = row[fecha_key].strip()
-                m3 = float(str(row.get('M3', '0')).strip())
-                pu_str = str(row.get('P.U', row.get(' P.U ', '0'))).replace('$', '').replace(',', '').strip()
-                unidad = str(row.get('UNIDAD', '')).strip() or 'BP-04'
-                oper_key = next((k for k in ('OPERADOR', 'Operador', 'operador') if k in row), 'OPERADOR')
-                operador = str(row.get(oper_key, '')).strip() or 'Omar Saucedo'
-
-                parts = fecha_str.split('/')
-                month, day = int(parts[0]), int(parts[1])
-                year = 2000 + int(parts[2]) if len(parts[2]) == 2 else int(parts[2])
-                fecha = datetime(year, month, day).date()
-                unit_price = float(pu_str) if pu_str else 0
-
-                rows.append({
-                    'remision_number': remision_num,
-                    'fecha': fecha,
-                    'volumen_fabricado': m3,
-                    'unit_price': unit_price,
-                    'unidad': unidad,
-                    'operador': operador,
-                })
-            except Exception as e:
-                print(f"Skip row {row.get(rem_key)}: {e}")
-    return rows
-
-
-def sql_escape(s):
-    return s.replace("'", "''")
+def parse_csv(file_path, profile=INGEST_PROFILE):
+    """CSV -> Remision list; P004-006287 -> 6287 and the unit / operator defaults live in the ingest profile."""
+    return read_remisiones(file_path, profile)
 
 
 def main():
-    csv_path = str(_DATA / 'BOMBEO P4p MARZO 2026.csv')
-    remisiones = parse_csv(csv_path)
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--csv', default=str(DEFAULT_CSV), help='Pump CSV (default: the MARCH 2026 export)')
+    parser.add_argument('--output', default=str(DEFAULT_OUTPUT), help='Migration .sql to write')
+    parser.add_argument('--title', default=DEFAULT_TITLE, help='Header title, e.g. APRIL 2026')
+    parser.add_argument('--ingest-profile', default=INGEST_PROFILE, choices=sorted(n for n, prof in PROFILES.items() if prof.default_plant == 'P004P'),
+                        help='CSV layout (migration_tools/ingest.py): unit / operator defaults for blank cells')
+    add_sql_format_args(parser)
+    add_assignment_args(parser)
+    add_concrete_index_args(parser)
+    add_profile_args(parser)
+    add_validate_args(parser)
+    args = parser.parse_args()
+    profiler = profiler_from_args(args)
+
+    csv_path = args.csv
+    out_path = args.output
+    with profiler.stage('parse') as st:
+        remisiones = parse_csv(csv_path, args.ingest_profile)
+        st.rows_out = len(remisiones)
     print(f"Parsed {len(remisiones)} remisiones from {csv_path}")
 
-    order_groups = defaultdict(lambda: {'remisiones': [], 'total_vol': 0.0, 'prices': []})
-    unmatched = []
-
-    for r in remisiones:
-        order_id = REMISION_TO_ORDER.get(r['remision_number'])
-        if not order_id:
-            unmatched.append(r['remision_number'])
-            continue
-        order_groups[order_id]['remisiones'].append(r)
-        order_groups[order_id]['total_vol'] += r['volumen_fabricado']
-        order_groups[order_id]['prices'].append(r['unit_price'])
+    remision_to_order = REMISION_TO_ORDER
+    if args.concrete_remisiones:
+        with profiler.stage('assign', rows_in=len(remisiones)) as st:
+            remision_to_order = remision_map_from_export(
+                remisiones, args.concrete_remisiones, PLANT_P004P_ID, args.month, args.max_number_gap,
+            )
+            st.rows_out = len(remision_to_order)
+    elif args.orders_json:
+        with profiler.stage('assign', rows_in=len(remisiones)) as st:
+            try:
+                remision_to_order = solve_remision_map(
+                    remisiones, args.orders_json, PLANT_P004P_ID, args.order_capacity, args.max_days,
+                    args.accept_low_confidence,
+                )
+            except LowConfidenceError as e:
+                print(f"ERROR: {e}. Nothing written to {out_path}")
+                sys.exit(1)
+            st.rows_out = len(remision_to_order)
+
+    with profiler.stage('group', rows_in=len(remisiones)) as st:
+        order_groups = {}  # order_id -> PumpGroup
+        unmatched = []
+
+        for r in remisiones:
+            order_id = remision_to_order.get(r.remision_number)
+            if not order_id:
+                unmatched.append(r.remision_number)
+                continue
+            group = order_groups.get(order_id)
+            if group is None:
+                group = order_groups[order_id] = PumpGroup(plant_id=PLANT_P004P_ID)
+            group.add(r)
+        st.rows_out = len(order_groups)
 
     if unmatched:
         print(f"WARNING: Unmatched remision numbers: {unmatched}")
 
-    sql_parts = [
-        "-- ============================================================================",
-        "-- PUMPING REMISIONES - MARCH 2026 - PLANT P004P (PITAHAYA)",
-        "-- Source: BOMBEO P4p MARZO 2026.csv | Volume-based order match",
-        "-- Same procedure as Plant 2: order_items, remisiones, total_amount",
-        "-- ============================================================================",
-        "",
-        "BEGIN;",
-        "",
-        "-- STEP 1: Create pumping order items FIRST",
-        "-- ============================================================================",
-    ]
-
-    remisiones_sql = []
-    for order_id in sorted(order_groups.keys()):
-        g = order_groups[order_id]
-        total_vol = g['total_vol']
-        unit_price = sum(g['prices']) / len(g['prices']) if g['prices'] else 310.0
-        total_price = total_vol * unit_price
-
-        sql_parts.append(f"""
-INSERT INTO order_items (
-  order_id,
-  product_type,
-  volume,
-  unit_price,
-  total_price,
-  has_pump_service,
-  pump_price,
-  pump_volume,
-  quote_detail_id,
-  created_at,
-  pump_volume_delivered
-)
-VALUES (
-  '{order_id}',
-  'SERVICIO DE BOMBEO',
-  {total_vol:.2f},
-  {unit_price:.2f},
-  {total_price:.2f},
-  true,
-  {unit_price:.2f},
-  {total_vol:.2f},
-  NULL,
-  NOW(),
-  NULL
-);""")
-
-        for rem in g['remisiones']:
-            op = sql_escape(rem['operador'])
-            conductor_val = f"'{op}'" if rem['operador'] else 'NULL'
-            unidad_esc = sql_escape(rem['unidad'])
-            fecha_str = rem['fecha'].strftime('%Y-%m-%d')
-            remisiones_sql.append(f"""
-INSERT INTO remisiones (order_id, remision_number, fecha, hora_carga, volumen_fabricado, tipo_remision, conductor, unidad, plant_id, created_at)
-VALUES ('{order_id}', '{rem['remision_number']}', '{fecha_str}'::date, '08:00:00'::time, {rem['volumen_fabricado']:.2f}, 'BOMBEO', {conductor_val}, '{unidad_esc}', '{PLANT_P004P_ID}', NOW());""")
-
-    sql_parts.append("")
-    sql_parts.append("-- STEP 2: Create pumping remisiones SECOND")
-    sql_parts.append("-- ============================================================================")
-    sql_parts.extend(remisiones_sql)
-    sql_parts.append("")
-    sql_parts.append("-- STEP 3: Update order totals")
-    sql_parts.append("-- ============================================================================")
-
-    for order_id in sorted(order_groups.keys()):
-        sql_parts.append(f"""
-UPDATE orders
-SET total_amount = (
-  SELECT COALESCE(SUM(total_price), 0)
-  FROM order_items
-  WHERE order_id = '{order_id}'
-)
-WHERE id = '{order_id}';""")
-
-    sql_parts.append("")
-    sql_parts.append("COMMIT;")
-
-    out_path = str(_REPO_ROOT / 'supabase/migrations/20260407_p004p_march_pumping_remisiones.sql')
-    with open(out_path, 'w', encoding='utf-8') as f:
-        f.write('\n'.join(sql_parts))
+    with profiler.stage('render', rows_in=len(order_groups)) as st:
+        sql_parts = [
+            "-- ============================================================================",
+            f"-- PUMPING REMISIONES - {args.title} - PLANT P004P (PITAHAYA)",
+            f"-- Source: {Path(csv_path).name} | Volume-based order match",
+            "-- Same procedure as Plant 2: order_items, remisiones, total_amount",
+            "-- ============================================================================",
+            "",
+            "BEGIN;",
+            "",
+            "-- STEP 1: Create pumping order items FIRST",
+            "-- ============================================================================",
+        ]
+
+        order_ids = sorted(order_groups.keys())
+        order_item_rows = []
+        remision_rows = []
+        for order_id in order_ids:
+            g = order_groups[order_id]
+            total_vol = g.total_volume
+            unit_price = sum(r.unit_price for r in g.remisiones) / len(g.remisiones) if g.remisiones else UNIT_PRICE_DEFAULT
+            order_item_rows.append((order_id, total_vol, unit_price, total_vol * unit_price))
+            for rem in g.remisiones:
+                remision_rows.append((
+                    order_id,
+                    rem.remision_number,
+                    rem.fecha.strftime('%Y-%m-%d'),
+                    rem.volumen_fabricado,
+                    rem.operador,
+                    rem.unidad,
+                    g.plant_id,
+                ))
+        sql_parts.extend(iter_order_items_sql(order_item_rows, args.sql_format, args.batch_size))
+
+        sql_parts.append("")
+        sql_parts.append("-- STEP 2: Create pumping remisiones SECOND")
+        sql_parts.append("-- ============================================================================")
+        sql_parts.extend(iter_remisiones_sql(remision_rows, args.sql_format, args.batch_size))
+        sql_parts.append("")
+        sql_parts.append("-- STEP 3: Update order totals")
+        sql_parts.append("-- ============================================================================")
+
+        sql_parts.extend(iter_order_totals_sql(order_ids, args.order_totals))
+
+        sql_parts.append("")
+        sql_parts.append("COMMIT;")
+        st.rows_out = len(sql_parts)
+
+    if args.validate:
+        with profiler.stage('validate', rows_in=len(order_item_rows)):
+            try:
+                check_migration(
+                    order_item_rows, remision_rows,
+                    snapshot_for_validation(args.validate_snapshot or args.orders_json),
+                )
+            except ValidationError as e:
+                print(f"ERROR: {e}. Nothing written to {out_path}")
+                sys.exit(1)
+
+    with profiler.stage('write'):
+        with open(out_path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(sql_parts))
 
     print(f"Written {out_path}")
     print(f"  - {len(order_groups)} orders with pumping")
-    print(f"  - {len(remisiones_sql)} remisiones")
+    print(f"  - {len(remision_rows)} remisiones")
     print(f"  - {len(unmatched)} unmatched")
+    finish_profile(profiler, args, script='generate_p004p_march_migration', output_sql=out_path)
 
 
 if __name__ == '__main__':
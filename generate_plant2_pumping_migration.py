@@ -9,162 +9,160 @@ Example (March 2026), from repo root:
     --orders-json archive/data/march_orders.json \\
     --output-sql supabase/migrations/20260406_p2_march_2026_pumping_remisiones.sql \\
     --title "MARCH 2026"
+
+Add --stream for large consolidated backfills: rows flow parse -> group -> match ->
+render and each SQL section is written straight to --output-sql. The CSV row list and the
+SQL text are never held whole, but each group keeps its Remision objects until STEP 2 is
+rendered, so memory still grows with the number of rows (less than without --stream).
+
+Add --profile report.json for per-stage wall time / rows / peak memory (see
+migration_tools/profiling.py; --profile-cprofile out.pstats also dumps the hottest stage).
+
+Add --incremental to emit only the delta: remisiones that another migration in
+supabase/migrations already inserts as BOMBEO for the same plant are skipped (see
+migration_tools/emitted.py; the index is kept in .cache/emitted_remisiones.sqlite).
+
+Add --validate for a dry-run reconciliation before anything is written: per order, the
+pump order_item volume / total_price against its remisiones and, when the orders snapshot
+carries total_amount + order_items (or --validate-snapshot points at one), the resulting
+orders.total_amount delta. Mismatches abort with exit code 1 (migration_tools/validate.py).
 """
 import argparse
-import csv
 import json
 import os
 import sys
-from collections import defaultdict
-from datetime import datetime
+from functools import partial
+from itertools import islice
 from pathlib import Path
 
+from migration_tools.cache import add_cache_args, cache_from_args, cached_records, cached_value
+from migration_tools.clients import alias_scopes, default_resolver
+from migration_tools.columnar import add_group_backend_args, group_columns
+from migration_tools.emitted import add_incremental_args, open_emitted_index
+from migration_tools.ingest import PLANTS, PROFILES, CsvSource
+from migration_tools.orders import OrderIndex
+from migration_tools.profiling import NULL_PROFILER, add_profile_args, finish_profile, profiler_from_args
+from migration_tools.records import OrderRef, PumpGroup, Remision
+from migration_tools.sql import (
+    DEFAULT_BATCH_SIZE,
+    add_sql_format_args,
+    iter_order_items_sql,
+    iter_order_totals_sql,
+    iter_remisiones_sql,
+)
+from migration_tools.validate import (
+    ValidationError,
+    add_validate_args,
+    check_migration,
+    snapshot_for_validation,
+)
+
 _REPO_ROOT = Path(__file__).resolve().parent
 os.chdir(_REPO_ROOT)
 
-CLIENT_IDS = {
-    'SEDENA': '241d39e9-ec9b-41b9-a93b-7c20e3638f1c',
-    'JESUS OCHOA': '2690972d-b975-4a69-a35d-5c4461a7554c',
-    'DECODI': '46ba7f7b-468d-4a56-b353-4e79e9832e82',
-    'GRUPO ARZER': 'b0af2dbd-eaec-42ea-8585-774c2eb88337',
-    'GRUPO HYCSA': 'ec173ff3-a56b-47a5-8cc8-736cfabdeeca',
-}
-
-PLANT_IDS = {
-    'P002': '836cbbcf-67b2-4534-97cc-b83e71722ff7',
-    'P004P': 'af86c90f-c76f-44fb-9e2d-d5460ae51aca',
-}
-
-
-def normalize_row_keys(row):
-    """Strip CSV header keys so ' P.U ' / ' PLANTA  ' map consistently."""
-    return {k.strip(): v for k, v in row.items() if k is not None}
-
-
-def normalize_unit(unit_str):
-    """Normalize BP-02, BP02, BP2 -> BP02; BP-01, BP1 -> BP01; leave EXTERNA etc."""
-    if not unit_str:
-        return None
-    raw = unit_str.strip().upper()
-    if raw in ('BP2', 'BP-02', 'BP02'):
-        return 'BP02'
-    if raw in ('BP1', 'BP-01', 'BP01'):
-        return 'BP01'
-    if raw in ('BP4', 'BP-04', 'BP04'):
-        return 'BP04'
-    return raw
-
-
-def parse_csv(file_path):
-    remisiones_data = []
-    with open(file_path, mode='r', encoding='utf-8-sig') as csvfile:
-        reader = csv.DictReader(csvfile)
-        for row in reader:
-            row = normalize_row_keys(row)
-            if not row.get('REMISION', '').strip():
-                continue
-            remisiones_data.append(row)
-    return remisiones_data
+# Client names/ids/aliases live in migration_tools/client_aliases.json.
+CLIENT_IDS = default_resolver('plant2').client_ids()
+# client_aliases.json "generators" values; this script resolves the 'plant2' clients by default.
+CLIENT_SCOPES = alias_scopes()
+CLIENT_SCOPE = 'plant2'
 
+PLANT_IDS = {code: plant.id for code, plant in PLANTS.items()}
+
+# Bump when this script's parsing changes (invalidates the parse cache); edits to the shared
+# parsing modules already change every key (migration_tools/cache.py PARSER_SOURCES).
+PARSER_VERSION = 4
+
+# CSV -> Remision rules (PLANTA column, BP-02 -> BP02, blank unit -> RENTADA): migration_tools/ingest.py
+INGEST_PROFILE = 'plant-column'
 
-def parse_remision(row):
-    try:
-        remision_num = row['REMISION'].strip()
-        fecha_str = row['FECHA'].strip()
-        cliente = row['CLIENTE'].strip()
-        m3 = float(str(row['M3']).strip())
-        pu_raw = row.get('P.U', row.get(' P.U ', '0'))
-        pu_str = str(pu_raw).strip().replace('$', '').replace(',', '').strip()
-        unidad_raw = row.get('UNIDAD', row.get(' UNIDAD ', '')).strip()
-        operador_raw = row.get('OPERADOR', row.get(' OPERADOR ', '')).strip()
-        planta_raw = row.get('PLANTA', row.get(' PLANTA ', '')).strip()
-
-        fecha_parts = fecha_str.split('/')
-        month = int(fecha_parts[0])
-        day = int(fecha_parts[1])
-        year_part = int(fecha_parts[2])
-        year = 2026 if year_part == 26 else (2000 + year_part if year_part < 100 else year_part)
-
-        fecha = datetime(year, month, day).date()
-        unit_price = float(pu_str) if pu_str else 0.0
-        nu = normalize_unit(unidad_raw)
-        unidad = nu or (unidad_raw.upper() if unidad_raw else 'RENTADA')
-        operador = operador_raw if operador_raw else None
-        planta = planta_raw.strip()
-
-        return {
-            'remision_number': remision_num,
-            'fecha': fecha,
-            'cliente': cliente,
-            'volumen_fabricado': m3,
-            'unit_price': unit_price,
-            'unidad': unidad,
-            'operador': operador,
-            'planta': planta
-        }
-    except Exception as e:
-        print(f"Error parsing remision {row.get('REMISION', 'unknown')}: {e}")
-        return None
-
-
-def group_remisiones(remisiones):
-    groups = defaultdict(lambda: {
-        'remisiones': [],
-        'total_volume': 0.0,
-        'unit_price': 0.0,
-        'client_name': None,
-        'client_id': None,
-        'plant_code': None,
-        'plant_id': None,
-        'date': None
-    })
 
+def iter_parsed(file_path, errors=None, profiler=NULL_PROFILER, profile=INGEST_PROFILE):
+    """read_csv + parse stages: every parsed Remision of file_path, streamed."""
+    source = CsvSource(file_path, profile)
+    csv_rows = profiler.iter_stage('read_csv', source)
+    return profiler.iter_stage('parse', source.parse(csv_rows, errors), upstream='read_csv')
+
+
+def exclude_remisiones(remisiones, exclude_set, skipped_exclude):
+    """Yield remisiones not in exclude_set, appending excluded numbers to skipped_exclude."""
+    for p in remisiones:
+        num = p.remision_number.strip()
+        if num in exclude_set:
+            skipped_exclude.append(num)
+            continue
+        yield p
+
+
+def skip_emitted(remisiones, emitted_among, skipped_emitted, chunk_size=5000):
+    """
+    --incremental: drop remisiones another migration already inserts. ``emitted_among`` maps
+    a list of (plant_id, remision_number) to the emitted subset; called once per chunk.
+    """
+    it = iter(remisiones)
+    while True:
+        chunk = list(islice(it, chunk_size))
+        if not chunk:
+            return
+        keys = [(PLANT_IDS.get(p.planta), p.remision_number.strip()) for p in chunk]
+        emitted = emitted_among(keys)
+        for p, key in zip(chunk, keys):
+            if key in emitted:
+                skipped_emitted.append(key[1])
+                continue
+            yield p
+
+
+def load_remisiones(csv_path, cache=None, profiler=NULL_PROFILER, profile=INGEST_PROFILE):
+    """All parsed remisiones of csv_path (before exclusions), through the parse cache when given."""
+    def parse(errors):
+        return list(iter_parsed(csv_path, errors, profiler, profile))
+
+    with profiler.stage('load_csv') as st:
+        remisiones = cached_records(cache, f'remisiones-{profile}', PARSER_VERSION, [csv_path], parse, Remision)
+        st.rows_out = len(remisiones)
+    return remisiones
+
+
+def group_remisiones(remisiones, backend='dict', clients=CLIENT_SCOPE):
+    """
+    (date_str, client_id, plant_id) -> PumpGroup. ``backend='columnar'``: migration_tools/columnar.py.
+    ``clients``: the client_aliases.json generator scope used to resolve CLIENTE.
+    """
+    resolve_client = default_resolver(clients).resolve
+    if backend == 'columnar':
+        groups, skipped = group_columns(remisiones, resolve_client, PLANT_IDS)
+        for remision, reason in skipped:
+            if reason == 'client':
+                print(f"WARNING: Unknown client '{remision.cliente}'. Skipping remision {remision.remision_number}")
+            else:
+                print(f"WARNING: Unknown plant '{remision.planta}'. Skipping remision {remision.remision_number}")
+        return groups
+
+    groups = {}
     for remision in remisiones:
         if remision is None:
             continue
 
-        client_name = remision['cliente']
-        client_id = None
-
-        if 'SEDENA' in client_name.upper():
-            client_id = CLIENT_IDS['SEDENA']
-            client_name = 'FIDEICOMISO DE ADMINISTRACION Y PAGO SEDENA 80778'
-        elif 'JESUS OCHOA' in client_name.upper():
-            client_id = CLIENT_IDS['JESUS OCHOA']
-            client_name = 'JESUS OCHOA'
-        elif 'DECODI' in client_name.upper():
-            client_id = CLIENT_IDS['DECODI']
-            client_name = 'DECODI'
-        elif 'ARZER' in client_name.upper() or 'GRUPO ARZER' in client_name.upper():
-            client_id = CLIENT_IDS['GRUPO ARZER']
-            client_name = 'GRUPO ARZER'
-        elif 'HYCSA' in client_name.upper():
-            client_id = CLIENT_IDS['GRUPO HYCSA']
-            client_name = 'GRUPO HYCSA'
-
-        if not client_id:
-            print(f"WARNING: Unknown client '{remision['cliente']}'. Skipping remision {remision['remision_number']}")
+        client = resolve_client(remision.cliente)
+        if client is None:
+            print(f"WARNING: Unknown client '{remision.cliente}'. Skipping remision {remision.remision_number}")
             continue
 
-        plant_code = remision['planta']
+        plant_code = remision.planta
         plant_id = PLANT_IDS.get(plant_code)
         if not plant_id:
-            print(f"WARNING: Unknown plant '{plant_code}'. Skipping remision {remision['remision_number']}")
+            print(f"WARNING: Unknown plant '{plant_code}'. Skipping remision {remision.remision_number}")
             continue
 
-        date_str = remision['fecha'].strftime('%Y-%m-%d')
-        key = (date_str, client_id, plant_id)
-
-        if groups[key]['date'] is None:
-            groups[key]['date'] = remision['fecha']
-            groups[key]['client_name'] = client_name
-            groups[key]['client_id'] = client_id
-            groups[key]['plant_code'] = plant_code
-            groups[key]['plant_id'] = plant_id
-            groups[key]['unit_price'] = remision['unit_price']
+        date_str = remision.fecha.strftime('%Y-%m-%d')
+        key = (date_str, client.id, plant_id)
 
-        groups[key]['remisiones'].append(remision)
-        groups[key]['total_volume'] += remision['volumen_fabricado']
+        group = groups.get(key)
+        if group is None:
+            group = groups[key] = PumpGroup(
+                remision.fecha, client.id, client.name, plant_code, plant_id, remision.unit_price,
+            )
+        group.add(remision)
 
     return groups
 
@@ -172,175 +170,275 @@ def group_remisiones(remisiones):
 def find_closest_order(orders, target_date, client_id, plant_id):
     if not orders:
         return None, None
+    return OrderIndex(orders).closest(target_date, client_id, plant_id)
 
-    candidate_orders = [o for o in orders if o['client_id'] == client_id and o['plant_id'] == plant_id]
-    if not candidate_orders:
-        return None, None
 
-    target_date_obj = datetime.strptime(target_date, '%Y-%m-%d').date() if isinstance(target_date, str) else target_date
-    best_order = None
-    min_diff = None
-
-    for order in candidate_orders:
-        order_date = order['delivery_date']
-        if isinstance(order_date, str):
-            order_date = datetime.strptime(order_date, '%Y-%m-%d').date()
-        diff = abs((order_date - target_date_obj).days)
-        if min_diff is None or diff < min_diff:
-            min_diff = diff
-            best_order = order
-        elif diff == min_diff and order_date < target_date_obj:
-            best_order = order
-
-    return best_order, min_diff
-
-
-def sql_str_literal(value):
-    """Escape single quotes for PostgreSQL string literals."""
-    if value is None:
-        return None
-    return str(value).replace("'", "''")
-
-
-def generate_migration_sql(groups, orders_data, title_line, plant_label="PLANT 2 (TIJUANA)"):
-    sql_parts = []
-    sql_parts.append("-- ============================================================================")
-    sql_parts.append(f"-- PUMPING REMISIONES - {title_line} - {plant_label}")
-    sql_parts.append("-- ============================================================================")
-    sql_parts.append("-- 1. order_items FIRST (pump_volume_delivered = NULL)")
-    sql_parts.append("-- 2. remisiones SECOND (triggers update pump_volume_delivered)")
-    sql_parts.append("-- 3. Update order totals")
-    sql_parts.append("-- ============================================================================")
-    sql_parts.append("")
-    sql_parts.append("BEGIN;")
-    sql_parts.append("")
-    sql_parts.append("-- STEP 1: Create pumping order items FIRST")
-    sql_parts.append("-- ============================================================================")
-
-    orders_by_key = {}
-    for order in orders_data:
-        date_str = order['delivery_date']
-        if isinstance(date_str, str):
-            date_str = date_str.split('T')[0] if 'T' in str(date_str) else date_str
-        else:
-            date_str = date_str.strftime('%Y-%m-%d')
-        key = (date_str, order['client_id'], order['plant_id'])
-        if key not in orders_by_key:
-            orders_by_key[key] = []
-        orders_by_key[key].append(order)
-
-    order_items_inserts = []
-    remisiones_inserts = []
-    orders_to_update = set()
-    unmatched_groups = []
-
-    for (date_str, client_id, plant_id), group_data in sorted(groups.items()):
-        target_order = None
-        date_diff = None
-        key = (date_str, client_id, plant_id)
-
-        if key in orders_by_key and orders_by_key[key]:
-            target_order = orders_by_key[key][0]
-            date_diff = 0
-        else:
-            all_orders = [o for o in orders_data if o['client_id'] == client_id and o['plant_id'] == plant_id]
-            result = find_closest_order(all_orders, date_str, client_id, plant_id)
-            if result[0]:
-                target_order, date_diff = result
+def match_groups(groups, order_index):
+    """Match stage: yield (key, group_data, order_id, date_diff) in key order; order_id is None if unmatched."""
+    for key, group_data in sorted(groups.items()):
+        date_str = key[0]
+        target_order, date_diff = order_index.match(*key)
 
         if not target_order:
-            unmatched_groups.append({
-                'date': date_str,
-                'client': group_data['client_name'],
-                'plant': group_data['plant_code'],
-                'volume': group_data['total_volume']
-            })
-            print(f"WARNING: No order for {date_str} | {group_data['client_name']} | {group_data['plant_code']}")
+            print(f"WARNING: No order for {date_str} | {group_data.client_name} | {group_data.plant_code}")
+            yield key, group_data, None, None
             continue
 
-        order_id = target_order['id']
-        orders_to_update.add(order_id)
-
         if date_diff and date_diff > 0:
-            print(f"INFO: Closest order (date diff: {date_diff} days) for {date_str} | {group_data['client_name']}")
+            print(f"INFO: Closest order (date diff: {date_diff} days) for {date_str} | {group_data.client_name}")
+
+        yield key, group_data, target_order.id, date_diff
+
+
+def unmatched_summary(matched):
+    return [
+        {
+            'date': date_str,
+            'client': group_data.client_name,
+            'plant': group_data.plant_code,
+            'volume': group_data.total_volume,
+        }
+        for (date_str, _, _), group_data, order_id, _ in matched
+        if order_id is None
+    ]
+
+
+def order_item_rows(matched):
+    """STEP 1 rows (order_id, total_volume, unit_price, total_price) of the matched groups."""
+    return (
+        (order_id, group_data.total_volume, group_data.unit_price,
+         group_data.total_volume * group_data.unit_price)
+        for _, group_data, order_id, _ in matched
+        if order_id is not None
+    )
+
+
+def remision_rows(matched):
+    """STEP 2 rows (order_id, remision_number, date, volumen, conductor, unidad, plant_id)."""
+    return (
+        (order_id, remision.remision_number, date_str, remision.volumen_fabricado,
+         remision.operador, remision.unidad or 'RENTADA', plant_id)
+        for (date_str, _, plant_id), group_data, order_id, _ in matched
+        if order_id is not None
+        for remision in group_data.remisiones
+    )
 
-        total_volume = group_data['total_volume']
-        unit_price = group_data['unit_price']
-        total_price = total_volume * unit_price
 
-        sql_parts.append(f"-- Date: {date_str} | Client: {group_data['client_name']} | Volume: {total_volume:.2f} m³ | ${total_price:,.2f}")
+def validate_matched(matched, snapshot=None, profiler=NULL_PROFILER):
+    """--validate: reconcile the matched groups before rendering; raises ValidationError."""
+    with profiler.stage('validate', rows_in=len(matched)):
+        return check_migration(order_item_rows(matched), remision_rows(matched), snapshot)
+
+
+def iter_migration_sql(matched, title_line, plant_label="PLANT 2 (TIJUANA)", sql_format='insert',
+                       batch_size=DEFAULT_BATCH_SIZE, order_totals='per-order'):
+    """
+    Render stage: yield migration chunks, to be joined with newlines.
+
+    ``matched`` is the materialized output of match_groups (one entry per group, not per
+    SQL statement); it is walked once per section so STEP 1 -> 2 -> 3 order is kept.
+    ``sql_format`` picks the statement shape for STEP 1/2 and ``order_totals`` the one for
+    STEP 3 (see migration_tools.sql).
+    """
+    yield "-- ============================================================================"
+    yield f"-- PUMPING REMISIONES - {title_line} - {plant_label}"
+    yield "-- ============================================================================"
+    yield "-- 1. order_items FIRST (pump_volume_delivered = NULL)"
+    yield "-- 2. remisiones SECOND (triggers update pump_volume_delivered)"
+    yield "-- 3. Update order totals"
+    yield "-- ============================================================================"
+    yield ""
+    yield "BEGIN;"
+    yield ""
+    yield "-- STEP 1: Create pumping order items FIRST"
+    yield "-- ============================================================================"
+
+    for (date_str, _, _), group_data, order_id, date_diff in matched:
+        if order_id is None:
+            continue
+        total_volume = group_data.total_volume
+        total_price = total_volume * group_data.unit_price
+        yield f"-- Date: {date_str} | Client: {group_data.client_name} | Volume: {total_volume:.2f} m³ | ${total_price:,.2f}"
         if date_diff and date_diff > 0:
-            sql_parts.append(f"-- NOTE: Using closest order (date difference: {date_diff} days)")
-
-        order_items_inserts.append(f"""
-INSERT INTO order_items (
-  order_id,
-  product_type,
-  volume,
-  unit_price,
-  total_price,
-  has_pump_service,
-  pump_price,
-  pump_volume,
-  quote_detail_id,
-  created_at,
-  pump_volume_delivered
-)
-VALUES (
-  '{order_id}',
-  'SERVICIO DE BOMBEO',
-  {total_volume:.2f},
-  {unit_price:.2f},
-  {total_price:.2f},
-  true,
-  {unit_price:.2f},
-  {total_volume:.2f},
-  NULL,
-  NOW(),
-  NULL
-);""")
-
-        for remision in group_data['remisiones']:
-            if remision['operador']:
-                conductor_value = f"'{sql_str_literal(remision['operador'])}'"
-            else:
-                conductor_value = 'NULL'
-            unidad = remision['unidad'] or 'RENTADA'
-            unidad_esc = sql_str_literal(unidad)
-            sql_parts.append(f"-- Remision {remision['remision_number']} | {remision['volumen_fabricado']:.2f} m³ | {unidad}")
-            remisiones_inserts.append(f"""
-INSERT INTO remisiones (order_id, remision_number, fecha, hora_carga, volumen_fabricado, tipo_remision, conductor, unidad, plant_id, created_at)
-VALUES ('{order_id}', '{sql_str_literal(remision['remision_number'])}', '{date_str}'::date, '08:00:00'::time, {remision['volumen_fabricado']:.2f}, 'BOMBEO', {conductor_value}, '{unidad_esc}', '{plant_id}', NOW());""")
-
-    sql_parts.extend(order_items_inserts)
-    sql_parts.append("")
-    sql_parts.append("-- STEP 2: Create pumping remisiones SECOND")
-    sql_parts.append("-- ============================================================================")
-    sql_parts.extend(remisiones_inserts)
-    sql_parts.append("")
-    sql_parts.append("-- STEP 3: Update order totals")
-    sql_parts.append("-- ============================================================================")
-
-    for order_id in sorted(orders_to_update):
-        sql_parts.append(f"""
-UPDATE orders
-SET total_amount = (
-  SELECT COALESCE(SUM(total_price), 0)
-  FROM order_items
-  WHERE order_id = '{order_id}'
-)
-WHERE id = '{order_id}';""")
+            yield f"-- NOTE: Using closest order (date difference: {date_diff} days)"
+        for remision in group_data.remisiones:
+            unidad = remision.unidad or 'RENTADA'
+            yield f"-- Remision {remision.remision_number} | {remision.volumen_fabricado:.2f} m³ | {unidad}"
+
+    yield from iter_order_items_sql(order_item_rows(matched), sql_format, batch_size)
+
+    yield ""
+    yield "-- STEP 2: Create pumping remisiones SECOND"
+    yield "-- ============================================================================"
+    yield from iter_remisiones_sql(remision_rows(matched), sql_format, batch_size)
+
+    yield ""
+    yield "-- STEP 3: Update order totals"
+    yield "-- ============================================================================"
+    yield from iter_order_totals_sql(
+        sorted({order_id for _, _, order_id, _ in matched if order_id is not None}),
+        order_totals,
+    )
 
-    sql_parts.append("")
-    sql_parts.append("COMMIT;")
+    yield ""
+    yield "COMMIT;"
 
+    unmatched_groups = unmatched_summary(matched)
     if unmatched_groups:
-        sql_parts.append("")
-        sql_parts.append("-- WARNING: Skipped (no matching order):")
+        yield ""
+        yield "-- WARNING: Skipped (no matching order):"
         for g in unmatched_groups:
-            sql_parts.append(f"-- {g['date']} | {g['client']} | {g['plant']} | {g['volume']:.2f} m³")
+            yield f"-- {g['date']} | {g['client']} | {g['plant']} | {g['volume']:.2f} m³"
+
+
+def generate_migration_sql(groups, orders_data, title_line, plant_label="PLANT 2 (TIJUANA)", order_index=None,
+                           sql_format='insert', batch_size=DEFAULT_BATCH_SIZE, order_totals='per-order',
+                           profiler=NULL_PROFILER, validate=False, validate_snapshot=None):
+    if order_index is None:
+        order_index = OrderIndex(orders_data)
+    matched = list(profiler.iter_stage('match', match_groups(groups, order_index), rows_in=len(groups)))
+    if validate:
+        validate_matched(matched, validate_snapshot, profiler)
+    sql = '\n'.join(profiler.iter_stage(
+        'render', iter_migration_sql(matched, title_line, plant_label, sql_format, batch_size, order_totals),
+        rows_in=len(matched),
+    ))
+    return sql, unmatched_summary(matched)
+
 
-    return '\n'.join(sql_parts), unmatched_groups
+def write_migration_sql(output_path, chunks, buffer_size=1 << 20):
+    """Write newline-joined chunks straight to disk (same bytes as '\\n'.join(chunks))."""
+    with open(output_path, 'w', encoding='utf-8', buffering=buffer_size) as f:
+        sep = ''
+        for chunk in chunks:
+            f.write(sep)
+            f.write(chunk)
+            sep = '\n'
+
+
+class NoRemisionesError(ValueError):
+    pass
+
+
+def load_exclude_set(path):
+    """One remision number per line (blank lines ignored)."""
+    exclude_set = set()
+    with open(path, 'r', encoding='utf-8') as ef:
+        for line in ef:
+            s = line.strip()
+            if s:
+                exclude_set.add(s)
+    print(f"Exclude list: {len(exclude_set)} remisiones from {path}")
+    return exclude_set
+
+
+def load_orders_json(path):
+    """Orders snapshot as a list of OrderRef."""
+    with open(path, 'r') as f:
+        orders_data = [OrderRef.from_json(o) for o in json.load(f)]
+    print(f"Loaded {len(orders_data)} orders from {path}")
+    return orders_data
+
+
+def load_orders_snapshot(path, cache=None):
+    """(orders_data, OrderIndex) for an orders JSON; both come from one pickle on a cache hit."""
+    def build():
+        orders_data = load_orders_json(path)
+        return orders_data, OrderIndex(orders_data)
+
+    (orders_data, order_index), hit = cached_value(cache, 'orders', PARSER_VERSION, [path], build)
+    if hit:
+        print(f"Loaded {len(orders_data)} orders from {path} (parse cache)")
+    return orders_data, order_index
+
+
+def generate_migration_file(csv_path, orders_data, output_sql, title_line, plant_label="PLANT 2 (TIJUANA)",
+                            exclude_set=frozenset(), stream=False, sql_format='insert',
+                            batch_size=DEFAULT_BATCH_SIZE, order_totals='per-order', order_index=None,
+                            cache=None, emitted_among=None, profiler=NULL_PROFILER, validate=False,
+                            validate_snapshot=None, group_backend='dict', profile=INGEST_PROFILE,
+                            clients=CLIENT_SCOPE):
+    """
+    One CSV + orders snapshot -> one .sql file. Returns (group_count, unmatched_groups).
+
+    Pass a prebuilt ``order_index`` to share one parsed snapshot across several CSVs
+    (see generate_pumping_batch.py). ``cache`` (migration_tools.cache.ParseCache) is used
+    for the parsed CSV outside --stream mode. ``emitted_among`` (--incremental, see
+    skip_emitted) filters out remisiones other migrations already insert. ``profiler``
+    (migration_tools.profiling) times each stage. With ``validate`` the matched groups are
+    reconciled (against ``validate_snapshot`` when given) before anything is written.
+    ``group_backend`` picks group_remisiones' backend ('columnar': migration_tools/columnar.py).
+    ``profile`` (migration_tools/ingest.py) reads the CSV and ``clients`` picks the alias scope,
+    so other months' exports go through the same matching and SQL (see generate_pumping_batch.py).
+    Raises NoRemisionesError when nothing is left to import, ValidationError on mismatches.
+    """
+    if order_index is None:
+        order_index = OrderIndex(orders_data)
+    skipped_exclude = []
+    skipped_emitted = []
+    if stream:
+        remisiones = exclude_remisiones(iter_parsed(csv_path, profiler=profiler, profile=profile), exclude_set,
+                                        skipped_exclude)
+        if emitted_among:
+            remisiones = profiler.iter_stage(
+                'skip_emitted', skip_emitted(remisiones, emitted_among, skipped_emitted), upstream='parse',
+            )
+        with profiler.stage('group') as st:
+            groups = group_remisiones(remisiones, group_backend, clients)
+            streamed = sum(len(g.remisiones) for g in groups.values())
+            st.rows_in, st.rows_out = streamed, len(groups)
+        print(f"Streamed {streamed} remisiones from {csv_path} into {len(groups)} groups")
+        if skipped_exclude:
+            print(f"Skipped {len(skipped_exclude)} (already in DB / exclude list): {', '.join(sorted(skipped_exclude))}")
+        if skipped_emitted:
+            print(f"Skipped {len(skipped_emitted)} (already in supabase/migrations): {', '.join(sorted(skipped_emitted))}")
+        if not groups:
+            raise NoRemisionesError('No remisiones left to import after exclusions.')
+
+        matched = list(profiler.iter_stage('match', match_groups(groups, order_index), rows_in=len(groups)))
+        if validate:
+            validate_matched(matched, validate_snapshot, profiler)
+        with profiler.stage('write'):
+            write_migration_sql(
+                output_sql,
+                profiler.iter_stage(
+                    'render', iter_migration_sql(matched, title_line, plant_label, sql_format, batch_size, order_totals),
+                    rows_in=len(matched),
+                ),
+            )
+        unmatched = unmatched_summary(matched)
+    else:
+        loaded = load_remisiones(csv_path, cache, profiler, profile)
+        with profiler.stage('filter', rows_in=len(loaded)) as st:
+            remisiones = exclude_remisiones(loaded, exclude_set, skipped_exclude)
+            if emitted_among:
+                remisiones = skip_emitted(remisiones, emitted_among, skipped_emitted)
+            remisiones = list(remisiones)
+            st.rows_out = len(remisiones)
+        print(f"Parsed {len(remisiones)} remisiones from {csv_path}")
+        if skipped_exclude:
+            print(f"Skipped {len(skipped_exclude)} (already in DB / exclude list): {', '.join(sorted(skipped_exclude))}")
+        if skipped_emitted:
+            print(f"Skipped {len(skipped_emitted)} (already in supabase/migrations): {', '.join(sorted(skipped_emitted))}")
+        if not remisiones:
+            raise NoRemisionesError('No remisiones left to import after exclusions.')
+
+        with profiler.stage('group', rows_in=len(remisiones)) as st:
+            groups = group_remisiones(remisiones, group_backend, clients)
+            st.rows_out = len(groups)
+        print(f"Grouped into {len(groups)} groups")
+
+        migration_sql, unmatched = generate_migration_sql(
+            groups, orders_data, title_line, plant_label=plant_label, order_index=order_index,
+            sql_format=sql_format, batch_size=batch_size, order_totals=order_totals, profiler=profiler,
+            validate=validate, validate_snapshot=validate_snapshot,
+        )
+
+        with profiler.stage('write'):
+            with open(output_sql, 'w', encoding='utf-8') as f:
+                f.write(migration_sql)
+
+    return len(groups), unmatched
 
 
 def main():
@@ -359,62 +457,93 @@ def main():
         default=None,
         help='Optional: one remision number per line to skip (e.g. already in DB as BOMBEO)',
     )
+    parser.add_argument(
+        '--stream',
+        action='store_true',
+        help='Pipeline mode: parse -> group -> match -> render straight to --output-sql '
+             '(no parsed-row list or SQL text held in memory; groups still keep their remisiones)',
+    )
+    parser.add_argument('--ingest-profile', default=INGEST_PROFILE, choices=sorted(PROFILES),
+                        help='CSV layout (migration_tools/ingest.py), e.g. january-2026 or p004p-march-2026')
+    parser.add_argument('--clients', default=CLIENT_SCOPE, choices=CLIENT_SCOPES,
+                        help='client_aliases.json "generators" scope used to resolve CLIENTE')
+    add_sql_format_args(parser)
+    add_cache_args(parser)
+    add_incremental_args(parser)
+    add_profile_args(parser)
+    add_validate_args(parser)
+    add_group_backend_args(parser)
     args = parser.parse_args()
+    cache = cache_from_args(args)
+    profiler = profiler_from_args(args)
 
     exclude_set = set()
     if args.exclude_remisiones_file:
         try:
-            with open(args.exclude_remisiones_file, 'r', encoding='utf-8') as ef:
-                for line in ef:
-                    s = line.strip()
-                    if s:
-                        exclude_set.add(s)
-            print(f"Exclude list: {len(exclude_set)} remisiones from {args.exclude_remisiones_file}")
+            exclude_set = load_exclude_set(args.exclude_remisiones_file)
         except FileNotFoundError:
             print(f"Exclude file not found: {args.exclude_remisiones_file}")
             sys.exit(1)
 
+    emitted_index = None
+    emitted_among = None
+    if args.incremental:
+        with profiler.stage('emitted_index'):
+            emitted_index = open_emitted_index(args.migrations_dir, args.emitted_index)
+        emitted_among = partial(emitted_index.emitted_among, ignore_paths=[args.output_sql])
+
     try:
-        with open(args.orders_json, 'r') as f:
-            orders_data = json.load(f)
-        print(f"Loaded {len(orders_data)} orders from {args.orders_json}")
+        with profiler.stage('load_orders') as st:
+            orders_data, order_index = load_orders_snapshot(args.orders_json, cache)
+            st.rows_out = len(orders_data)
     except FileNotFoundError:
         print(f"Missing {args.orders_json}. Run the matching fetch script with .env.local loaded.")
         sys.exit(1)
 
-    csv_rows = parse_csv(args.csv)
-    remisiones = []
-    skipped_exclude = []
-    for r in csv_rows:
-        p = parse_remision(r)
-        if p:
-            num = str(p['remision_number']).strip()
-            if num in exclude_set:
-                skipped_exclude.append(num)
-                continue
-            remisiones.append(p)
-    print(f"Parsed {len(remisiones)} remisiones from {args.csv}")
-    if skipped_exclude:
-        print(f"Skipped {len(skipped_exclude)} (already in DB / exclude list): {', '.join(sorted(skipped_exclude))}")
-    if not remisiones:
-        print('ERROR: No remisiones left to import after exclusions.')
-        sys.exit(1)
-
-    groups = group_remisiones(remisiones)
-    print(f"Grouped into {len(groups)} groups")
-
-    migration_sql, unmatched = generate_migration_sql(
-        groups, orders_data, args.title, plant_label=args.plant_label
-    )
+    validate_snapshot = None
+    if args.validate:
+        snapshot_path = args.validate_snapshot or args.orders_json
+        try:
+            validate_snapshot = snapshot_for_validation(snapshot_path)
+        except FileNotFoundError:
+            print(f"Missing {snapshot_path}.")
+            sys.exit(1)
 
-    with open(args.output_sql, 'w', encoding='utf-8') as f:
-        f.write(migration_sql)
+    try:
+        group_count, unmatched = generate_migration_file(
+            args.csv, orders_data, args.output_sql, args.title,
+            plant_label=args.plant_label,
+            exclude_set=exclude_set,
+            stream=args.stream,
+            sql_format=args.sql_format,
+            batch_size=args.batch_size,
+            order_totals=args.order_totals,
+            order_index=order_index,
+            cache=cache,
+            emitted_among=emitted_among,
+            profiler=profiler,
+            validate=args.validate,
+            validate_snapshot=validate_snapshot,
+            group_backend=args.group_backend,
+            profile=args.ingest_profile,
+            clients=args.clients,
+        )
+    except NoRemisionesError as e:
+        print(f"ERROR: {e}")
+        sys.exit(1)
+    except ValidationError as e:
+        print(f"ERROR: {e}. Nothing written to {args.output_sql}")
+        sys.exit(1)
+    finally:
+        if emitted_index is not None:
+            emitted_index.close()
 
     print(f"\nGenerated {args.output_sql}")
-    print(f"Groups: {len(groups)}, Unmatched: {len(unmatched)}")
+    print(f"Groups: {group_count}, Unmatched: {len(unmatched)}")
     if unmatched:
         for g in unmatched:
             print(f"  {g['date']} | {g['client']} | {g['volume']:.2f} m³")
+    finish_profile(profiler, args, script='generate_plant2_pumping_migration', output_sql=args.output_sql)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Run many pumping migration jobs (months x plants) through generate_plant2_pumping_migration
+in one process pool. Each job names the ingest profile its CSV is read with (``profile``,
+migration_tools/ingest.py PROFILES) and the client alias scope (``clients``, a
+client_aliases.json "generators" value), so exports without a generator of their own
+(November, December) go through the same grouping, order matching and SQL. January and the
+P004P exports are rejected: their own generators keep the reviewed maps.
+
+Manifest (JSON, paths relative to the repo root):
+  {
+    "defaults": {"sql_format": "insert", "order_totals": "per-order"},
+    "jobs": [
+      {"csv": "archive/data/RELACION BOMBEO FEB.csv",
+       "orders_json": "archive/data/february_orders.json",
+       "output_sql": "supabase/migrations/20260203_february_pumping_remisiones_p2.sql",
+       "title": "FEBRUARY 2026", "plant_label": "PLANT 2 (TIJUANA)"}
+    ]
+  }
+
+Optional per-job (or default) keys: profile, clients, exclude_remisiones_file, stream,
+sql_format, batch_size, order_totals, group_backend, incremental. A job whose CSV or orders
+snapshot is not in the tree (e.g. not fetched yet with migration_tools.fetch_orders) is
+reported as skipped and does not fail the batch; any error inside a job does. With incremental, the emitted-remisiones index is
+refreshed once before the pool starts and each job skips what other migrations (not its
+own output_sql) already insert. Each distinct orders snapshot is parsed and indexed once in the
+parent; workers inherit it through fork (with the spawn start method each worker parses
+a snapshot at most once). Parsed CSVs and snapshots go through the shared parse cache
+(see migration_tools/cache.py; --no-cache to bypass).
+
+Example:
+  python3 generate_pumping_batch.py --manifest migration_tools/batch_manifest.example.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import generate_plant2_pumping_migration as plant2
+from migration_tools.cache import add_cache_args, cache_from_args
+from migration_tools.emitted import add_incremental_args, open_emitted_index
+from migration_tools.ingest import get_profile
+from migration_tools.sql import DEFAULT_BATCH_SIZE
+
+REQUIRED_JOB_KEYS = ('csv', 'orders_json', 'output_sql', 'title')
+JOB_DEFAULTS = {
+    'plant_label': 'PLANT 2 (TIJUANA)',
+    'profile': plant2.INGEST_PROFILE,
+    'clients': plant2.CLIENT_SCOPE,
+    'exclude_remisiones_file': None,
+    'stream': False,
+    'sql_format': 'insert',
+    'batch_size': DEFAULT_BATCH_SIZE,
+    'order_totals': 'per-order',
+    'group_backend': 'dict',
+    'incremental': False,
+}
+
+# Exports with their own generator (reviewed map / solver with a low-confidence check), which
+# the plant-2 date/client matcher must not replace.
+DEDICATED_PROFILES = {
+    'january-2026': 'generate_january_migration.py',
+    'p004p-february-2026': 'generate_p004p_february_migration.py',
+    'p004p-march-2026': 'generate_p004p_march_migration.py',
+}
+
+# orders_json path -> (orders_data, OrderIndex). Filled by the parent before the pool forks.
+_SNAPSHOTS = {}
+
+
+def load_manifest(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    defaults = {**JOB_DEFAULTS, **manifest.get('defaults', {})}
+    jobs = []
+    for i, raw in enumerate(manifest['jobs']):
+        missing = [k for k in REQUIRED_JOB_KEYS if not raw.get(k)]
+        if missing:
+            raise ValueError(f"Job #{i + 1} in {path} is missing {', '.join(missing)}")
+        job = {**defaults, **raw}
+        get_profile(job['profile'])
+        if job['profile'] in DEDICATED_PROFILES:
+            raise ValueError(f"Job #{i + 1} in {path}: {job['profile']} exports are generated by "
+                             f"{DEDICATED_PROFILES[job['profile']]}, not the plant-2 matcher")
+        if not isinstance(job['batch_size'], int) or job['batch_size'] < 1:
+            raise ValueError(f"Job #{i + 1} in {path}: batch_size must be an int >= 1, got {job['batch_size']!r}")
+        if job['clients'] not in plant2.CLIENT_SCOPES:
+            raise ValueError(f"Job #{i + 1} in {path}: unknown clients {job['clients']!r}; "
+                             f"expected one of {plant2.CLIENT_SCOPES}")
+        jobs.append(job)
+    return jobs
+
+
+def _snapshot(orders_json, cache=None):
+    snap = _SNAPSHOTS.get(orders_json)
+    if snap is None:
+        snap = _SNAPSHOTS[orders_json] = plant2.load_orders_snapshot(orders_json, cache)
+    return snap
+
+
+def run_job(job, cache=None, emitted_index=None):
+    """Worker: generate one .sql, capturing the generator's console output."""
+    log = io.StringIO()
+    result = {'job': job, 'groups': 0, 'unmatched': [], 'error': None, 'skipped': None}
+    t0 = time.perf_counter()
+    absent = [job[k] for k in ('csv', 'orders_json') if not os.path.exists(job[k])]
+    if absent:
+        result['skipped'] = f"not in tree: {', '.join(absent)}"
+        result['seconds'] = time.perf_counter() - t0
+        result['log'] = ''
+        return result
+    with contextlib.redirect_stdout(log), contextlib.ExitStack() as stack:
+        try:
+            orders_data, order_index = _snapshot(job['orders_json'], cache)
+            exclude_set = frozenset()
+            if job['exclude_remisiones_file']:
+                exclude_set = plant2.load_exclude_set(job['exclude_remisiones_file'])
+            emitted_among = None
+            if job['incremental']:
+                index = stack.enter_context(open_emitted_index(index_path=emitted_index, refresh=False))
+                emitted_among = partial(index.emitted_among, ignore_paths=[job['output_sql']])
+            result['groups'], result['unmatched'] = plant2.generate_migration_file(
+                job['csv'], orders_data, job['output_sql'], job['title'],
+                plant_label=job['plant_label'],
+                exclude_set=exclude_set,
+                stream=job['stream'],
+                sql_format=job['sql_format'],
+                batch_size=job['batch_size'],
+                order_totals=job['order_totals'],
+                order_index=order_index,
+                cache=cache,
+                emitted_among=emitted_among,
+                group_backend=job['group_backend'],
+                profile=job['profile'],
+                clients=job['clients'],
+            )
+        except Exception as e:
+            # Any failure is this job's result: the pool must not lose the other jobs' reports.
+            result['error'] = f"{type(e).__name__}: {e}"
+    result['seconds'] = time.perf_counter() - t0
+    result['log'] = log.getvalue()
+    return result
+
+
+def run_jobs(jobs, workers, cache=None, emitted_index=None):
+    """Run jobs serially (workers <= 1) or in a process pool; results keep manifest order."""
+    if workers <= 1 or len(jobs) <= 1:
+        return [run_job(job, cache, emitted_index) for job in jobs]
+
+    start_methods = multiprocessing.get_all_start_methods()
+    ctx = multiprocessing.get_context('fork' if 'fork' in start_methods else None)
+    if ctx.get_start_method() == 'fork':
+        for orders_json in sorted({job['orders_json'] for job in jobs}):
+            with contextlib.redirect_stdout(io.StringIO()):
+                try:
+                    _snapshot(orders_json, cache)
+                except Exception:
+                    pass  # reported per job by run_job
+    with ProcessPoolExecutor(max_workers=min(workers, len(jobs)), mp_context=ctx) as pool:
+        return list(pool.map(partial(run_job, cache=cache, emitted_index=emitted_index), jobs))
+
+
+def print_summary(results):
+    print("\n=== Jobs ===")
+    for r in results:
+        job = r['job']
+        if r['error']:
+            status = f"ERROR {r['error']}"
+        elif r['skipped']:
+            status = f"SKIPPED ({r['skipped']})"
+        else:
+            status = f"groups={r['groups']} unmatched={len(r['unmatched'])}"
+        print(f"{job['title']} | {job['plant_label']} | {status} | {r['seconds']:.2f} s -> {job['output_sql']}")
+
+    unmatched = [(r['job'], g) for r in results for g in r['unmatched']]
+    print(f"\n=== Unmatched groups ({len(unmatched)}) ===")
+    for job, g in unmatched:
+        print(f"  {job['title']} | {job['plant_label']} | {g['date']} | {g['client']} | {g['plant']} | {g['volume']:.2f} m³")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate many pumping migrations from a manifest')
+    parser.add_argument('--manifest', required=True, help='Jobs JSON (see module docstring)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Process pool size (1 = serial)')
+    parser.add_argument('--verbose', action='store_true', help='Print each job log after it finishes')
+    parser.add_argument('--summary-json', default=None, help='Optional: write per-job results + unmatched groups')
+    add_cache_args(parser)
+    add_incremental_args(parser)
+    args = parser.parse_args()
+
+    try:
+        jobs = load_manifest(args.manifest)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"ERROR: cannot read manifest {args.manifest}: {e}")
+        sys.exit(1)
+
+    if args.incremental:
+        for job in jobs:
+            job['incremental'] = True
+    if any(job['incremental'] for job in jobs):
+        open_emitted_index(args.migrations_dir, args.emitted_index).close()
+
+    t0 = time.perf_counter()
+    results = run_jobs(jobs, args.workers, cache_from_args(args), args.emitted_index)
+    elapsed = time.perf_counter() - t0
+
+    if args.verbose:
+        for r in results:
+            print(f"\n--- {r['job']['title']} | {r['job']['plant_label']} ---")
+            print(r['log'].rstrip())
+    print_summary(results)
+    slowest = max((r['seconds'] for r in results), default=0.0)
+    print(f"\n{len(jobs)} jobs in {elapsed:.2f} s (slowest job {slowest:.2f} s, workers={args.workers})")
+
+    if args.summary_json:
+        with open(args.summary_json, 'w', encoding='utf-8') as f:
+            json.dump(
+                [{k: v for k, v in r.items() if k != 'log'} for r in results],
+                f, indent=2, ensure_ascii=False,
+            )
+
+    if any(r['error'] for r in results):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
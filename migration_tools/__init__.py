@@ -0,0 +1,6 @@
+"""
+Shared helpers for the root-level ``generate_*_migration.py`` SQL generators.
+
+Run generators from the repo root (``python3 generate_plant2_pumping_migration.py``)
+so this package is importable next to them.
+"""
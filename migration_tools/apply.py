@@ -0,0 +1,260 @@
+"""
+Apply pumping migrations to Postgres from Python, over a connection pool.
+
+Optional dependency: psycopg 3 (``pip install "psycopg[binary,pool]"``); psycopg_pool is
+used when installed, otherwise each migration opens its own connection. Nothing else in
+migration_tools imports this module, so the generators keep working without it.
+
+Two inputs, each applied in ONE transaction with a StepTiming per step:
+
+* ``apply_rows``: the generator rows (see migration_tools.sql). STEP 1 is an executemany
+  of a server-side prepared INSERT into order_items, STEP 2 a ``COPY remisiones FROM
+  STDIN`` (or a prepared executemany, ``remisiones_mode='executemany'``), STEP 3 one
+  set-based UPDATE of orders.total_amount over ``unnest(order_ids)``. Values are the .2f
+  the SQL literals carry, created_at is the transaction's now(), as with NOW().
+* ``apply_sql``: a generated .sql file (insert / values formats), split on its
+  ``-- STEP n`` markers and run section by section. COPY-format files need psql.
+
+``rollback=True`` runs everything and rolls back: per-step timings (the remisiones
+triggers included) against a scratch database without keeping the rows.
+
+  python3 -m migration_tools.apply --dsn postgresql://postgres@localhost:55432/postgres \\
+    --rollback supabase/migrations/20260406_p2_march_2026_pumping_remisiones.sql
+"""
+import argparse
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from pathlib import Path
+
+from migration_tools.sql import ORDER_ITEM_COLUMNS, REMISION_COLUMNS
+
+try:
+    import psycopg
+except ImportError:  # optional: only needed to apply
+    psycopg = None
+
+try:
+    from psycopg_pool import ConnectionPool
+except ImportError:
+    ConnectionPool = None
+
+REMISIONES_MODES = ('copy', 'executemany')
+
+ORDER_ITEM_INSERT = (
+    f"INSERT INTO order_items ({', '.join(ORDER_ITEM_COLUMNS)}) "
+    "VALUES (%s, 'SERVICIO DE BOMBEO', %s, %s, %s, true, %s, %s, NULL, %s, NULL)"
+)
+REMISION_INSERT = (
+    f"INSERT INTO remisiones ({', '.join(REMISION_COLUMNS)}) "
+    "VALUES (%s, %s, %s, '08:00:00'::time, %s, 'BOMBEO', %s, %s, %s, %s)"
+)
+REMISION_COPY = f"COPY remisiones ({', '.join(REMISION_COLUMNS)}) FROM STDIN"
+ORDER_TOTALS_UPDATE = """
+UPDATE orders AS o
+SET total_amount = t.total_amount
+FROM (
+  SELECT v.order_id, COALESCE(SUM(oi.total_price), 0) AS total_amount
+  FROM unnest(%s::uuid[]) AS v(order_id)
+  LEFT JOIN order_items AS oi ON oi.order_id = v.order_id
+  GROUP BY v.order_id
+) AS t
+WHERE o.id = t.order_id"""
+
+_STEP_RE = re.compile(r'^-- (STEP \d+)\b.*$', re.M)
+_TXN_RE = re.compile(r'^\s*(BEGIN|COMMIT)\s*;\s*$', re.M | re.I)
+_COPY_STDIN_RE = re.compile(r'\bCOPY\b[^;]*\bFROM\s+STDIN\b', re.I)
+
+
+class ApplyError(RuntimeError):
+    pass
+
+
+class _Rollback(Exception):
+    pass
+
+
+class StepTiming:
+    __slots__ = ('step', 'rows', 'seconds')
+
+    def __init__(self, step, rows, seconds):
+        self.step = step
+        self.rows = rows
+        self.seconds = seconds
+
+    def __repr__(self):
+        return f"StepTiming({self.step!r}, rows={self.rows}, {self.seconds:.3f} s)"
+
+
+class ApplyResult:
+    def __init__(self, name, steps, committed):
+        self.name = name
+        self.steps = steps
+        self.committed = committed
+
+    @property
+    def seconds(self):
+        return sum(s.seconds for s in self.steps)
+
+    def report(self):
+        lines = [f"{self.name}: {'committed' if self.committed else 'rolled back'} in {self.seconds:.3f} s"]
+        for s in self.steps:
+            rows = '' if s.rows is None else f" rows={s.rows}"
+            lines.append(f"  {s.step:<28} {s.seconds:8.3f} s{rows}")
+        return '\n'.join(lines)
+
+
+def _money(value):
+    """The value a .2f SQL literal carries."""
+    return Decimal(f"{value:.2f}")
+
+
+def split_sql_steps(text):
+    """Generated migration -> [(step, sql)]; the script's own BEGIN/COMMIT are dropped."""
+    if _COPY_STDIN_RE.search(text):
+        raise ApplyError('COPY ... FROM STDIN migrations (--sql-format copy) need psql -f')
+    text = _TXN_RE.sub('', text)
+    marks = list(_STEP_RE.finditer(text))
+    if not marks:
+        return [('script', text)]
+    sections = []
+    header = text[:marks[0].start()]
+    if any(line.strip() and not line.lstrip().startswith('--') for line in header.splitlines()):
+        sections.append(('header', header))
+    for i, m in enumerate(marks):
+        end = marks[i + 1].start() if i + 1 < len(marks) else len(text)
+        sections.append((m.group(1), text[m.start():end]))
+    return sections
+
+
+class MigrationApplier:
+    """
+    Applies migrations through a pool of ``max_size`` connections (psycopg_pool when
+    installed). ``prepare_threshold=0`` makes psycopg prepare every parametrized statement
+    server-side on first use; ``connect_kwargs`` go to each connection (e.g.
+    ``options='-c search_path=scratch'``).
+    """
+
+    def __init__(self, dsn, max_size=4, prepare_threshold=0, **connect_kwargs):
+        if psycopg is None:
+            raise ApplyError('psycopg 3 is not installed (pip install "psycopg[binary,pool]")')
+        self.dsn = dsn
+        self.max_size = max_size
+        self.connect_kwargs = {'prepare_threshold': prepare_threshold, **connect_kwargs}
+        self.pool = None
+        if ConnectionPool is not None:
+            self.pool = ConnectionPool(dsn, min_size=1, max_size=max_size, kwargs=self.connect_kwargs, open=True)
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def connection(self):
+        """Context manager yielding a pooled (or fresh) connection."""
+        if self.pool is not None:
+            return self.pool.connection()
+        return psycopg.connect(self.dsn, **self.connect_kwargs)
+
+    def _run(self, name, steps, rollback):
+        """Run [(step, fn(conn) -> rows)] in one transaction; returns ApplyResult."""
+        timings = []
+        with self.connection() as conn:
+            try:
+                with conn.transaction():
+                    for step, fn in steps:
+                        t0 = time.perf_counter()
+                        rows = fn(conn)
+                        timings.append(StepTiming(step, rows, time.perf_counter() - t0))
+                    if rollback:
+                        raise _Rollback()
+            except _Rollback:
+                return ApplyResult(name, timings, committed=False)
+        return ApplyResult(name, timings, committed=True)
+
+    def apply_rows(self, order_item_rows, remision_rows, order_ids=None, name='rows',
+                   remisiones_mode='copy', rollback=False):
+        """STEP 1/2/3 from generator rows. ``order_ids`` defaults to the order_item rows' orders."""
+        if remisiones_mode not in REMISIONES_MODES:
+            raise ValueError(f"Unknown remisiones_mode {remisiones_mode!r}; expected one of {REMISIONES_MODES}")
+        order_item_rows = list(order_item_rows)
+        remision_rows = list(remision_rows)
+        if order_ids is None:
+            order_ids = sorted({row[0] for row in order_item_rows})
+        now = []
+
+        def order_items(conn):
+            now.append(conn.execute('SELECT now()').fetchone()[0])
+            with conn.cursor() as cur:
+                cur.executemany(ORDER_ITEM_INSERT, [
+                    (order_id, _money(volume), _money(unit_price), _money(total_price),
+                     _money(unit_price), _money(volume), now[0])
+                    for order_id, volume, unit_price, total_price in order_item_rows
+                ])
+            return len(order_item_rows)
+
+        def remisiones(conn):
+            params = (
+                (order_id, remision_number, date_str, _money(volumen), conductor or None, unidad, plant_id)
+                for order_id, remision_number, date_str, volumen, conductor, unidad, plant_id in remision_rows
+            )
+            with conn.cursor() as cur:
+                if remisiones_mode == 'copy':
+                    with cur.copy(REMISION_COPY) as copy:
+                        for order_id, number, date_str, volumen, conductor, unidad, plant_id in params:
+                            copy.write_row((order_id, number, date_str, '08:00:00', volumen, 'BOMBEO',
+                                            conductor, unidad, plant_id, now[0]))
+                else:
+                    cur.executemany(REMISION_INSERT, [(*p, now[0]) for p in params])
+            return len(remision_rows)
+
+        def order_totals(conn):
+            return conn.execute(ORDER_TOTALS_UPDATE, (list(order_ids),)).rowcount
+
+        return self._run(name, [
+            ('STEP 1 order_items', order_items),
+            (f'STEP 2 remisiones ({remisiones_mode})', remisiones),
+            ('STEP 3 order totals', order_totals),
+        ], rollback)
+
+    def apply_sql(self, sql_or_path, name=None, rollback=False):
+        """A generated .sql script (text or path), one transaction, timed per STEP section."""
+        if isinstance(sql_or_path, Path) or (isinstance(sql_or_path, str) and sql_or_path.endswith('.sql')):
+            name = name or str(sql_or_path)
+            sql_or_path = Path(sql_or_path).read_text(encoding='utf-8')
+        sections = split_sql_steps(sql_or_path)
+        return self._run(name or 'sql', [
+            (step, lambda conn, sql=sql: conn.execute(sql, prepare=False).rowcount)
+            for step, sql in sections
+        ], rollback)
+
+    def apply_many(self, paths, rollback=False):
+        """Several migration files concurrently, one transaction (and pooled connection) each."""
+        with ThreadPoolExecutor(max_workers=self.max_size) as pool:
+            return list(pool.map(lambda p: self.apply_sql(p, rollback=rollback), paths))
+
+
+def main():
+    ap = argparse.ArgumentParser(description='Apply generated pumping migrations to Postgres')
+    ap.add_argument('sql', nargs='+', help='Generated migration .sql files (insert/values formats)')
+    ap.add_argument('--dsn', required=True, help='Postgres DSN (use a scratch database for trials)')
+    ap.add_argument('--pool-size', type=int, default=4, help='Connections / migrations applied at once')
+    ap.add_argument('--rollback', action='store_true', help='Run and time everything, then roll back')
+    args = ap.parse_args()
+    try:
+        with MigrationApplier(args.dsn, max_size=args.pool_size) as applier:
+            for result in applier.apply_many(args.sql, rollback=args.rollback):
+                print(result.report())
+    except ApplyError as e:
+        print(f"ERROR: {e}")
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,428 @@
+"""
+Volume-based pump remision -> order assignment (replaces hand-built REMISION_TO_ORDER maps).
+
+Pump trips (rows of a BOMBEO CSV) are assigned to *slots* from an orders snapshot:
+
+* an order that lists its concrete remisiones (``concrete_remisiones``: ``remision_number``,
+  ``fecha``, ``volumen_fabricado``; see scripts/fetch-p004p-march-orders.ts) gives one slot
+  per concrete remision, so each pump trip pairs with the concrete load it pumped;
+* any other order is one slot of capacity ``order_capacity`` with the order's
+  ``concrete_volume`` (if present) and delivery date.
+
+A trip may only use a slot of the same plant and client (trips whose client is unknown may
+use any client of the plant, at a penalty) within ``max_days`` of its date. The cost of a
+pair adds, each scaled to 0..1 and weighted by ``Weights``:
+
+  date    days apart / max_days
+  volume  |pump m3 - concrete m3| / max(both)        (0.5 when either is unknown)
+  number  |pump number - concrete number| / number_window, capped at 1
+          (1 when either is not numeric: no evidence)
+
+and leaving a trip unassigned costs ``unmatched_cost``. The total is minimized exactly
+(min-cost bipartite assignment with slot capacities) by successive shortest paths: trips
+are added one at a time and each one augments along a Dijkstra shortest path over reduced
+costs, stopping as soon as the sink is reached. Each trip only keeps its
+``max_candidates`` cheapest slots, so a month of 5000 trips solves in about a second
+(migration_tools.benchmarks.assignment, which also checks optimality against a dense
+Hungarian reference).
+
+Exact cost ties (common when a snapshot has neither volumes nor concrete remisiones) are
+broken by rule, not by edge order: the solver runs on integer keys that order pairs by
+cost, then by |pump number - concrete number|, then by order id, lower remision numbers
+taking lower order ids (``tie_break_edges``).
+
+Every match is returned with the reasons it is low-confidence (if any): a near-tie with
+the trip's next best slot, dates more than a day apart, a volume off by more than
+``volume_tolerance``, or no volume / number evidence at all.
+"""
+import heapq
+import json
+from bisect import bisect_left, bisect_right
+
+from migration_tools.clients import default_resolver
+from migration_tools.orders import delivery_date_str, to_ordinal
+from migration_tools.remision_index import normalize_remision_number
+
+UNMATCHED = -1
+COST_RESOLUTION = 10 ** 9  # costs closer than 1e-9 are ties
+NUMBER_GAP_CAP = 10 ** 6   # remision-number distance when either number is unknown
+
+
+class LowConfidenceError(ValueError):
+    """The solved map has low-confidence or unmatched pairs and they were not accepted."""
+
+
+class Weights:
+    __slots__ = ('date', 'volume', 'number', 'unknown_client')
+
+    def __init__(self, date=1.0, volume=1.0, number=1.0, unknown_client=0.5):
+        self.date = date
+        self.volume = volume
+        self.number = number
+        self.unknown_client = unknown_client
+
+
+class Trip:
+    """One pump remision to place."""
+
+    __slots__ = ('remision_number', 'number', 'ordinal', 'volume', 'client_id', 'plant_id')
+
+    def __init__(self, remision_number, fecha, volume, client_id, plant_id):
+        self.remision_number = remision_number
+        self.number = normalize_remision_number(remision_number)
+        self.ordinal = to_ordinal(fecha)
+        self.volume = volume
+        self.client_id = client_id
+        self.plant_id = plant_id
+
+
+class Slot:
+    """A concrete remision of an order, or a whole order (``capacity`` trips)."""
+
+    __slots__ = ('order_id', 'remision_number', 'number', 'ordinal', 'volume', 'client_id', 'plant_id', 'capacity')
+
+    def __init__(self, order_id, remision_number, fecha, volume, client_id, plant_id, capacity=1):
+        self.order_id = order_id
+        self.remision_number = remision_number
+        self.number = normalize_remision_number(remision_number)
+        self.ordinal = to_ordinal(fecha)
+        self.volume = volume
+        self.client_id = client_id
+        self.plant_id = plant_id
+        self.capacity = capacity
+
+
+class Match:
+    __slots__ = ('trip', 'slot', 'cost', 'runner_up', 'reasons')
+
+    def __init__(self, trip, slot, cost, runner_up, reasons):
+        self.trip = trip
+        self.slot = slot
+        self.cost = cost
+        self.runner_up = runner_up
+        self.reasons = reasons
+
+    @property
+    def order_id(self):
+        return self.slot.order_id
+
+    @property
+    def low_confidence(self):
+        return bool(self.reasons)
+
+
+def slots_from_orders(orders_data, order_capacity=1):
+    """Orders snapshot (list of dicts) -> list of Slot, in snapshot order."""
+    slots = []
+    for order in orders_data:
+        delivery = delivery_date_str(order['delivery_date'])
+        concrete = order.get('concrete_remisiones') or ()
+        for rem in concrete:
+            slots.append(Slot(
+                order['id'], rem.get('remision_number'), delivery_date_str(rem.get('fecha') or delivery),
+                rem.get('volumen_fabricado'), order.get('client_id'), order.get('plant_id'),
+            ))
+        if not concrete:
+            slots.append(Slot(
+                order['id'], None, delivery, order.get('concrete_volume'),
+                order.get('client_id'), order.get('plant_id'), order_capacity,
+            ))
+    return slots
+
+
+def trips_from_remisiones(remisiones, plant_id, resolve_client=None):
+    """Remision records -> Trips; ``resolve_client`` (ClientResolver.resolve) maps cliente."""
+    trips = []
+    for r in remisiones:
+        client = resolve_client(r.cliente) if resolve_client and r.cliente else None
+        trips.append(Trip(r.remision_number, r.fecha, r.volumen_fabricado, client.id if client else None, plant_id))
+    return trips
+
+
+class _Candidates:
+    """Slots bucketed by (plant, client) and by plant, sorted by date, for window lookups."""
+
+    def __init__(self, slots):
+        by_client = {}
+        by_plant = {}
+        for j, s in enumerate(slots):
+            by_client.setdefault((s.plant_id, s.client_id), []).append((s.ordinal, j))
+            by_plant.setdefault(s.plant_id, []).append((s.ordinal, j))
+        self._buckets = {}
+        for key, entries in list(by_client.items()) + [((p, None), e) for p, e in by_plant.items()]:
+            entries.sort()
+            self._buckets[key] = ([o for o, _ in entries], [j for _, j in entries])
+
+    def window(self, plant_id, client_id, ordinal, max_days):
+        bucket = self._buckets.get((plant_id, client_id))
+        if bucket is None:
+            return ()
+        ordinals, idx = bucket
+        return idx[bisect_left(ordinals, ordinal - max_days):bisect_right(ordinals, ordinal + max_days)]
+
+
+def pair_cost(trip, slot, weights, max_days, number_window):
+    days = abs(trip.ordinal - slot.ordinal)
+    cost = weights.date * (days / max_days if max_days else 0.0)
+    if trip.volume and slot.volume:
+        cost += weights.volume * abs(trip.volume - slot.volume) / max(trip.volume, slot.volume)
+    else:
+        cost += weights.volume * 0.5
+    if trip.number is not None and slot.number is not None:
+        cost += weights.number * min(abs(trip.number - slot.number) / number_window, 1.0)
+    else:
+        cost += weights.number
+    if trip.client_id is None:
+        cost += weights.unknown_client
+    return cost
+
+
+def candidate_edges(trips, slots, weights, max_days, number_window, unmatched_cost, max_candidates):
+    """
+    Per trip: the ``max_candidates`` cheapest (slot index, cost) with cost below
+    unmatched_cost. Same costs as pair_cost, inlined: this loop sees every slot in every
+    trip's date window.
+    """
+    index = _Candidates(slots)
+    s_ordinal = [s.ordinal for s in slots]
+    s_volume = [s.volume for s in slots]
+    s_number = [s.number for s in slots]
+    w_date = weights.date / max_days if max_days else 0.0
+    w_volume, w_number = weights.volume, weights.number
+    edges = []
+    for trip in trips:
+        ordinal, volume, number = trip.ordinal, trip.volume, trip.number
+        base = weights.unknown_client if trip.client_id is None else 0.0
+        pairs = []
+        for j in index.window(trip.plant_id, trip.client_id, ordinal, max_days):
+            cost = base + w_date * abs(ordinal - s_ordinal[j])
+            sv = s_volume[j]
+            if volume and sv:
+                cost += w_volume * abs(volume - sv) / (volume if volume > sv else sv)
+            else:
+                cost += w_volume * 0.5
+            sn = s_number[j]
+            if number is not None and sn is not None:
+                d = abs(number - sn)
+                cost += w_number * (d / number_window if d < number_window else 1.0)
+            else:
+                cost += w_number
+            if cost < unmatched_cost:
+                pairs.append((cost, j))
+        edges.append([(j, c) for c, j in heapq.nsmallest(max_candidates, pairs)])
+    return edges
+
+
+def tie_break_edges(trips, slots, edges, unmatched_cost):
+    """
+    ``edges`` (float costs) -> (integer edges, integer unmatched cost) whose minimum is the
+    float minimum (to COST_RESOLUTION), then the least total remision-number distance, then
+    lower order ids for lower pump remision numbers. Python ints keep every level exact.
+    """
+    order_rank = {oid: r for r, oid in enumerate(sorted({str(s.order_id) for s in slots}))}
+    by_number = sorted(range(len(trips)), key=lambda i: (trips[i].number is None, trips[i].number or 0,
+                                                          str(trips[i].remision_number), i))
+    trip_weight = [0] * len(trips)
+    for position, i in enumerate(by_number):
+        trip_weight[i] = len(trips) - position
+    rank_scale = len(trips) * len(trips) * max(len(order_rank), 1) + 1
+    cost_scale = len(trips) * (NUMBER_GAP_CAP + 1) * rank_scale + 1
+    keyed = []
+    for trip, weight, out in zip(trips, trip_weight, edges):
+        row = []
+        for j, c in out:
+            slot = slots[j]
+            gap = NUMBER_GAP_CAP
+            if trip.number is not None and slot.number is not None:
+                gap = min(abs(trip.number - slot.number), NUMBER_GAP_CAP)
+            row.append((j, round(c * COST_RESOLUTION) * cost_scale + gap * rank_scale
+                        + weight * order_rank[str(slot.order_id)]))
+        keyed.append(row)
+    return keyed, round(unmatched_cost * COST_RESOLUTION) * cost_scale
+
+
+def solve_assignment(edges, capacities, unmatched_cost):
+    """
+    Min-cost assignment of len(edges) trips to slots with ``capacities``; a trip may also
+    stay unassigned at ``unmatched_cost``. ``edges[i]`` lists (slot, cost) for trip i.
+    Returns the slot index per trip (UNMATCHED for none). Integer costs are solved exactly.
+    """
+    n = len(edges)
+    m = len(capacities)
+    sink = n + m
+    pot = [0] * (n + m + 1)
+    assigned = [UNMATCHED] * n
+    assigned_cost = [0] * n
+    holders = [{} for _ in range(m)]  # slot -> ordered set of trips
+    used = [0] * m
+    push = heapq.heappush
+    pop = heapq.heappop
+
+    for start in range(n):
+        out = edges[start]
+        p = pot[sink] - unmatched_cost
+        for j, c in out:
+            p = max(p, pot[n + j] - c)
+        pot[start] = p
+
+        dist = {start: 0}
+        parent = {}
+        done = []
+        seen = set()
+        heap = [(0, 0, start)]
+        tick = 1
+        while heap:
+            d, _, u = pop(heap)
+            if u in seen:
+                continue
+            seen.add(u)
+            done.append(u)
+            if u == sink:
+                break
+            pu = pot[u]
+            if u < n:
+                cur = assigned[u] if u != start else None
+                for j, c in edges[u]:
+                    if j == cur:
+                        continue
+                    v = n + j
+                    nd = d + c + pu - pot[v]
+                    if nd < dist.get(v, float('inf')):
+                        dist[v] = nd
+                        parent[v] = (u, c)
+                        push(heap, (nd, tick, v))
+                        tick += 1
+                if cur != UNMATCHED:
+                    nd = d + unmatched_cost + pu - pot[sink]
+                    if nd < dist.get(sink, float('inf')):
+                        dist[sink] = nd
+                        parent[sink] = (u, unmatched_cost)
+                        push(heap, (nd, tick, sink))
+                        tick += 1
+            else:
+                j = u - n
+                if used[j] < capacities[j]:
+                    nd = d + pu - pot[sink]
+                    if nd < dist.get(sink, float('inf')):
+                        dist[sink] = nd
+                        parent[sink] = (u, 0)
+                        push(heap, (nd, tick, sink))
+                        tick += 1
+                for h in holders[j]:
+                    nd = d - assigned_cost[h] + pu - pot[h]
+                    if nd < dist.get(h, float('inf')):
+                        dist[h] = nd
+                        parent[h] = (u, -assigned_cost[h])
+                        push(heap, (nd, tick, h))
+                        tick += 1
+
+        d_sink = dist[sink]  # always reachable: start -> sink is the unmatched edge
+        for v in done:
+            pot[v] += dist[v] - d_sink
+
+        path = [sink]
+        while path[-1] != start:
+            path.append(parent[path[-1]][0])
+        path.reverse()
+        for u, v in zip(path, path[1:]):
+            if u < n and v == sink:
+                assigned[u] = UNMATCHED
+            elif u < n:
+                j = v - n
+                holders[j][u] = None
+                used[j] += 1
+                assigned[u] = j
+                assigned_cost[u] = parent[v][1]
+            elif v != sink:
+                j = u - n
+                del holders[j][v]
+                used[j] -= 1
+    return assigned
+
+
+def assign(trips, slots, max_days=3, number_window=20, unmatched_cost=2.5, max_candidates=8,
+           weights=None, tie_margin=0.25, volume_tolerance=0.1):
+    """
+    Assign trips to slots. Returns (matches, unmatched_trips); matches are in trip order
+    and carry their low-confidence reasons.
+    """
+    weights = weights or Weights()
+    edges = candidate_edges(trips, slots, weights, max_days, number_window, unmatched_cost, max_candidates)
+    keyed, unmatched_key = tie_break_edges(trips, slots, edges, unmatched_cost)
+    chosen = solve_assignment(keyed, [s.capacity for s in slots], unmatched_key)
+
+    matches = []
+    unmatched = []
+    for trip, out, j in zip(trips, edges, chosen):
+        if j == UNMATCHED:
+            unmatched.append(trip)
+            continue
+        slot = slots[j]
+        cost = next(c for k, c in out if k == j)
+        others = [c for k, c in out if slots[k].order_id != slot.order_id]
+        runner_up = min(others) if others else None
+        matches.append(Match(trip, slot, cost, runner_up, _reasons(
+            trip, slot, cost, runner_up, tie_margin, volume_tolerance, number_window,
+        )))
+    return matches, unmatched
+
+
+def _reasons(trip, slot, cost, runner_up, tie_margin, volume_tolerance, number_window):
+    reasons = []
+    if runner_up is not None and runner_up - cost < tie_margin:
+        reasons.append(f'ambiguous (next order +{runner_up - cost:.2f})')
+    days = abs(trip.ordinal - slot.ordinal)
+    if days > 1:
+        reasons.append(f'{days} days apart')
+    volume_known = bool(trip.volume and slot.volume)
+    if volume_known and abs(trip.volume - slot.volume) > volume_tolerance * max(trip.volume, slot.volume):
+        reasons.append(f'volume {trip.volume:g} vs {slot.volume:g} m3')
+    number_close = (trip.number is not None and slot.number is not None
+                    and abs(trip.number - slot.number) < number_window)
+    if not volume_known and not number_close:
+        reasons.append('no volume / remision number evidence')
+    if trip.client_id is None:
+        reasons.append('client unknown')
+    return reasons
+
+
+def print_assignment_report(matches, unmatched):
+    low = [m for m in matches if m.low_confidence]
+    print(f"Solver: {len(matches)} matched ({len(low)} low-confidence), {len(unmatched)} unmatched")
+    for m in low:
+        print(f"  LOW  {m.trip.remision_number} -> {m.order_id} | cost {m.cost:.2f} | {'; '.join(m.reasons)}")
+    for t in unmatched:
+        print(f"  NONE {t.remision_number} | {t.volume:g} m3 | no order of its plant/client within the date window")
+
+
+def add_assignment_args(parser):
+    parser.add_argument('--orders-json', default=None,
+                        help='Solve remision -> order from this orders snapshot instead of the '
+                             'hard-coded REMISION_TO_ORDER map (see migration_tools/assignment.py)')
+    parser.add_argument('--order-capacity', type=int, default=1,
+                        help='Pump remisiones per order for orders without concrete_remisiones')
+    parser.add_argument('--max-days', type=int, default=3, help='Max days between pump remision and order')
+    parser.add_argument('--accept-low-confidence', action='store_true',
+                        help='Write the migration even when --orders-json leaves low-confidence or '
+                             'unmatched pairs (default: report them and exit 1)')
+
+
+def solve_remision_map(remisiones, orders_json, plant_id, order_capacity=1, max_days=3,
+                       accept_low_confidence=False):
+    """
+    --orders-json: {remision_number: order_id} from the solver, printing the low-confidence
+    report. Raises LowConfidenceError when any pair is low-confidence or unmatched, unless
+    ``accept_low_confidence``.
+    """
+    with open(orders_json, 'r', encoding='utf-8') as f:
+        orders_data = json.load(f)
+    print(f"Loaded {len(orders_data)} orders from {orders_json}")
+    # Every alias entry: the client only narrows the candidate orders here, no client_id is written from it.
+    trips = trips_from_remisiones(remisiones, plant_id, default_resolver().resolve)
+    matches, unmatched = assign(trips, slots_from_orders(orders_data, order_capacity), max_days=max_days)
+    print_assignment_report(matches, unmatched)
+    low = sum(1 for m in matches if m.low_confidence)
+    if (low or unmatched) and not accept_low_confidence:
+        raise LowConfidenceError(f"{low} low-confidence and {len(unmatched)} unmatched remision(s) "
+                                 f"from {orders_json}; check them or pass --accept-low-confidence")
+    return {m.trip.remision_number: m.order_id for m in matches}
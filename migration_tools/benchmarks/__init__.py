@@ -0,0 +1,5 @@
+"""
+Synthetic benchmarks for the migration generators.
+
+Run from the repo root, e.g. ``python3 -m migration_tools.benchmarks.order_index``.
+"""
@@ -0,0 +1,11 @@
+"""psql runner shared by the Postgres benchmarks (scratch schema via PGOPTIONS)."""
+import os
+import subprocess
+
+
+def run_psql(dsn, schema, *args, sql=None):
+    """Run psql with ON_ERROR_STOP and search_path=schema; ``sql`` goes to stdin."""
+    env = dict(os.environ, PGOPTIONS=f'-c search_path={schema}')
+    cmd = ['psql', dsn, '-X', '-q', '-v', 'ON_ERROR_STOP=1', *args]
+    result = subprocess.run(cmd, input=sql, text=True, check=True, env=env, capture_output=True)
+    return result.stdout
@@ -0,0 +1,163 @@
+"""
+Pump remision -> order solver: speed, accuracy and optimality.
+
+  python3 -m migration_tools.benchmarks.assignment --trips 5000
+
+Builds a synthetic month for one plant: ``--clients`` clients, orders with 1-6 concrete
+remisiones each (numbered in one series, volumes 3-12 m3), and a pump trip for
+``--pumped`` of the concrete remisiones (pump numbers share the series; ``--noise`` of
+them get an off-by-some number, a shifted date or a rounded volume). Reports solve time,
+the share of trips placed on the order they came from and the low-confidence count.
+
+Then checks optimality on ``--verify`` small random instances against a dense
+Hungarian-algorithm reference (capacities expanded, one dummy column per trip for
+"unmatched"): total costs must agree.
+"""
+import argparse
+import random
+import time
+import uuid
+from datetime import date, timedelta
+
+from migration_tools.assignment import (
+    UNMATCHED,
+    Slot,
+    Trip,
+    Weights,
+    assign,
+    candidate_edges,
+    solve_assignment,
+)
+
+PLANT = 'af86c90f-c76f-44fb-9e2d-d5460ae51aca'
+
+
+def synthetic_month(n_trips, n_clients, pumped, noise, rng):
+    clients = [str(uuid.UUID(int=rng.getrandbits(128))) for _ in range(n_clients)]
+    start = date(2026, 3, 1)
+    slots, trips, truth = [], [], []
+    number = 6000
+    while len(trips) < n_trips:
+        order_id = str(uuid.UUID(int=rng.getrandbits(128)))
+        client = rng.choice(clients)
+        day = start + timedelta(days=rng.randrange(31))
+        for _ in range(rng.randint(1, 6)):
+            number += 1
+            volume = float(rng.randint(6, 24)) / 2
+            slots.append(Slot(order_id, str(number), day.isoformat(), volume, client, PLANT))
+            if rng.random() >= pumped:
+                continue
+            t_number, t_day, t_volume = number, day, volume
+            if rng.random() < noise:
+                kind = rng.randrange(3)
+                if kind == 0:
+                    t_number += rng.choice([-3, -1, 1, 2])
+                elif kind == 1:
+                    t_day += timedelta(days=rng.choice([-1, 1]))
+                else:
+                    t_volume = float(round(volume))
+            trips.append(Trip(f'P004-{t_number:06d}', t_day.isoformat(), t_volume, client, PLANT))
+            truth.append(order_id)
+    return trips, slots, truth
+
+
+def hungarian(cost):
+    """Dense O(n^2 m) Hungarian algorithm, n rows <= m columns. Returns the minimum total."""
+    n, m = len(cost), len(cost[0])
+    inf = float('inf')
+    u, v = [0.0] * (n + 1), [0.0] * (m + 1)
+    p, way = [0] * (m + 1), [0] * (m + 1)
+    for i in range(1, n + 1):
+        p[0] = i
+        j0 = 0
+        minv = [inf] * (m + 1)
+        used = [False] * (m + 1)
+        while True:
+            used[j0] = True
+            i0, delta, j1 = p[j0], inf, 0
+            for j in range(1, m + 1):
+                if not used[j]:
+                    cur = cost[i0 - 1][j - 1] - u[i0] - v[j]
+                    if cur < minv[j]:
+                        minv[j], way[j] = cur, j0
+                    if minv[j] < delta:
+                        delta, j1 = minv[j], j
+            for j in range(m + 1):
+                if used[j]:
+                    u[p[j]] += delta
+                    v[j] -= delta
+                else:
+                    minv[j] -= delta
+            j0 = j1
+            if p[j0] == 0:
+                break
+        while j0:
+            j1 = way[j0]
+            p[j0] = p[j1]
+            j0 = j1
+    return sum(cost[p[j] - 1][j - 1] for j in range(1, m + 1) if p[j])
+
+
+def verify(rng, instances, unmatched_cost=2.5):
+    worst = 0.0
+    for _ in range(instances):
+        trips, slots, _ = synthetic_month(rng.randint(4, 14), 2, 0.9, 0.5, rng)
+        for s in rng.sample(slots, len(slots) // 3):
+            s.capacity = rng.randint(1, 3)
+        edges = candidate_edges(trips, slots, Weights(), 3, 20, unmatched_cost, len(slots))
+        chosen = solve_assignment(edges, [s.capacity for s in slots], unmatched_cost)
+        got = sum(
+            unmatched_cost if j == UNMATCHED else dict(out)[j]
+            for out, j in zip(edges, chosen)
+        )
+        load = {}
+        for j in chosen:
+            if j != UNMATCHED:
+                load[j] = load.get(j, 0) + 1
+        assert all(load[j] <= slots[j].capacity for j in load)
+
+        columns = [j for j, s in enumerate(slots) for _ in range(s.capacity)]
+        big = 1e6
+        matrix = []
+        for i, out in enumerate(edges):
+            costs = dict(out)
+            row = [costs.get(j, big) for j in columns]
+            row += [unmatched_cost if k == i else big for k in range(len(trips))]
+            matrix.append(row)
+        want = hungarian(matrix)
+        worst = max(worst, abs(got - want))
+    return worst
+
+
+def main():
+    ap = argparse.ArgumentParser(description='Remision -> order assignment benchmark')
+    ap.add_argument('--trips', type=int, default=5000)
+    ap.add_argument('--clients', type=int, default=6)
+    ap.add_argument('--pumped', type=float, default=0.7, help='Share of concrete remisiones that were pumped')
+    ap.add_argument('--noise', type=float, default=0.1, help='Share of trips with a perturbed number/date/volume')
+    ap.add_argument('--verify', type=int, default=200, help='Random small instances checked against Hungarian')
+    ap.add_argument('--seed', type=int, default=13)
+    args = ap.parse_args()
+
+    rng = random.Random(args.seed)
+    trips, slots, truth = synthetic_month(args.trips, args.clients, args.pumped, args.noise, rng)
+    t0 = time.perf_counter()
+    matches, unmatched = assign(trips, slots)
+    elapsed = time.perf_counter() - t0
+
+    truth = {id(t): order_id for t, order_id in zip(trips, truth)}
+    correct = sum(1 for m in matches if truth[id(m.trip)] == m.order_id)
+    low = sum(1 for m in matches if m.low_confidence)
+    wrong_high = sum(1 for m in matches if not m.low_confidence and truth[id(m.trip)] != m.order_id)
+    print(f"trips={len(trips)} concrete slots={len(slots)} clients={args.clients}")
+    print(f"solve:            {elapsed:8.3f} s")
+    print(f"correct order:    {correct}/{len(trips)} ({correct / len(trips):.1%})")
+    print(f"low-confidence:   {low}  unmatched: {len(unmatched)}  wrong but confident: {wrong_high}")
+
+    worst = verify(random.Random(args.seed + 1), args.verify)
+    print(f"optimality:       max |solver - hungarian| over {args.verify} instances = {worst:.2e}")
+    return 0 if worst < 1e-6 else 1
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
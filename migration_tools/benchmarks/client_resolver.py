@@ -0,0 +1,100 @@
+"""
+Client resolution: ordered substring chain (old if/elif in group_remisiones) vs ClientResolver.
+
+  python3 -m migration_tools.benchmarks.client_resolver --aliases 5000 --rows 1000000
+
+Builds a synthetic alias table (``--aliases`` entries) and ``--rows`` CLIENTE values drawn
+from ``--distinct`` raw spellings, most containing an alias and some unknown. The chain is
+timed on ``--chain-sample`` rows and extrapolated (it is O(rows x aliases)); the resolver
+runs on every row. Both must pick the same client for every sampled value.
+"""
+import argparse
+import random
+import string
+import time
+
+from migration_tools.clients import ClientResolver
+
+
+def chain_resolve(table, raw_name):
+    """First alias (in table order) contained in the upper-cased value, like the old chain."""
+    upper = raw_name.upper()
+    for alias, client_key in table:
+        if alias in upper:
+            return client_key
+    return None
+
+
+def synthetic_entries(n_aliases, rng):
+    entries = []
+    seen = set()
+    while len(entries) < n_aliases:
+        alias = ' '.join(
+            ''.join(rng.choice(string.ascii_uppercase) for _ in range(rng.randint(4, 9)))
+            for _ in range(rng.randint(1, 3))
+        )
+        if alias in seen:
+            continue
+        seen.add(alias)
+        entries.append({'key': f'C{len(entries)}', 'id': f'id-{len(entries)}', 'name': alias, 'aliases': [alias]})
+    return entries
+
+
+def synthetic_values(entries, n_distinct, unknown_ratio, rng):
+    values = []
+    for _ in range(n_distinct):
+        if rng.random() < unknown_ratio:
+            values.append(''.join(rng.choice(string.ascii_lowercase + ' ') for _ in range(rng.randint(6, 30))))
+            continue
+        alias = rng.choice(entries)['aliases'][0]
+        prefix = rng.choice(['', 'GRUPO ', 'CONSTRUCTORA ', 'fideicomiso '])
+        suffix = rng.choice(['', ' ', ' SA DE CV', ' S.A.'])
+        values.append(prefix + (alias.lower() if rng.random() < 0.3 else alias) + suffix)
+    return values
+
+
+def main():
+    ap = argparse.ArgumentParser(description='ClientResolver vs substring chain benchmark')
+    ap.add_argument('--aliases', type=int, default=5000)
+    ap.add_argument('--rows', type=int, default=1_000_000)
+    ap.add_argument('--distinct', type=int, default=20_000, help='Distinct raw CLIENTE spellings')
+    ap.add_argument('--unknown-ratio', type=float, default=0.05)
+    ap.add_argument('--chain-sample', type=int, default=2000, help='Rows timed with the chain (extrapolated)')
+    ap.add_argument('--seed', type=int, default=11)
+    args = ap.parse_args()
+
+    rng = random.Random(args.seed)
+    entries = synthetic_entries(args.aliases, rng)
+    values = synthetic_values(entries, args.distinct, args.unknown_ratio, rng)
+    rows = [rng.choice(values) for _ in range(args.rows)]
+    table = [(alias.upper(), e['key']) for e in entries for alias in e['aliases']]
+
+    sample = rows[:args.chain_sample]
+    t0 = time.perf_counter()
+    chained = [chain_resolve(table, v) for v in sample]
+    t_chain = (time.perf_counter() - t0) * len(rows) / max(len(sample), 1)
+
+    t0 = time.perf_counter()
+    resolver = ClientResolver(entries)
+    t_build = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    resolve = resolver.resolve
+    resolved = [resolve(v) for v in rows]
+    t_resolve = time.perf_counter() - t0
+
+    mismatches = sum(
+        1 for want, got in zip(chained, resolved)
+        if want != (got.key if got else None)
+    )
+    unknown = sum(1 for c in resolved if c is None)
+
+    print(f"aliases={args.aliases} rows={args.rows} distinct={args.distinct} unknown rows={unknown}")
+    print(f"substring chain: {t_chain:8.2f} s  (extrapolated from {len(sample)} rows)")
+    print(f"ClientResolver:  {t_build + t_resolve:8.2f} s  (build {t_build:.3f} s, resolve {t_resolve:.3f} s)")
+    print(f"speedup:         {t_chain / (t_build + t_resolve):8.1f}x")
+    print(f"mismatches:      {mismatches}")
+    return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,92 @@
+"""
+group_remisiones: dict backend (row by row) vs columnar backend (migration_tools/columnar.py).
+
+  python3 -m migration_tools.benchmarks.columnar --rows 1000000
+
+Builds ``--rows`` synthetic Remision objects (real client aliases, P002 / P004P, a year of
+dates, fractional volumes and a few prices; ``--unknown-ratio`` of the rows get an unknown
+client or plant) and groups them with generate_plant2_pumping_migration.group_remisiones
+under both backends. The groups must be identical: same keys in the same order, same member
+remisiones in the same order, bit-identical total_volume and the same first unit_price,
+and the same skip warnings.
+"""
+import argparse
+import contextlib
+import io
+import json
+import random
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+from generate_plant2_pumping_migration import group_remisiones
+from migration_tools.records import Remision
+
+ALIASES = Path(__file__).resolve().parent.parent / 'client_aliases.json'
+PLANTS = ['P002', 'P002', 'P004P']
+PRICES = [310.0, 360.0, 1250.0]
+
+
+def synthetic_remisiones(n, rng, unknown_ratio=0.001):
+    with open(ALIASES, encoding='utf-8') as f:
+        clients = [e['aliases'][0] for e in json.load(f)][:40]
+    start = date(2026, 1, 1)
+    days = [start + timedelta(days=d) for d in range(365)]
+    rows = []
+    for i in range(n):
+        client, plant = rng.choice(clients), rng.choice(PLANTS)
+        if rng.random() < unknown_ratio:
+            if rng.random() < 0.5:
+                client = 'CLIENTE DESCONOCIDO XYZ'
+            else:
+                plant = 'P009'
+        rows.append(Remision(str(100_000 + i), rng.choice(days), client, rng.randint(5, 240) / 4,
+                             rng.choice(PRICES), 'BP02', 'OPERADOR', plant))
+    return rows
+
+
+def timed_group(remisiones, backend):
+    out = io.StringIO()
+    t0 = time.perf_counter()
+    with contextlib.redirect_stdout(out):
+        groups = group_remisiones(remisiones, backend)
+    return groups, out.getvalue(), time.perf_counter() - t0
+
+
+def same_groups(a, b):
+    if list(a) != list(b):
+        return False
+    for key, ga in a.items():
+        gb = b[key]
+        if (ga.date, ga.client_id, ga.client_name, ga.plant_code, ga.plant_id, ga.unit_price) != \
+                (gb.date, gb.client_id, gb.client_name, gb.plant_code, gb.plant_id, gb.unit_price):
+            return False
+        if ga.total_volume.hex() != gb.total_volume.hex():
+            return False
+        if len(ga.remisiones) != len(gb.remisiones) or any(x is not y for x, y in zip(ga.remisiones, gb.remisiones)):
+            return False
+    return True
+
+
+def main():
+    ap = argparse.ArgumentParser(description='group_remisiones: dict vs columnar backend')
+    ap.add_argument('--rows', type=int, default=1_000_000)
+    ap.add_argument('--unknown-ratio', type=float, default=0.001, help='Rows with an unknown client or plant')
+    ap.add_argument('--seed', type=int, default=5)
+    args = ap.parse_args()
+
+    rng = random.Random(args.seed)
+    remisiones = synthetic_remisiones(args.rows, rng, args.unknown_ratio)
+    by_dict, warn_dict, t_dict = timed_group(remisiones, 'dict')
+    by_cols, warn_cols, t_cols = timed_group(remisiones, 'columnar')
+    skipped = warn_dict.count('\n')
+    for name, seconds in (('dict', t_dict), ('columnar', t_cols)):
+        print(f"{name:<9} {seconds:7.3f} s  {args.rows / seconds:12,.0f} rows/s")
+    identical = same_groups(by_dict, by_cols) and warn_dict == warn_cols
+    print(f"{len(by_dict)} groups, {skipped} rows skipped; speedup {t_dict / t_cols:.2f}x  "
+          f"identical: {'OK' if identical else 'MISMATCH'}")
+    return 0 if identical else 1
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
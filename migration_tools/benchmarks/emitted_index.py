@@ -0,0 +1,89 @@
+"""
+--incremental cost: building / refreshing the emitted-remisiones index and checking a CSV.
+
+  python3 -m migration_tools.benchmarks.emitted_index --files 60 --rows-per-file 2000 --csv-rows 10000
+
+Writes ``--files`` synthetic pumping migrations (rendered with migration_tools.sql, formats
+rotating insert/values/copy) into a temp dir, then times: a cold index build, a refresh
+with nothing changed, a refresh after rewriting one file, and checking ``--csv-rows``
+(plant_id, remision_number) keys (half already emitted) against the index with
+EmittedIndex.emitted_among.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+import uuid
+
+from migration_tools.emitted import EmittedIndex
+from migration_tools.sql import SQL_FORMATS, iter_remisiones_sql
+
+PLANTS = ['836cbbcf-67b2-4534-97cc-b83e71722ff7', 'af86c90f-c76f-44fb-9e2d-d5460ae51aca']
+
+
+def write_migration(path, rows, sql_format):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('BEGIN;\n' + '\n'.join(iter_remisiones_sql(rows, sql_format)) + '\nCOMMIT;\n')
+
+
+def main():
+    ap = argparse.ArgumentParser(description='Emitted-remisiones index benchmark')
+    ap.add_argument('--files', type=int, default=60)
+    ap.add_argument('--rows-per-file', type=int, default=2000)
+    ap.add_argument('--csv-rows', type=int, default=10_000)
+    ap.add_argument('--seed', type=int, default=3)
+    args = ap.parse_args()
+
+    rng = random.Random(args.seed)
+    order_id = str(uuid.UUID(int=rng.getrandbits(128)))
+    emitted = []
+    with tempfile.TemporaryDirectory() as tmp:
+        mig_dir = os.path.join(tmp, 'migrations')
+        os.mkdir(mig_dir)
+        number = 100_000
+        for i in range(args.files):
+            rows = []
+            for _ in range(args.rows_per_file):
+                plant = rng.choice(PLANTS)
+                rows.append((order_id, str(number), '2026-03-01', 8.0, 'OPERADOR', 'BP02', plant))
+                emitted.append((plant, str(number)))
+                number += 1
+            write_migration(os.path.join(mig_dir, f'{i:04d}_pumping.sql'), rows, SQL_FORMATS[i % len(SQL_FORMATS)])
+
+        index_path = os.path.join(tmp, 'emitted.sqlite')
+        with EmittedIndex(index_path) as index:
+            t0 = time.perf_counter()
+            files, rescanned = index.refresh(mig_dir)
+            t_cold = time.perf_counter() - t0
+
+            t0 = time.perf_counter()
+            index.refresh(mig_dir)
+            t_warm = time.perf_counter() - t0
+
+            changed = os.path.join(mig_dir, '0000_pumping.sql')
+            write_migration(changed, [(order_id, '1', '2026-03-01', 8.0, None, 'BP02', PLANTS[0])], 'insert')
+            t0 = time.perf_counter()
+            _, rescanned_one = index.refresh(mig_dir)
+            t_one = time.perf_counter() - t0
+
+        csv_keys = rng.sample(emitted[args.rows_per_file:], args.csv_rows // 2)
+        csv_keys += [(rng.choice(PLANTS), str(n)) for n in range(10, 10 + args.csv_rows - len(csv_keys))]
+        t0 = time.perf_counter()
+        with EmittedIndex(index_path) as index:
+            hits = len(index.emitted_among(csv_keys))
+            t_check = time.perf_counter() - t0
+            indexed = index.conn.execute('SELECT COUNT(*) FROM emitted').fetchone()[0]
+
+    expected = len(emitted) - args.rows_per_file + 1
+    print(f"files={files} indexed rows={indexed} (expected {expected}) csv rows={len(csv_keys)} hits={hits}")
+    print(f"cold build:          {t_cold * 1000:9.1f} ms  ({rescanned} files scanned)")
+    print(f"refresh, no change:  {t_warm * 1000:9.1f} ms")
+    print(f"refresh, 1 changed:  {t_one * 1000:9.1f} ms  ({rescanned_one} file scanned)")
+    print(f"check csv rows:      {t_check * 1000:9.1f} ms")
+    ok = indexed == expected and hits == args.csv_rows // 2
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,205 @@
+"""
+Orders snapshot fetcher against a local PostgREST stub: correctness, retries, concurrency.
+
+  python3 -m migration_tools.benchmarks.fetch_orders --orders 20000 --latency 0.02
+
+Starts a threaded HTTP stub serving ``/orders`` with the PostgREST subset the fetcher
+uses (eq / gt / gte / lte / in / not.eq filters, order, limit / offset, Prefer:
+count=exact -> Content-Range, an optional max-rows cap) over ``--orders`` synthetic orders
+for three plants, with ``--latency`` per request and every ``--fail-every``-th request
+answered 503. Then:
+
+* fetches one plant / date range with concurrency 1 and ``--concurrency`` and compares
+  both snapshots with the expected rows (filtered and ordered in Python);
+* edits the data (updates, cancellations, plant moves, new orders), refreshes the snapshot
+  with refresh_orders and checks it equals a fresh full fetch.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+import uuid
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+from migration_tools.fetch_orders import PLANT_IDS, PostgrestClient, fetch_orders, refresh_orders
+
+
+def _match(value, expr):
+    op, _, arg = expr.partition('.')
+    if op == 'not':
+        return not _match(value, arg)
+    if op == 'in':
+        return value in arg.strip('()').split(',')
+    if op == 'eq':
+        return value == arg
+    if value is None:
+        return False
+    return {'gt': value > arg, 'gte': value >= arg, 'lte': value <= arg, 'lt': value < arg}[op]
+
+
+class StubPostgrest:
+    """In-memory ``orders`` table behind a ThreadingHTTPServer on 127.0.0.1."""
+
+    def __init__(self, rows, latency=0.0, fail_every=0, max_rows=None):
+        self.rows = rows
+        self.latency = latency
+        self.fail_every = fail_every
+        self.max_rows = max_rows
+        self.requests = 0
+        self.lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                stub.handle(self)
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f'http://127.0.0.1:{self.server.server_address[1]}'
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def handle(self, req):
+        with self.lock:
+            self.requests += 1
+            n = self.requests
+            rows = list(self.rows)
+        time.sleep(self.latency)
+        if self.fail_every and n % self.fail_every == 0:
+            req.send_response(503)
+            req.send_header('Retry-After', '0')
+            req.end_headers()
+            req.wfile.write(b'{"message":"stub failure"}')
+            return
+        url = urlsplit(req.path)
+        limit, offset, order = None, 0, []
+        for key, value in parse_qsl(url.query):
+            if key == 'limit':
+                limit = int(value)
+            elif key == 'offset':
+                offset = int(value)
+            elif key == 'order':
+                order = [part.split('.')[0] for part in value.split(',')]
+            elif key != 'select':
+                rows = [r for r in rows if _match(r.get(key), value)]
+        rows.sort(key=lambda r: tuple(r[k] for k in order))
+        if self.max_rows:
+            limit = min(limit or self.max_rows, self.max_rows)
+        page = rows[offset:offset + limit] if limit is not None else rows[offset:]
+        body = json.dumps(page).encode()
+        req.send_response(200)
+        req.send_header('Content-Type', 'application/json')
+        total = len(rows) if 'count=exact' in (req.headers.get('Prefer') or '') else '*'
+        req.send_header('Content-Range', f'{offset}-{offset + len(page) - 1}/{total}' if page else f'*/{total}')
+        req.send_header('Content-Length', str(len(body)))
+        req.end_headers()
+        req.wfile.write(body)
+
+
+def synthetic_orders(n, rng):
+    start = date(2026, 1, 1)
+    plants = list(PLANT_IDS.values())
+    rows = []
+    for i in range(n):
+        rows.append({
+            'id': str(uuid.UUID(int=rng.getrandbits(128))),
+            'delivery_date': (start + timedelta(days=rng.randrange(365))).isoformat(),
+            'client_id': str(uuid.UUID(int=rng.getrandbits(128))),
+            'plant_id': rng.choice(plants),
+            'order_status': 'CANCELLED' if rng.random() < 0.05 else 'CREATED',
+            'updated_at': f'2026-06-01T00:00:{i % 60:02d}.{i:06d}+00:00',
+        })
+    return rows
+
+
+def expected(rows, plant, date_from, date_to):
+    want = [
+        {k: r[k] for k in ('id', 'delivery_date', 'client_id', 'plant_id', 'updated_at')}
+        for r in rows
+        if r['plant_id'] == plant and date_from <= r['delivery_date'] <= date_to and r['order_status'] != 'CANCELLED'
+    ]
+    return sorted(want, key=lambda r: (r['delivery_date'], r['id']))
+
+
+def fetch(url, path, concurrency, page_size, incremental=False, **filters):
+    async def run():
+        client = PostgrestClient(url, concurrency=concurrency, page_size=page_size, backoff=0.01)
+        fn = refresh_orders if incremental else fetch_orders
+        t0 = time.perf_counter()
+        await fn(client, path, **filters)
+        return client, time.perf_counter() - t0
+    return asyncio.run(run())
+
+
+def main():
+    ap = argparse.ArgumentParser(description='PostgREST orders fetcher against a local stub')
+    ap.add_argument('--orders', type=int, default=20_000)
+    ap.add_argument('--page-size', type=int, default=250)
+    ap.add_argument('--max-rows', type=int, default=None, help='Stub-side cap on rows per response')
+    ap.add_argument('--concurrency', type=int, default=8)
+    ap.add_argument('--latency', type=float, default=0.02, help='Seconds added to every stub response')
+    ap.add_argument('--fail-every', type=int, default=7, help='Every Nth request gets a 503 (0 = never)')
+    ap.add_argument('--seed', type=int, default=9)
+    args = ap.parse_args()
+
+    rng = random.Random(args.seed)
+    rows = synthetic_orders(args.orders, rng)
+    stub = StubPostgrest(rows, args.latency, args.fail_every, args.max_rows)
+    filters = {'plant_ids': [PLANT_IDS['P002']], 'date_from': '2026-02-01', 'date_to': '2026-09-30'}
+    tmp = tempfile.mkdtemp()
+    serial_path, path, fresh_path = (os.path.join(tmp, n) for n in ('serial.json', 'orders.json', 'fresh.json'))
+    ok = True
+    try:
+        want = expected(rows, PLANT_IDS['P002'], filters['date_from'], filters['date_to'])
+        for label, out, conc in (('serial', serial_path, 1), ('concurrent', path, args.concurrency)):
+            client, seconds = fetch(stub.url, out, conc, args.page_size, **filters)
+            with open(out, encoding='utf-8') as f:
+                got = json.load(f)
+            same = got == want
+            ok &= same
+            print(f"{label:<11} concurrency={conc:<3} {seconds:7.3f} s  {len(got)} orders  "
+                  f"requests={client.requests} retried={client.retried}  {'OK' if same else 'MISMATCH'}")
+
+        t = '2026-07-01T00:00:00.000000+00:00'
+        for r in rng.sample(rows, len(rows) // 50):
+            kind = rng.randrange(3)
+            if kind == 0:
+                r['client_id'] = str(uuid.UUID(int=rng.getrandbits(128)))
+            elif kind == 1:
+                r['order_status'] = 'CANCELLED'
+            else:
+                r['plant_id'] = PLANT_IDS['P003'] if r['plant_id'] == PLANT_IDS['P002'] else PLANT_IDS['P002']
+            r['updated_at'] = t
+        extra = synthetic_orders(200, rng)
+        for r in extra:
+            r['updated_at'] = t
+        stub.rows = rows + extra
+
+        client, seconds = fetch(stub.url, path, args.concurrency, args.page_size, incremental=True, **filters)
+        fetch(stub.url, fresh_path, args.concurrency, args.page_size, **filters)
+        with open(path, encoding='utf-8') as f, open(fresh_path, encoding='utf-8') as g:
+            same = json.load(f) == json.load(g)
+        ok &= same
+        print(f"incremental {seconds:7.3f} s  requests={client.requests}  equals full re-fetch: {'OK' if same else 'MISMATCH'}")
+    finally:
+        stub.close()
+        for name in os.listdir(tmp):
+            os.unlink(os.path.join(tmp, name))
+        os.rmdir(tmp)
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,101 @@
+"""
+CSV ingestion: the per-generator DictReader parse (old) vs migration_tools.ingest.
+
+  python3 -m migration_tools.benchmarks.ingest --rows 500000
+
+Writes a ``--rows`` synthetic pumping export with the padded headers of the real files
+(' P.U ', ' UNIDAD ', ' PLANTA  '), mixed unit spellings (BP-02 / BP2 / BP02 / blank) and
+'$1,234.00' prices, then parses it with the DictReader + key-stripping + per-row column
+lookups the generators used to repeat, and with the ingest engine's 'plant-column'
+profile. Both must give the same Remision tuples. The same file is then routed by unit
+(November's BP02 -> P004 profile) in one pass and the per-plant counts checked.
+"""
+import argparse
+import csv
+import os
+import random
+import tempfile
+import time
+from datetime import date, timedelta
+
+from migration_tools.ingest import CsvSource, route_csv
+from migration_tools.records import Remision
+
+CLIENTS = ['SEDENA', 'IMPULSORA TLAXCALTECA', 'CONSTRUCTORA DEL NOROESTE', 'GRUPO BAJA', 'PARTICULAR']
+UNITS = ['BP-01', 'BP01', 'BP1', 'BP-02', 'BP02', 'BP2', 'BP03', 'EXTERNA', '']
+OPERATORS = ['PRAXEDIS', 'FEDERICO', 'FEDERICO-EZEQUIEL', 'JORGE MENDEZ', '']
+PLANTS = ['P002', 'P003']
+HEADER = ['REMISION', 'FECHA', 'CLIENTE', 'PROYECTO', 'PRODUCTO', 'M3', ' P.U ', ' UNIDAD ', ' OPERADOR ', ' PLANTA  ']
+
+
+def write_csv(path, n_rows, rng):
+    start = date(2026, 1, 1)
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADER)
+        for i in range(n_rows):
+            d = start + timedelta(days=rng.randrange(365))
+            writer.writerow([
+                10_000 + i, f"{d.month}/{d.day}/{d.year % 100}", rng.choice(CLIENTS), 'OBRA', 'SERVICIO DE BOMBEO',
+                rng.randint(6, 120), f" ${rng.choice((310, 360, 1250)):,.2f} ", rng.choice(UNITS),
+                rng.choice(OPERATORS), rng.choice(PLANTS),
+            ])
+
+
+def old_parse(path):
+    """The generate_plant2_pumping_migration.py parse before migration_tools.ingest."""
+    units = {'BP2': 'BP02', 'BP-02': 'BP02', 'BP02': 'BP02', 'BP1': 'BP01', 'BP-01': 'BP01', 'BP01': 'BP01'}
+    out = []
+    with open(path, mode='r', encoding='utf-8-sig') as f:
+        for row in csv.DictReader(f):
+            row = {k.strip(): v for k, v in row.items() if k is not None}
+            if not row.get('REMISION', '').strip():
+                continue
+            month, day, year = (int(x) for x in row['FECHA'].strip().split('/'))
+            pu_str = str(row.get('P.U', '0')).strip().replace('$', '').replace(',', '').strip()
+            unidad_raw = row.get('UNIDAD', '').strip().upper()
+            unidad = units.get(unidad_raw, unidad_raw) or 'RENTADA'
+            out.append(Remision(
+                row['REMISION'].strip(), date(2000 + year, month, day), row['CLIENTE'].strip(),
+                float(str(row['M3']).strip()), float(pu_str) if pu_str else 0.0, unidad,
+                row.get('OPERADOR', '').strip() or None, row.get('PLANTA', '').strip(),
+            ))
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser(description='Pumping CSV ingestion: DictReader parse vs migration_tools.ingest')
+    ap.add_argument('--rows', type=int, default=500_000)
+    ap.add_argument('--seed', type=int, default=17)
+    args = ap.parse_args()
+
+    rng = random.Random(args.seed)
+    fd, path = tempfile.mkstemp(suffix='.csv')
+    os.close(fd)
+    try:
+        write_csv(path, args.rows, rng)
+        timings = {}
+        t0 = time.perf_counter()
+        old = old_parse(path)
+        timings['dictreader'] = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        new = list(CsvSource(path, 'plant-column').remisiones())
+        timings['ingest'] = time.perf_counter() - t0
+        same = [r.astuple() for r in old] == [r.astuple() for r in new]
+        for name, seconds in timings.items():
+            print(f"{name:<11} {seconds:7.3f} s  {args.rows / seconds:12,.0f} rows/s")
+        print(f"speedup     {timings['dictreader'] / timings['ingest']:.2f}x  identical: {'OK' if same else 'MISMATCH'}")
+
+        t0 = time.perf_counter()
+        by_plant = route_csv(path, 'november-2025')
+        routed = {plant: len(rows) for plant, rows in sorted(by_plant.items())}
+        want_p4 = sum(r.unidad == 'BP02' for r in new)
+        routed_ok = routed.get('P004', 0) == want_p4 and sum(routed.values()) == len(new)
+        print(f"route by unit {time.perf_counter() - t0:7.3f} s  {routed}  {'OK' if routed_ok else 'MISMATCH'}")
+        return 0 if same and routed_ok else 1
+    finally:
+        os.unlink(path)
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
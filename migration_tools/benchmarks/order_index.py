@@ -0,0 +1,112 @@
+"""
+Order matching: per-group linear scan (old generate_migration_sql) vs OrderIndex.
+
+  python3 -m migration_tools.benchmarks.order_index --orders 100000 --groups 400
+
+Builds a synthetic full-quarter orders snapshot, asks both matchers for every group
+and checks they pick the same order and day difference.
+"""
+import argparse
+import random
+import time
+import uuid
+from datetime import date, datetime, timedelta
+
+from migration_tools.orders import OrderIndex
+
+
+def legacy_match(orders_data, date_str, client_id, plant_id, orders_by_key):
+    """Matching loop as it was before OrderIndex (exact key, then scan + strptime)."""
+    key = (date_str, client_id, plant_id)
+    if key in orders_by_key and orders_by_key[key]:
+        return orders_by_key[key][0], 0
+
+    candidates = [o for o in orders_data if o['client_id'] == client_id and o['plant_id'] == plant_id]
+    if not candidates:
+        return None, None
+    target = datetime.strptime(date_str, '%Y-%m-%d').date()
+    best_order = None
+    min_diff = None
+    for order in candidates:
+        order_date = datetime.strptime(order['delivery_date'], '%Y-%m-%d').date()
+        diff = abs((order_date - target).days)
+        if min_diff is None or diff < min_diff:
+            min_diff = diff
+            best_order = order
+        elif diff == min_diff and order_date < target:
+            best_order = order
+    return best_order, min_diff
+
+
+def legacy_orders_by_key(orders_data):
+    orders_by_key = {}
+    for order in orders_data:
+        key = (order['delivery_date'], order['client_id'], order['plant_id'])
+        orders_by_key.setdefault(key, []).append(order)
+    return orders_by_key
+
+
+def synthetic_snapshot(n_orders, n_clients, n_plants, start, days, rng):
+    clients = [str(uuid.UUID(int=rng.getrandbits(128))) for _ in range(n_clients)]
+    plants = [str(uuid.UUID(int=rng.getrandbits(128))) for _ in range(n_plants)]
+    orders = []
+    for _ in range(n_orders):
+        # Leave gaps on even days so nearest-date fallback and ties get exercised.
+        offset = rng.randrange(days)
+        if offset % 2 == 0 and rng.random() < 0.9:
+            offset += 1
+        orders.append({
+            'id': str(uuid.UUID(int=rng.getrandbits(128))),
+            'delivery_date': (start + timedelta(days=offset)).strftime('%Y-%m-%d'),
+            'client_id': rng.choice(clients),
+            'plant_id': rng.choice(plants),
+        })
+    return orders, clients, plants
+
+
+def main():
+    ap = argparse.ArgumentParser(description='OrderIndex vs linear scan benchmark')
+    ap.add_argument('--orders', type=int, default=100_000)
+    ap.add_argument('--groups', type=int, default=400, help='(date, client, plant) groups to match')
+    ap.add_argument('--clients', type=int, default=8)
+    ap.add_argument('--plants', type=int, default=2)
+    ap.add_argument('--seed', type=int, default=7)
+    args = ap.parse_args()
+
+    rng = random.Random(args.seed)
+    start = date(2026, 1, 1)
+    days = 90
+    orders, clients, plants = synthetic_snapshot(args.orders, args.clients, args.plants, start, days, rng)
+    groups = [
+        ((start + timedelta(days=rng.randrange(-5, days + 5))).strftime('%Y-%m-%d'), rng.choice(clients), rng.choice(plants))
+        for _ in range(args.groups)
+    ]
+
+    t0 = time.perf_counter()
+    by_key = legacy_orders_by_key(orders)
+    legacy = [legacy_match(orders, d, c, p, by_key) for d, c, p in groups]
+    t_legacy = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    index = OrderIndex(orders)
+    t_build = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    indexed = [index.match(d, c, p) for d, c, p in groups]
+    t_lookup = time.perf_counter() - t0
+
+    mismatches = sum(
+        1 for (lo, ld), (io, idiff) in zip(legacy, indexed)
+        if (lo['id'] if lo else None) != (io.id if io else None) or ld != idiff
+    )
+    fallbacks = sum(1 for _, d in indexed if d)
+
+    print(f"orders={args.orders} groups={args.groups} nearest-date fallbacks={fallbacks}")
+    print(f"linear scan:  {t_legacy:8.3f} s")
+    print(f"OrderIndex:   {t_build + t_lookup:8.3f} s  (build {t_build:.3f} s, lookups {t_lookup * 1000:.2f} ms)")
+    print(f"speedup:      {t_legacy / (t_build + t_lookup):8.1f}x")
+    print(f"mismatches:   {mismatches}")
+    return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,125 @@
+"""
+Memory of parsed pumping rows: dict rows + dict groups (old generators) vs Remision / PumpGroup.
+
+  python3 -m migration_tools.benchmarks.records_memory --rows 1000000
+
+Writes a ``--rows`` synthetic pumping CSV (a handful of clients, plants, units and
+operators over one year of dates) to a temp file, then parses and groups it by
+(date, client, plant) both ways, reporting tracemalloc current / peak for the parse.
+Both layouts must give the same groups and volume totals.
+"""
+import argparse
+import csv
+import gc
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict
+from datetime import date, timedelta
+
+from migration_tools.records import PumpGroup, Remision
+
+CLIENTS = ['SEDENA', 'IMPULSORA TLAXCALTECA', 'CONSTRUCTORA DEL NOROESTE', 'GRUPO BAJA', 'PARTICULAR']
+PLANTS = ['P002', 'P003', 'P004P', 'P005']
+UNITS = ['BP01', 'BP02', 'BP03', 'BP04']
+OPERATORS = ['JUAN PEREZ', 'LUIS GARCIA', 'MARIO LOPEZ', 'PEDRO RAMIREZ', 'JOSE HERNANDEZ', 'RAUL DIAZ']
+MB = 1 << 20
+
+
+def write_csv(path, n_rows, rng):
+    start = date(2025, 1, 1)
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        for i in range(n_rows):
+            writer.writerow([
+                100_000 + i, (start + timedelta(days=rng.randrange(365))).isoformat(), rng.choice(CLIENTS),
+                round(rng.uniform(1, 12), 1), '250.00', rng.choice(UNITS), rng.choice(OPERATORS), rng.choice(PLANTS),
+            ])
+
+
+def iter_csv(path):
+    with open(path, newline='', encoding='utf-8') as f:
+        for n, f_, c, v, p, u, o, pl in csv.reader(f):
+            yield n, date.fromisoformat(f_), c, float(v), float(p), u, o, pl
+
+
+def build_dicts(rows):
+    remisiones = [
+        {
+            'remision_number': n, 'fecha': f, 'cliente': c, 'volumen_fabricado': v,
+            'unit_price': p, 'unidad': u, 'operador': o, 'planta': pl,
+        }
+        for n, f, c, v, p, u, o, pl in rows
+    ]
+    groups = defaultdict(lambda: {'remisiones': [], 'total_volume': 0.0, 'unit_price': 0.0})
+    for r in remisiones:
+        g = groups[(r['fecha'], r['cliente'], r['planta'])]
+        g['remisiones'].append(r)
+        g['total_volume'] += r['volumen_fabricado']
+        g['unit_price'] = r['unit_price']
+    return remisiones, groups
+
+
+def build_records(rows):
+    remisiones = [Remision(*row) for row in rows]
+    groups = {}
+    for r in remisiones:
+        key = (r.fecha, r.cliente, r.planta)
+        g = groups.get(key)
+        if g is None:
+            g = groups[key] = PumpGroup(r.fecha, None, r.cliente, r.planta, None, r.unit_price)
+        g.add(r)
+    return remisiones, groups
+
+
+def measure(build, path):
+    gc.collect()
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    result = build(iter_csv(path))
+    elapsed = time.perf_counter() - t0
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current, peak, elapsed
+
+
+def run(name, build, path):
+    (_, groups), current, peak, elapsed = measure(build, path)
+    if name == 'dict rows':
+        totals = {k: (len(g['remisiones']), round(g['total_volume'], 6)) for k, g in groups.items()}
+    else:
+        totals = {k: (len(g.remisiones), round(g.total_volume, 6)) for k, g in groups.items()}
+    print(f"{name:16s} current {current / MB:8.1f} MB  peak {peak / MB:8.1f} MB  "
+          f"{elapsed:6.2f} s  groups={len(groups)}")
+    return current, peak, totals
+
+
+def main():
+    ap = argparse.ArgumentParser(description='Dict rows vs slotted records memory benchmark')
+    ap.add_argument('--rows', type=int, default=1_000_000)
+    ap.add_argument('--seed', type=int, default=5)
+    args = ap.parse_args()
+
+    results = {}
+    fd, path = tempfile.mkstemp(suffix='.csv')
+    os.close(fd)
+    try:
+        write_csv(path, args.rows, random.Random(args.seed))
+        print(f"rows={args.rows} csv={os.path.getsize(path) / MB:.1f} MB")
+        for name, build in (('dict rows', build_dicts), ('slotted records', build_records)):
+            results[name] = run(name, build, path)
+    finally:
+        os.unlink(path)
+
+    d_cur, _, d_totals = results['dict rows']
+    s_cur, _, s_totals = results['slotted records']
+    print(f"retained memory: {s_cur / d_cur:.2f}x of dict rows")
+    mismatch = d_totals != s_totals
+    print(f"group mismatch:  {mismatch}")
+    return 1 if mismatch else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
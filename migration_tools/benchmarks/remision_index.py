@@ -0,0 +1,102 @@
+"""
+Concrete remision number index: build + match cost for a month of pump rows.
+
+  python3 -m migration_tools.benchmarks.remision_index --concrete 50000 --pumps 10000 --max-gap 5
+
+Writes a synthetic concrete remisiones CSV export (``--concrete`` rows, numbering with
+gaps, P004-prefixed numbers), loads it into ConcreteRemisionIndex and matches ``--pumps``
+pump remisiones (mostly exact numbers, ``--gap-ratio`` falling in numbering gaps) with
+match_pump_remisiones. Gap lookups are checked against a linear nearest-number scan.
+"""
+import argparse
+import csv
+import os
+import random
+import tempfile
+import time
+import uuid
+
+from migration_tools.records import Remision
+from migration_tools.remision_index import (
+    ConcreteRemisionIndex,
+    load_concrete_remisiones,
+    match_pump_remisiones,
+)
+
+PLANT = 'af86c90f-c76f-44fb-9e2d-d5460ae51aca'
+
+
+def linear_nearest(numbers, number, max_gap):
+    best = None
+    for n in numbers:
+        d = abs(n - number)
+        if d <= max_gap and (best is None or d < abs(best - number) or (d == abs(best - number) and n < best)):
+            best = n
+    return best
+
+
+def main():
+    ap = argparse.ArgumentParser(description='Concrete remision index benchmark')
+    ap.add_argument('--concrete', type=int, default=50_000)
+    ap.add_argument('--pumps', type=int, default=10_000)
+    ap.add_argument('--gap-ratio', type=float, default=0.05)
+    ap.add_argument('--max-gap', type=int, default=5)
+    ap.add_argument('--linear-sample', type=int, default=200, help='Gap lookups cross-checked with a linear scan')
+    ap.add_argument('--seed', type=int, default=17)
+    args = ap.parse_args()
+
+    rng = random.Random(args.seed)
+    numbers, gaps = [], []
+    n = 6000
+    while len(numbers) < args.concrete:
+        n += 1
+        if rng.random() < 0.03:
+            skip = rng.randint(1, 4)
+            gaps.extend(range(n, n + skip))
+            n += skip
+        numbers.append(n)
+    orders = [str(uuid.UUID(int=rng.getrandbits(128))) for _ in range(args.concrete // 4)]
+
+    fd, path = tempfile.mkstemp(suffix='.csv')
+    os.close(fd)
+    try:
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            w = csv.writer(f)
+            w.writerow(['Remision', 'Pedido', 'Fecha', 'M3', 'Plant_ID', 'Tipo_Remision'])
+            for i, num in enumerate(numbers):
+                w.writerow([f'P004-{num:06d}', orders[i // 4], '2026-02-10', '7.0', PLANT, 'CONCRETO'])
+        t0 = time.perf_counter()
+        rows = load_concrete_remisiones(path, PLANT, '2026-02')
+        t_load = time.perf_counter() - t0
+    finally:
+        os.unlink(path)
+
+    t0 = time.perf_counter()
+    index = ConcreteRemisionIndex(rows)
+    t_build = time.perf_counter() - t0
+
+    pumps = []
+    for _ in range(args.pumps):
+        num = rng.choice(gaps) if gaps and rng.random() < args.gap_ratio else rng.choice(numbers)
+        pumps.append(Remision(str(num), None, None, 7.0, 0.0, 'BP04', None, None))
+
+    t0 = time.perf_counter()
+    _, nearby, unmatched = match_pump_remisiones(pumps, index, args.max_gap)
+    t_match = time.perf_counter() - t0
+
+    mismatches = 0
+    for pump, concrete, _ in nearby[:args.linear_sample]:
+        want = linear_nearest(numbers, int(pump), args.max_gap)
+        mismatches += want != int(concrete.rsplit('-', 1)[-1])
+
+    print(f"concrete={len(index)} pumps={len(pumps)} exact={len(pumps) - len(nearby) - len(unmatched)} "
+          f"nearby={len(nearby)} unmatched={len(unmatched)}")
+    print(f"load CSV export:  {t_load * 1000:9.1f} ms")
+    print(f"build index:      {t_build * 1000:9.1f} ms")
+    print(f"match pumps:      {t_match * 1000:9.1f} ms")
+    print(f"gap lookups vs linear scan: {mismatches} mismatches in {min(len(nearby), args.linear_sample)}")
+    return 1 if mismatches or unmatched else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
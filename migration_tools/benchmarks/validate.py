@@ -0,0 +1,96 @@
+"""
+Dry-run validation cost for a year of pumping remisiones.
+
+  python3 -m migration_tools.benchmarks.validate --remisiones 150000 --orders 30000
+
+Builds synthetic order_item / remision rows (2-6 remisiones per order, in the shape the
+generators hand to migration_tools.validate) and an orders snapshot with existing concrete
+order_items, then times load_validation_snapshot and validate_migration. A second run with
+``--corrupt`` rows broken (volume, price or a duplicated remision) checks that each one is
+reported.
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+import uuid
+
+from migration_tools.validate import load_validation_snapshot, validate_migration
+
+PLANT = '836cbbcf-67b2-4534-97cc-b83e71722ff7'
+
+
+def synthetic_year(n_remisiones, n_orders, rng):
+    order_ids = [str(uuid.UUID(int=rng.getrandbits(128))) for _ in range(n_orders)]
+    volumes = {}
+    remision_rows = []
+    for i in range(n_remisiones):
+        order_id = order_ids[i % n_orders]
+        volume = rng.randint(6, 24) / 2
+        volumes[order_id] = volumes.get(order_id, 0.0) + volume
+        day = f'2026-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}'
+        remision_rows.append((order_id, str(10000 + i), day, volume, 'OPERADOR', 'BP02', PLANT))
+    order_item_rows = []
+    for order_id, volume in volumes.items():
+        unit_price = float(rng.choice((280, 310, 360)))
+        order_item_rows.append((order_id, volume, unit_price, volume * unit_price))
+    snapshot = []
+    for order_id in order_ids:
+        concrete = round(rng.uniform(5, 60), 2) * 2100
+        snapshot.append({
+            'id': order_id, 'delivery_date': '2026-01-01', 'client_id': None, 'plant_id': PLANT,
+            'total_amount': concrete,
+            'order_items': [{'product_type': 'CONCRETO', 'volume': 10, 'pump_volume': None, 'total_price': concrete}],
+        })
+    return order_item_rows, remision_rows, snapshot
+
+
+def main():
+    ap = argparse.ArgumentParser(description='Migration validation benchmark')
+    ap.add_argument('--remisiones', type=int, default=150_000)
+    ap.add_argument('--orders', type=int, default=30_000)
+    ap.add_argument('--corrupt', type=int, default=30)
+    ap.add_argument('--seed', type=int, default=11)
+    args = ap.parse_args()
+
+    rng = random.Random(args.seed)
+    order_item_rows, remision_rows, snapshot_data = synthetic_year(args.remisiones, args.orders, rng)
+    fd, path = tempfile.mkstemp(suffix='.json')
+    os.close(fd)
+    try:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(snapshot_data, f)
+        t0 = time.perf_counter()
+        snapshot = load_validation_snapshot(path)
+        t_load = time.perf_counter() - t0
+    finally:
+        os.unlink(path)
+
+    t0 = time.perf_counter()
+    report = validate_migration(order_item_rows, remision_rows, snapshot)
+    t_validate = time.perf_counter() - t0
+
+    corrupt = rng.sample(range(len(order_item_rows)), args.corrupt)
+    for k, i in enumerate(corrupt):
+        order_id, volume, unit_price, total_price = order_item_rows[i]
+        if k % 3 == 0:
+            order_item_rows[i] = (order_id, volume + 1, unit_price, (volume + 1) * unit_price)
+        elif k % 3 == 1:
+            order_item_rows[i] = (order_id, volume, unit_price, total_price + 50)
+        else:
+            remision_rows.append(next(r for r in remision_rows if r[0] == order_id))
+            order_item_rows[i] = (order_id, volume + remision_rows[-1][3], unit_price,
+                                  (volume + remision_rows[-1][3]) * unit_price)
+    broken = validate_migration(order_item_rows, remision_rows, snapshot)
+
+    print(f"order_items={len(order_item_rows)} remisiones={len(remision_rows)} snapshot orders={len(snapshot)}")
+    print(f"load snapshot:    {t_load * 1000:9.1f} ms")
+    print(f"validate:         {t_validate * 1000:9.1f} ms  ({report.summary()})")
+    print(f"corrupted rows:   {args.corrupt} -> {len(broken.errors)} errors")
+    return 0 if report.ok and len(broken.errors) >= args.corrupt else 1
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
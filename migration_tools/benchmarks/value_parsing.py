@@ -0,0 +1,100 @@
+"""
+FECHA / P.U / M3 parsing with and without the per-column LRU caches (migration_tools/values.py),
+for every generator's ingest profile.
+
+  python3 -m migration_tools.benchmarks.value_parsing --rows 200000
+
+For each profile in migration_tools.ingest.PROFILES, the generator's real CSV from
+archive/data is tiled to ``--rows`` rows (remision numbers renumbered) in a temp file and
+parsed through CsvSource with ``cache_size=0`` (every cell parsed) and the default cache.
+Both must give the same Remision tuples; the cached run's hit rates are printed. A
+column-only pass then times the three value parsers alone on the same cells.
+"""
+import argparse
+import csv
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from migration_tools.csv_reader import CsvReader, header_key
+from migration_tools.ingest import PROFILES, CsvSource
+from migration_tools.values import DEFAULT_CACHE_SIZE, column_parsers
+
+DATA = Path(__file__).resolve().parents[2] / 'archive' / 'data'
+
+# ingest profile -> the CSV its generator reads
+PROFILE_CSVS = {
+    'plant-column': 'BOMBEO P.2 MARZO 2026.csv',
+    'january-2026': 'RELACION DE BOMBEO 2026 (1).csv',
+    'november-2025': 'BOMBEO P2 Y P4.csv',
+    'p004p-february-2026': 'BOMBEO PLATA P004P FEB.csv',
+    'p004p-march-2026': 'BOMBEO P4p MARZO 2026.csv',
+}
+
+
+def tile_csv(src, dst, n_rows):
+    with open(src, encoding='utf-8-sig', newline='') as f:
+        rows = list(csv.reader(f))
+    header, body = rows[0], [r for r in rows[1:] if any(c.strip() for c in r)]
+    i_rem = [header_key(name) for name in header].index('remision')
+    with open(dst, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        for i in range(n_rows):
+            row = list(body[i % len(body)])
+            prefix = row[i_rem].rpartition('-')[0]
+            row[i_rem] = f"{prefix}-{i + 1:07d}" if prefix else str(i + 1)
+            writer.writerow(row)
+
+
+def timed_parse(path, profile, cache_size):
+    source = CsvSource(path, profile, cache_size)
+    t0 = time.perf_counter()
+    rows = [r.astuple() for r in source.remisiones()]
+    return rows, source, time.perf_counter() - t0
+
+
+def column_pass(path, profile, cache_size):
+    profile = PROFILES[profile]
+    parsers = column_parsers(profile.year_map, cache_size, profile.blank_price)
+    rows = list(CsvReader(path, {name: name for name in parsers}).tuples())
+    t0 = time.perf_counter()
+    for i, parser in enumerate(parsers.values()):
+        for row in rows:
+            parser(row[i])
+    return time.perf_counter() - t0
+
+
+def main():
+    ap = argparse.ArgumentParser(description='Cached vs uncached FECHA / P.U / M3 parsing per ingest profile')
+    ap.add_argument('--rows', type=int, default=200_000)
+    ap.add_argument('--cache-size', type=int, default=DEFAULT_CACHE_SIZE)
+    args = ap.parse_args()
+
+    ok = True
+    fd, path = tempfile.mkstemp(suffix='.csv')
+    os.close(fd)
+    try:
+        print(f"{'profile':<22} {'uncached':>9} {'cached':>9} {'speedup':>8} {'values only':>18}  hit rate (FECHA / P.U / M3)")
+        for profile, name in PROFILE_CSVS.items():
+            tile_csv(DATA / name, path, args.rows)
+            plain, _, t_plain = timed_parse(path, profile, 0)
+            cached, source, t_cached = timed_parse(path, profile, args.cache_size)
+            same = plain == cached and len(cached) == args.rows
+            ok &= same
+            v_plain = column_pass(path, profile, 0)
+            v_cached = column_pass(path, profile, args.cache_size)
+            rates = ' / '.join(
+                f"{info.hits / max(info.hits + info.misses, 1):.1%}"
+                for info in (p.cache_info() for p in source.parsers.values())
+            )
+            print(f"{profile:<22} {t_plain:8.3f}s {t_cached:8.3f}s {t_plain / t_cached:7.2f}x "
+                  f"{v_plain:7.3f}s -> {v_cached:6.3f}s  {rates}  {'OK' if same else 'MISMATCH'}")
+    finally:
+        os.unlink(path)
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
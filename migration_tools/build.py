@@ -0,0 +1,366 @@
+"""
+Make-style rebuilds of generated migration .sql files (build_migrations.py).
+
+Targets come from a JSON file (default: migration_tools/build_targets.json, paths relative
+to the repo root):
+
+  {"targets": [
+    {"name": "p004p-february",
+     "output": "supabase/migrations/20260203_p004p_february_pumping_remisiones.sql",
+     "command": ["generate_p004p_february_migration.py"],
+     "inputs": ["archive/data/BOMBEO PLATA P004P FEB.csv"]}
+  ]}
+
+``command`` is a Python script plus its arguments, run from the repo root. A generator
+that prints its result instead of writing a file (generate_november_migration.py) sets
+``"stdout": true``: its standard output becomes ``output``. A target's
+inputs are its listed files plus the generator source: the script and every repo-local
+module it imports, followed transitively (ast). A target is stale when an input's sha256
+or its command changed since the last build, or its output is missing; a target whose
+inputs include another target's output builds after it. Independent targets run in
+parallel (each generator is its own process). A target whose listed input is not in the
+tree (e.g. an orders snapshot nobody has fetched) is reported as ``missing`` and not run,
+along with the targets that depend on it; that does not fail the build.
+
+State is kept in .cache/build_state.json. Digests are reused while a file's (size,
+mtime_ns) is unchanged, so a no-op build only stats files. An output edited by hand since
+it was built is left alone (reported) unless ``force``.
+"""
+import ast
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+
+from migration_tools.cache import file_digest
+
+ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_TARGETS_PATH = ROOT / 'migration_tools' / 'build_targets.json'
+DEFAULT_STATE_PATH = ROOT / '.cache' / 'build_state.json'
+STATE_VERSION = 1  # bump when the state layout or source discovery changes
+
+
+class BuildError(ValueError):
+    pass
+
+
+class Target:
+    __slots__ = ('name', 'output', 'command', 'inputs', 'stdout', 'deps')
+
+    def __init__(self, name, output, command, inputs=(), stdout=False):
+        self.name = name
+        self.output = output
+        self.command = list(command)
+        self.inputs = list(inputs)
+        self.stdout = stdout
+        self.deps = []
+
+    @property
+    def script(self):
+        return self.command[0]
+
+    def __repr__(self):
+        return f"Target({self.name!r} -> {self.output!r})"
+
+
+def load_targets(path=DEFAULT_TARGETS_PATH):
+    """Targets from a JSON file, with ``deps`` filled in from output -> input edges."""
+    with open(path, 'r', encoding='utf-8') as f:
+        raw = json.load(f)
+    targets = []
+    for i, t in enumerate(raw['targets']):
+        missing = [k for k in ('name', 'output', 'command') if not t.get(k)]
+        if missing:
+            raise BuildError(f"Target #{i + 1} in {path} is missing {', '.join(missing)}")
+        targets.append(Target(t['name'], t['output'], t['command'], t.get('inputs', ()), t.get('stdout', False)))
+
+    by_name, by_output = {}, {}
+    for t in targets:
+        if t.name in by_name:
+            raise BuildError(f"Duplicate target name {t.name!r} in {path}")
+        if t.output in by_output:
+            raise BuildError(f"{t.name} and {by_output[t.output].name} both write {t.output}")
+        by_name[t.name] = by_output[t.output] = t
+    for t in targets:
+        t.deps = [by_output[p] for p in t.inputs if p in by_output]
+    _check_acyclic(targets)
+    return targets
+
+
+def _check_acyclic(targets):
+    state = {}
+
+    def visit(t, path):
+        if state.get(t.name) == 'done':
+            return
+        if state.get(t.name) == 'active':
+            raise BuildError(f"Dependency cycle: {' -> '.join(path + [t.name])}")
+        state[t.name] = 'active'
+        for dep in t.deps:
+            visit(dep, path + [t.name])
+        state[t.name] = 'done'
+
+    for t in targets:
+        visit(t, [])
+
+
+def select_targets(targets, names):
+    """``names`` and everything they depend on, in file order; all targets when empty."""
+    if not names:
+        return list(targets)
+    by_name = {t.name: t for t in targets}
+    unknown = [n for n in names if n not in by_name]
+    if unknown:
+        raise BuildError(f"Unknown target(s): {', '.join(unknown)} (known: {', '.join(by_name)})")
+    wanted = set()
+    stack = [by_name[n] for n in names]
+    while stack:
+        t = stack.pop()
+        if t.name not in wanted:
+            wanted.add(t.name)
+            stack.extend(t.deps)
+    return [t for t in targets if t.name in wanted]
+
+
+def _module_files(module, base_dirs):
+    """Repo files a dotted import may load: package __init__s along the way + the module."""
+    parts = module.split('.')
+    for base in base_dirs:
+        found = []
+        for i in range(1, len(parts) + 1):
+            stem = base.joinpath(*parts[:i])
+            if (stem / '__init__.py').is_file():
+                found.append(stem / '__init__.py')
+            elif stem.with_suffix('.py').is_file() and i == len(parts):
+                found.append(stem.with_suffix('.py'))
+            else:
+                break
+        if found:
+            return found
+    return []
+
+
+def local_imports(path):
+    """Repo-local files imported by one Python file (not followed further)."""
+    path = Path(path)
+    tree = ast.parse(path.read_bytes(), str(path))
+    base_dirs = (path.parent, ROOT)
+    files = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                files.extend(_module_files(alias.name, base_dirs))
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            files.extend(_module_files(node.module, base_dirs))
+            for alias in node.names:
+                files.extend(_module_files(f'{node.module}.{alias.name}', base_dirs))
+    return sorted({str(f.resolve().relative_to(ROOT)) for f in files if ROOT in f.resolve().parents})
+
+
+class BuildState:
+    """Digests and per-target records in a JSON file; the file cache makes no-op runs stat-only."""
+
+    def __init__(self, path=DEFAULT_STATE_PATH):
+        self.path = Path(path)
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (FileNotFoundError, ValueError):
+            data = {}
+        if data.get('version') != STATE_VERSION:
+            data = {}
+        self.files = data.get('files', {})      # path -> [size, mtime_ns, sha256]
+        self.imports = data.get('imports', {})  # path -> [sha256, [local imports]]
+        self.targets = data.get('targets', {})  # name -> {'command', 'inputs', 'output'}
+        self.dirty = False
+
+    def digest(self, path):
+        """sha256 of a repo file, or None when it does not exist."""
+        try:
+            st = os.stat(ROOT / path)
+        except FileNotFoundError:
+            return None
+        known = self.files.get(path)
+        if known and known[0] == st.st_size and known[1] == st.st_mtime_ns:
+            return known[2]
+        digest = file_digest(ROOT / path)
+        self.files[path] = [st.st_size, st.st_mtime_ns, digest]
+        self.dirty = True
+        return digest
+
+    def sources(self, script):
+        """The script and its repo-local imports, transitively."""
+        seen = set()
+        stack = [script]
+        while stack:
+            path = stack.pop()
+            if path in seen:
+                continue
+            seen.add(path)
+            digest = self.digest(path)
+            if digest is None:
+                continue
+            known = self.imports.get(path)
+            if not known or known[0] != digest:
+                known = self.imports[path] = [digest, local_imports(ROOT / path)]
+                self.dirty = True
+            stack.extend(known[1])
+        return sorted(seen)
+
+    def record(self, target, inputs, output_digest):
+        self.targets[target.name] = {'command': target.command, 'inputs': inputs, 'output': output_digest}
+        self.dirty = True
+
+    def save(self):
+        if not self.dirty:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.path.parent, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({'version': STATE_VERSION, 'files': self.files, 'imports': self.imports,
+                           'targets': self.targets}, f, separators=(',', ':'))
+            os.replace(tmp, self.path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        self.dirty = False
+
+
+def input_digests(target, state):
+    """{path: sha256 or None} over the listed inputs and the generator source."""
+    paths = list(target.inputs) + [p for p in state.sources(target.script) if p not in target.inputs]
+    return {p: state.digest(p) for p in paths}
+
+
+def stale_reason(target, state, inputs):
+    """Why ``target`` needs a rebuild, or None when it is up to date."""
+    prev = state.targets.get(target.name)
+    if prev is None:
+        return 'never built'
+    if prev['command'] != target.command:
+        return 'command changed'
+    changed = [p for p, d in inputs.items() if prev['inputs'].get(p) != d]
+    if changed:
+        return f"changed: {', '.join(changed[:3])}" + (f" (+{len(changed) - 3})" if len(changed) > 3 else '')
+    if state.digest(target.output) is None:
+        return 'output missing'
+    return None
+
+
+def run_target(target):
+    """Run a target's generator; returns (ok, seconds, output text)."""
+    t0 = time.perf_counter()
+    if not target.stdout:
+        proc = subprocess.run(
+            [sys.executable, *target.command], cwd=ROOT,
+            stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+        )
+        return proc.returncode == 0, time.perf_counter() - t0, proc.stdout
+    output = ROOT / target.output
+    output.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=output.parent, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            proc = subprocess.run([sys.executable, *target.command], cwd=ROOT,
+                                  stdout=f, stderr=subprocess.PIPE, text=True)
+        if proc.returncode == 0:
+            os.replace(tmp, output)
+    finally:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+    return proc.returncode == 0, time.perf_counter() - t0, proc.stderr
+
+
+class BuildResult:
+    __slots__ = ('target', 'status', 'reason', 'seconds', 'log')
+
+    def __init__(self, target, status, reason=None, seconds=0.0, log=''):
+        self.target = target
+        self.status = status  # 'up-to-date', 'built', 'would-build', 'touched', 'missing', 'failed', 'skipped', 'modified'
+        self.reason = reason
+        self.seconds = seconds
+        self.log = log
+
+
+def build(targets, state, jobs=None, dry_run=False, force=False, touch=False, runner=run_target):
+    """
+    Bring ``targets`` up to date. Returns BuildResults in target order.
+
+    ``dry_run`` only reports what would run; ``touch`` records the current inputs and
+    outputs as built without running anything; ``force`` rebuilds everything, including
+    outputs edited since their last build.
+    """
+    results = {}
+    pending = {t.name: t for t in targets}
+    running = {}
+    jobs = jobs or os.cpu_count() or 1
+
+    def decide(t):
+        """Result for a target that does not need to run, else (inputs, reason) to run it."""
+        dep_status = {d.name: results[d.name].status for d in t.deps if d.name in results}
+        failed = [name for name, status in dep_status.items() if status in ('failed', 'skipped', 'modified')]
+        if failed:
+            return BuildResult(t, 'skipped', f"dependency not built: {', '.join(failed)}")
+        absent = [name for name, status in dep_status.items() if status == 'missing']
+        if absent:
+            return BuildResult(t, 'missing', f"dependency has missing inputs: {', '.join(absent)}")
+        if 'would-build' in dep_status.values():
+            return BuildResult(t, 'would-build', 'dependency would rebuild')
+        inputs = input_digests(t, state)
+        missing = [p for p, d in inputs.items() if d is None]
+        if missing:
+            return BuildResult(t, 'missing', f"not in tree: {', '.join(missing)}")
+        reason = 'forced' if force else stale_reason(t, state, inputs)
+        if touch:
+            if state.digest(t.output) is None:
+                return BuildResult(t, 'failed', 'output missing (nothing to record)')
+            state.record(t, inputs, state.digest(t.output))
+            return BuildResult(t, 'touched', reason)
+        prev = state.targets.get(t.name)
+        current = state.digest(t.output)
+        if not force and prev and current is not None and prev['output'] != current:
+            why = f"; also {reason}" if reason else ''
+            return BuildResult(t, 'modified', f"{t.output} edited since its last build{why}; --force rebuilds it")
+        if reason is None:
+            return BuildResult(t, 'up-to-date')
+        if dry_run:
+            return BuildResult(t, 'would-build', reason)
+        return inputs, reason
+
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        while pending or running:
+            progressed = False
+            for name, t in list(pending.items()):
+                if len(running) >= jobs:
+                    break
+                if any(d.name in pending or d.name in running for d in t.deps):
+                    continue
+                del pending[name]
+                progressed = True
+                decision = decide(t)
+                if isinstance(decision, BuildResult):
+                    results[name] = decision
+                    continue
+                running[pool.submit(runner, t)] = (t, *decision)
+            if not running:
+                if pending and not progressed:
+                    raise BuildError('Unresolvable dependencies: ' + ', '.join(pending))
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                t, inputs, reason = running.pop(future)
+                ok, seconds, log = future.result()
+                output = state.digest(t.output)
+                if ok and output is not None:
+                    state.record(t, inputs, output)
+                    results[t.name] = BuildResult(t, 'built', reason, seconds, log)
+                else:
+                    why = 'generator failed' if not ok else f"generator did not write {t.output}"
+                    results[t.name] = BuildResult(t, 'failed', why, seconds, log)
+    state.save()
+    return [results[t.name] for t in targets]
@@ -0,0 +1,169 @@
+"""
+On-disk cache of parsed pumping inputs (CSV remisiones, orders snapshots).
+
+Entries are pickles named by sha256(kind, parser version, parser source, input file bytes):
+editing an input, bumping the caller's parser version or editing the shared parsing code
+(PARSER_SOURCES: ingest, values, csv_reader, records, orders) is a miss, an unchanged rerun
+skips parsing.
+The directory is size-bounded; after each store the least recently used entries (file
+mtime, refreshed on every hit) are removed until the total fits ``max_bytes``.
+
+Default location: ``.cache/pumping`` at the repo root, or ``$PUMPING_CACHE_DIR``.
+"""
+import hashlib
+import os
+import pickle
+import tempfile
+from functools import lru_cache
+from pathlib import Path
+
+CACHE_DIR_ENV = 'PUMPING_CACHE_DIR'
+DEFAULT_CACHE_DIR = Path(__file__).resolve().parent.parent / '.cache' / 'pumping'
+DEFAULT_MAX_MB = 256
+_SUFFIX = '.pickle'
+# Modules whose code shapes every cached record; their source is part of each key.
+PARSER_SOURCES = tuple(
+    Path(__file__).resolve().parent / name
+    for name in ('ingest.py', 'values.py', 'csv_reader.py', 'records.py', 'orders.py')
+)
+
+
+def file_digest(path, chunk_size=1 << 20):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+@lru_cache(maxsize=None)
+def parser_source_digest():
+    """sha256 over PARSER_SOURCES, read once per process."""
+    h = hashlib.sha256()
+    for path in PARSER_SOURCES:
+        h.update(path.name.encode() + b'\0' + file_digest(path).encode())
+    return h.hexdigest()
+
+
+class ParseCache:
+    def __init__(self, directory=None, max_bytes=DEFAULT_MAX_MB << 20, enabled=True):
+        self.directory = Path(directory or os.environ.get(CACHE_DIR_ENV) or DEFAULT_CACHE_DIR)
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+
+    def key(self, kind, version, paths):
+        h = hashlib.sha256(f'{kind}\0{version}\0{parser_source_digest()}'.encode())
+        for path in paths:
+            h.update(b'\0' + file_digest(path).encode())
+        return f'{kind}-{h.hexdigest()[:40]}'
+
+    def get(self, key):
+        """Cached value or None (missing, disabled or unreadable entries are misses)."""
+        if not self.enabled:
+            return None
+        path = self.directory / (key + _SUFFIX)
+        try:
+            with open(path, 'rb') as f:
+                value = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError) as e:
+            print(f"WARNING: ignoring unreadable cache entry {path.name}: {e}")
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return value
+
+    def put(self, key, value):
+        if not self.enabled:
+            return
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp, self.directory / (key + _SUFFIX))
+            except BaseException:
+                os.unlink(tmp)
+                raise
+        except OSError as e:
+            print(f"WARNING: could not write cache entry {key}: {e}")
+            return
+        self.evict(keep=key + _SUFFIX)
+
+    def evict(self, keep=None):
+        """Drop least recently used entries until the directory fits max_bytes."""
+        entries = []
+        for path in self.directory.glob('*' + _SUFFIX):
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                continue  # removed by a concurrent run
+            entries.append((st.st_mtime, st.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries, key=lambda e: e[0]):
+            if total <= self.max_bytes:
+                break
+            if path.name == keep:
+                continue
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def clear(self):
+        for path in self.directory.glob('*' + _SUFFIX):
+            path.unlink(missing_ok=True)
+
+
+def cached_records(cache, kind, version, paths, parse, record):
+    """
+    parse(errors) -> list of ``record`` objects, appending log lines to ``errors``.
+
+    Records are stored as ``astuple()`` tuples and rebuilt with ``record(*row)``; the log
+    lines are stored with them and printed again on a hit, so a cached rerun logs the same
+    parse errors.
+    """
+    if cache is None or not cache.enabled:
+        return parse([])
+    key = cache.key(kind, version, paths)
+    hit = cache.get(key)
+    if hit is not None:
+        rows, errors = hit
+        for line in errors:
+            print(line)
+        print(f"Parse cache hit ({kind}): {len(rows)} records")
+        return [record(*row) for row in rows]
+    errors = []
+    records = parse(errors)
+    cache.put(key, ([r.astuple() for r in records], errors))
+    return records
+
+
+def cached_value(cache, kind, version, paths, build):
+    """build() through the cache (value must be picklable). Returns (value, hit)."""
+    if cache is None or not cache.enabled:
+        return build(), False
+    key = cache.key(kind, version, paths)
+    value = cache.get(key)
+    if value is not None:
+        return value, True
+    value = build()
+    cache.put(key, value)
+    return value, False
+
+
+def add_cache_args(parser):
+    parser.add_argument('--no-cache', action='store_true', help='Always re-parse the CSV / orders JSON')
+    parser.add_argument('--cache-dir', default=None,
+                        help=f'Parse cache directory (default ${CACHE_DIR_ENV} or .cache/pumping)')
+    parser.add_argument('--cache-max-mb', type=int, default=DEFAULT_MAX_MB,
+                        help='Evict least recently used cache entries above this size')
+
+
+def cache_from_args(args):
+    return ParseCache(args.cache_dir, max_bytes=args.cache_max_mb << 20, enabled=not args.no_cache)
@@ -0,0 +1,135 @@
+"""
+Client alias resolution for pumping CSVs.
+
+``client_aliases.json`` is the alias table: one entry per client (``key``, DB ``id``,
+display ``name`` used in SQL comments, upper-case ``aliases``, and ``generators``, the
+scripts or exports whose CSVs it applies to: ``plant2``, ``january``, ``november``, and the
+batch-only ``november-p3`` / ``december``). Adding a client or a spelling means editing that
+file, not the generators. Each scope only sees its own entries, the clients its old if/elif
+chain (or export) knew, so e.g. IMPULSORA stays unresolved in the plant-2 report and DECODI
+in January; an entry without ``generators`` applies to all.
+
+Matching keeps the old ``if 'X' in cliente.upper(): ... elif ...`` semantics: an alias
+matches anywhere in the upper-cased CSV value and, when several match, the one listed
+first in the table wins. All aliases are compiled into one Aho-Corasick automaton, so a
+value is scanned once regardless of table size, and results are memoized per distinct
+raw CSV value.
+"""
+import json
+from collections import deque
+from pathlib import Path
+
+ALIASES_PATH = Path(__file__).resolve().parent / 'client_aliases.json'
+
+
+class Client:
+    __slots__ = ('key', 'id', 'name')
+
+    def __init__(self, key, id, name):
+        self.key = key
+        self.id = id
+        self.name = name
+
+    def __repr__(self):
+        return f"Client({self.key!r}, {self.id!r})"
+
+
+class _AliasAutomaton:
+    """Aho-Corasick over upper-case aliases; ``best`` returns the lowest-priority value found."""
+
+    def __init__(self, patterns):
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [None]  # (priority, value) of the best alias ending here, incl. via fail links
+
+        for priority, (pattern, value) in enumerate(patterns):
+            node = 0
+            for ch in pattern:
+                nxt = self._goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[node][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(None)
+                node = nxt
+            if self._out[node] is None or priority < self._out[node][0]:
+                self._out[node] = (priority, value)
+
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                queue.append(child)
+                f = self._fail[node]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                self._fail[child] = self._goto[f].get(ch, 0)
+                inherited = self._out[self._fail[child]]
+                if inherited is not None and (self._out[child] is None or inherited[0] < self._out[child][0]):
+                    self._out[child] = inherited
+
+    def best(self, text):
+        goto, fail, out = self._goto, self._fail, self._out
+        node = 0
+        best = None
+        for ch in text:
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            hit = out[node]
+            if hit is not None and (best is None or hit[0] < best[0]):
+                best = hit
+                if best[0] == 0:
+                    break
+        return best[1] if best else None
+
+
+class ClientResolver:
+    """Raw CSV ``CLIENTE`` value -> Client (or None), built once per run."""
+
+    def __init__(self, entries, generator=None):
+        self.clients = []
+        patterns = []
+        for entry in entries:
+            if generator is not None and generator not in entry.get('generators', (generator,)):
+                continue
+            client = Client(entry['key'], entry['id'], entry['name'])
+            self.clients.append(client)
+            for alias in entry.get('aliases') or [entry['key']]:
+                patterns.append((alias.upper(), client))
+        self._automaton = _AliasAutomaton(patterns)
+        self._memo = {}
+
+    @classmethod
+    def from_json(cls, path=ALIASES_PATH, generator=None):
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f), generator)
+
+    def resolve(self, raw_name):
+        try:
+            return self._memo[raw_name]
+        except KeyError:
+            client = self._memo[raw_name] = self._automaton.best(raw_name.upper())
+            return client
+
+    def client_ids(self):
+        return {c.key: c.id for c in self.clients}
+
+
+def alias_scopes(path=ALIASES_PATH):
+    """Every ``generators`` value in the alias table, sorted."""
+    with open(path, 'r', encoding='utf-8') as f:
+        return tuple(sorted({g for entry in json.load(f) for g in entry.get('generators', ())}))
+
+
+_defaults = {}
+
+
+def default_resolver(generator=None):
+    """Resolver over the client_aliases.json entries of ``generator`` (None: every entry), one per process."""
+    try:
+        return _defaults[generator]
+    except KeyError:
+        resolver = _defaults[generator] = ClientResolver.from_json(generator=generator)
+        return resolver
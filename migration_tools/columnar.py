@@ -0,0 +1,112 @@
+"""
+Columnar grouping of parsed remisiones: the optional ``--group-backend columnar`` path of
+group_remisiones for analytics-sized inputs (a year of pump reports across plants).
+
+The dict backend walks the rows one by one: resolve the client, look up the plant, format
+the date, find the group, append, ``+=`` the volume. Here the rows are held as columns and
+each of those steps runs once per distinct value or as one C-level pass over a column:
+
+1. RemisionColumns encodes every row's (fecha, cliente, planta) as an int code (an
+   ``array('l')``; distinct keys in first-seen order) next to an ``array('d')`` of volumes.
+2. Each distinct key is resolved once (client id, plant id, date string) to its group code.
+3. A stable sort of the row positions by group code puts each group's rows together in
+   file order; Counter gives the group sizes and each slice's volumes are added left to
+   right, so the groups, their order, their remisiones and their float totals are exactly
+   those of the dict backend.
+
+numpy is not a dependency of this repo, so the columns are stdlib ``array``s and the
+vector steps are map / sorted / Counter passes (see migration_tools/benchmarks/columnar.py).
+"""
+from array import array
+from collections import Counter
+from functools import reduce
+from operator import add, attrgetter
+
+from migration_tools.records import PumpGroup
+
+GROUP_BACKENDS = ('dict', 'columnar')
+
+_RAW_KEY = attrgetter('fecha', 'cliente', 'planta')
+_VOLUME = attrgetter('volumen_fabricado')
+
+
+class RemisionColumns:
+    """
+    Remisiones as columns: ``key_codes[i]`` indexes ``keys`` (distinct (fecha, cliente,
+    planta) in first-seen order), ``volumes[i]`` is row i's volume; ``rows`` keeps the
+    Remision objects for the groups' member lists.
+    """
+
+    __slots__ = ('rows', 'keys', 'key_codes', 'volumes')
+
+    def __init__(self, remisiones):
+        self.rows = [r for r in remisiones if r is not None]
+        raw_keys = list(map(_RAW_KEY, self.rows))
+        self.keys = list(dict.fromkeys(raw_keys))
+        index = {key: i for i, key in enumerate(self.keys)}
+        self.key_codes = array('l', map(index.__getitem__, raw_keys))
+        self.volumes = array('d', map(_VOLUME, self.rows))
+
+    def __len__(self):
+        return len(self.rows)
+
+
+def group_columns(remisiones, resolve_client, plant_ids):
+    """
+    (date_str, client_id, plant_id) -> PumpGroup, same as the generators' group_remisiones.
+    Returns (groups, skipped): ``skipped`` lists (remision, 'client' | 'plant') in row order
+    for rows with an unknown client or plant, for the caller to report.
+    """
+    cols = remisiones if isinstance(remisiones, RemisionColumns) else RemisionColumns(remisiones)
+    rows = cols.rows
+
+    group_codes = {}    # group key -> group code, in first-seen order
+    group_meta = []     # group code -> (client, plant_id)
+    key_group = array('l')
+    reasons = {}
+    for fecha, cliente, planta in cols.keys:
+        client = resolve_client(cliente)
+        plant_id = plant_ids.get(planta) if client is not None else None
+        if not plant_id:
+            reasons[len(key_group)] = 'client' if client is None else 'plant'
+            key_group.append(-1)
+            continue
+        key = (fecha.strftime('%Y-%m-%d'), client.id, plant_id)
+        code = group_codes.get(key)
+        if code is None:
+            code = group_codes[key] = len(group_meta)
+            group_meta.append((client, plant_id))
+        key_group.append(code)
+
+    row_groups = array('l', map(key_group.__getitem__, cols.key_codes))
+    skipped = []
+    if reasons:
+        key_codes = cols.key_codes
+        skipped = [(rows[i], reasons[key_codes[i]]) for i, g in enumerate(row_groups) if g < 0]
+
+    order = sorted(range(len(rows)), key=row_groups.__getitem__)
+    sizes = Counter(row_groups)
+    start = sizes.pop(-1, 0)
+    volumes = cols.volumes
+    groups = {}
+    for key, code in group_codes.items():
+        end = start + sizes[code]
+        members = order[start:end]
+        start = end
+        client, plant_id = group_meta[code]
+        first = rows[members[0]]
+        group = PumpGroup(first.fecha, client.id, client.name, first.planta, plant_id, first.unit_price)
+        group.remisiones = list(map(rows.__getitem__, members))
+        group.total_volume = reduce(add, map(volumes.__getitem__, members), 0.0)
+        groups[key] = group
+    return groups, skipped
+
+
+def add_group_backend_args(parser):
+    parser.add_argument(
+        '--group-backend',
+        choices=GROUP_BACKENDS,
+        default='dict',
+        help="Group remisiones row by row (dict, default) or over array columns (columnar; "
+             "same groups, faster on year-sized CSVs)",
+    )
@@ -0,0 +1,205 @@
+"""
+One CSV reader for the ingestion scripts: header aliases resolved once, rows mapped by position.
+
+The exports these scripts read are messy in the same few ways: a UTF-8 BOM glued to the
+first header ('\\ufeffRemisión'), padded header names (' P.U ', ' PLANTA  '), accents and
+case that differ between months ('Remision' / 'REMISIÓN'), cp1252 files from Excel, and
+trailing empty columns and rows (the December pump report has ten unnamed columns after
+PLANTA and a block of ,,,,, lines at the end).
+
+CsvReader deals with all of that once per file:
+
+* ``sniff_encoding``: BOM (UTF-8 / UTF-16) first, else UTF-8 if the first 64 KB decode,
+  else cp1252 (latin-1 as the last resort);
+* the header is cleaned (BOM and surrounding spaces removed, trailing unnamed columns
+  dropped) and each requested field is matched through its aliases by ``header_key``
+  (accents folded, case-insensitive, whitespace collapsed);
+* rows become ``Record`` namedtuples (tuple subclasses, no per-row dict) built by a single
+  itemgetter over the row, stripped; missing optional columns read as ''. Blank rows are
+  skipped.
+
+  reader = CsvReader(path, {'remision': ('remision', 'remisión'), 'fecha': 'fecha'}, required=('remision',))
+  for rec in reader:
+      rec.remision, rec.fecha
+
+``dicts()`` yields {cleaned header: stripped value} for scripts that look columns up by
+computed names.
+
+rows() / tuples() / dicts() skip rows whose cells are all empty and drop cells under
+trailing unnamed columns. Where a report must count and keep rows exactly as
+csv.DictReader did (the EMA inventory audit), use ``raw_rows()`` with ``padded()`` and
+``raw_dict()`` instead.
+"""
+import codecs
+import csv
+import re
+import unicodedata
+from collections import namedtuple
+from operator import itemgetter
+
+SNIFF_BYTES = 1 << 16
+
+_SPACES = re.compile(r'\s+')
+_strip = str.strip
+
+
+def sniff_encoding(path, sample_size=SNIFF_BYTES):
+    """Best-guess text encoding of ``path`` from its first ``sample_size`` bytes."""
+    with open(path, 'rb') as f:
+        head = f.read(sample_size)
+    if head.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    if head.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return 'utf-16'
+    try:
+        head.decode('utf-8')
+    except UnicodeDecodeError as e:
+        if e.start < len(head) - 3:  # not just a multi-byte character cut by the sample
+            try:
+                head.decode('cp1252')
+                return 'cp1252'
+            except UnicodeDecodeError:
+                return 'latin-1'
+    return 'utf-8-sig'
+
+
+def header_key(name):
+    """'\\ufeff Remisión ' -> 'remision': accents folded, casefolded, whitespace collapsed."""
+    s = unicodedata.normalize('NFKD', (name or '').replace('\ufeff', ''))
+    s = ''.join(c for c in s if not unicodedata.combining(c))
+    return _SPACES.sub(' ', s).strip().casefold()
+
+
+def clean_header(header):
+    """Strip names and the BOM; drop trailing unnamed columns."""
+    names = [(name or '').replace('\ufeff', '').strip() for name in header]
+    while names and not names[-1]:
+        names.pop()
+    return names
+
+
+class CsvReader:
+    """
+    Iterate ``path`` as Record namedtuples with the fields of ``columns`` ({field: alias or
+    (aliases...)}, fields in that order). ``required`` fields must match a header column
+    (ValueError otherwise). After construction ``header`` is the cleaned header, ``found``
+    maps each field to the header name it matched (None when missing) and ``encoding`` is
+    the encoding used. ``columns=None`` keeps every header column (see dicts());
+    ``strip=False`` keeps cell values as written (header names are always cleaned).
+    """
+
+    def __init__(self, path, columns=None, required=(), encoding=None, errors='strict', strip=True):
+        self.path = path
+        self.strip = strip
+        self.encoding = encoding or sniff_encoding(path)
+        self.errors = errors
+        with self._open() as f:
+            first = next(csv.reader(f), None)
+        self.raw_header = first or []
+        self.header = clean_header(self.raw_header)
+        self.width = len(self.header)
+        index = {header_key(name): i for i, name in enumerate(self.header) if name}
+
+        if columns is None:
+            columns = {}
+        self.fields = tuple(columns)
+        self.found = {}
+        positions = []
+        for field, aliases in columns.items():
+            if isinstance(aliases, str):
+                aliases = (aliases,)
+            pos = next((index[k] for k in map(header_key, aliases) if k in index), None)
+            self.found[field] = None if pos is None else self.header[pos]
+            positions.append(self.width if pos is None else pos)  # width -> the '' pad cell
+        missing = [f for f in required if self.found.get(f) is None]
+        if missing:
+            raise ValueError(f"{path}: no column for {', '.join(missing)} in header {self.header}")
+        self.Record = namedtuple('Record', self.fields, rename=True) if self.fields else None
+        if len(positions) == 1:
+            pos = positions[0]
+            self._getter = lambda row: (row[pos],)
+        else:
+            self._getter = itemgetter(*positions) if positions else None
+
+    def _open(self):
+        return open(self.path, 'r', encoding=self.encoding, errors=self.errors, newline='')
+
+    def rows(self):
+        """Raw rows (lists) after the header, blank ones skipped, padded to the header + 1."""
+        need = self.width + 1
+        with self._open() as f:
+            reader = csv.reader(f)
+            next(reader, None)
+            for row in reader:
+                if not any(row):
+                    continue
+                if len(row) < need:
+                    row.extend([''] * (need - len(row)))
+                else:
+                    row[self.width] = ''  # unnamed trailing column doubles as the missing-field cell
+                yield row
+
+    def raw_rows(self):
+        """Rows as csv.DictReader iterates them: only empty lines skipped, cells untouched."""
+        with self._open() as f:
+            reader = csv.reader(f)
+            next(reader, None)
+            for row in reader:
+                if row:
+                    yield row
+
+    def padded(self, row):
+        """Copy of a raw_rows() row laid out like a rows() row, for record()."""
+        need = self.width + 1
+        if len(row) < need:
+            return row + [''] * (need - len(row))
+        row = row[:need]
+        row[self.width] = ''
+        return row
+
+    def raw_dict(self, row):
+        """csv.DictReader's dict for a raw_rows() row: header as written, extra cells under
+        None, missing cells None."""
+        header = self.raw_header
+        d = dict(zip(header, row))
+        if len(row) > len(header):
+            d[None] = row[len(header):]
+        else:
+            for key in header[len(row):]:
+                d[key] = None
+        return d
+
+    def record(self, row):
+        """Record for one raw row from rows()."""
+        values = self._getter(row)
+        return self.Record._make(map(_strip, values) if self.strip else values)
+
+    def as_dict(self, row):
+        """{cleaned header name: value} for one raw row from rows()."""
+        values = row[:self.width]
+        return dict(zip(self.header, map(_strip, values) if self.strip else values))
+
+    def tuples(self):
+        """Value tuples in field order (stripped unless strip=False)."""
+        getter = self._getter
+        if getter is None:
+            raise ValueError('CsvReader(columns=None) has no fields; use dicts()')
+        strip = self.strip
+        for row in self.rows():
+            values = tuple(map(_strip, getter(row))) if strip else getter(row)
+            if any(values):
+                yield values
+
+    def __iter__(self):
+        make = self.Record._make if self.Record else None
+        if make is None:
+            raise ValueError('CsvReader(columns=None) has no fields; use dicts()')
+        return map(make, self.tuples())
+
+    def dicts(self):
+        """{cleaned header name: value}, every named column."""
+        return map(self.as_dict, self.rows())
+
+
+def read_records(path, columns, required=(), **kwargs):
+    return list(CsvReader(path, columns, required, **kwargs))
@@ -0,0 +1,330 @@
+"""
+Index of remisiones already emitted by SQL migrations (incremental / delta generation).
+
+``scan_sql`` pulls ``(plant_id, remision_number, tipo_remision)`` out of a migration's
+``INSERT INTO remisiones`` statements in every shape migration_tools.sql renders
+(one-row INSERT, multi-row VALUES, COPY into a staging table + INSERT ... SELECT).
+Only rows whose plant_id and remision_number are string literals are indexed, so trigger
+and function bodies (``VALUES (NEW.x, ...)``) are ignored.
+
+``EmittedIndex`` keeps the scan results in SQLite, one row set per migration file, and on
+``refresh`` re-scans only files whose size/mtime changed *and* whose sha256 differs;
+deleted files drop out. Checking a CSV is one primary-key probe per row (``emitted_among``),
+so it costs milliseconds however many migrations are indexed.
+"""
+import re
+import sqlite3
+from pathlib import Path
+
+from migration_tools.cache import file_digest
+
+_ROOT = Path(__file__).resolve().parent.parent
+MIGRATIONS_DIR = _ROOT / 'supabase' / 'migrations'
+DEFAULT_INDEX_PATH = _ROOT / '.cache' / 'emitted_remisiones.sqlite'
+SCANNER_VERSION = 1  # bump when scan_sql or the schema changes; forces a full re-scan
+
+_INSERT_RE = re.compile(r'\bINSERT\s+INTO\s+(?:public\.)?remisiones\s*\(([^)]*)\)\s*(VALUES|SELECT)\b', re.I)
+_COPY_RE = re.compile(r'^COPY\s+(?:public\.)?(\w+)\s*\(([^)]*)\)\s+FROM\s+STDIN\s*;[ \t]*\r?$', re.I | re.M)
+_TOKEN_RE = re.compile(r"'(?:[^']|'')*'|--[^\n]*|[(),;]|\bFROM\s+(\w+)", re.I)
+_CAST_RE = re.compile(r'(?:::\s*[\w ]+)+$')
+_IDENT_RE = re.compile(r'^[A-Za-z_]\w*$')
+_COPY_ESCAPES = {'t': '\t', 'n': '\n', 'r': '\r', '\\': '\\'}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+  id INTEGER PRIMARY KEY,
+  path TEXT NOT NULL UNIQUE,
+  mtime_ns INTEGER NOT NULL,
+  size INTEGER NOT NULL,
+  sha256 TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS emitted (
+  tipo_remision TEXT NOT NULL,
+  plant_id TEXT NOT NULL,
+  remision_number TEXT NOT NULL,
+  file_id INTEGER NOT NULL,
+  PRIMARY KEY (tipo_remision, plant_id, remision_number, file_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS emitted_file ON emitted (file_id);
+"""
+
+
+class _Ref:
+    """A bare column reference in an INSERT ... SELECT list."""
+    __slots__ = ('name',)
+
+    def __init__(self, name):
+        self.name = name.lower()
+
+
+_OTHER = object()  # any expression that is neither a literal nor a column (NOW(), numbers, ...)
+
+
+def _columns(text):
+    return [c.strip().strip('"').lower() for c in text.split(',')]
+
+
+def _value(expr):
+    expr = _CAST_RE.sub('', expr.strip()).strip()
+    if len(expr) >= 2 and expr[0] == "'" and expr[-1] == "'":
+        return expr[1:-1].replace("''", "'")
+    if expr.upper() == 'NULL':
+        return None
+    if _IDENT_RE.match(expr):
+        return _Ref(expr)
+    return _OTHER
+
+
+def _iter_tuples(text, pos):
+    """Field texts of each top-level (...) tuple from pos up to the statement's ';'."""
+    depth = 0
+    start = pos
+    fields = []
+    for m in _TOKEN_RE.finditer(text, pos):
+        tok = m.group(0)
+        if tok == '(':
+            depth += 1
+            if depth == 1:
+                start, fields = m.end(), []
+        elif tok == ')':
+            depth -= 1
+            if depth == 0:
+                fields.append(text[start:m.start()])
+                yield fields
+        elif tok == ',' and depth == 1:
+            fields.append(text[start:m.start()])
+            start = m.end()
+        elif tok == ';' and depth == 0:
+            return
+
+
+def _select_list(text, pos):
+    """(expressions, source table) of 'SELECT a, b, ... FROM table' starting at pos."""
+    depth = 0
+    start = pos
+    exprs = []
+    for m in _TOKEN_RE.finditer(text, pos):
+        tok = m.group(0)
+        if tok == '(':
+            depth += 1
+        elif tok == ')':
+            depth -= 1
+        elif tok == ',' and depth == 0:
+            exprs.append(text[start:m.start()])
+            start = m.end()
+        elif m.group(1) and depth == 0:
+            exprs.append(text[start:m.start()])
+            return exprs, m.group(1).lower()
+        elif tok == ';' and depth == 0:
+            break
+    return exprs, None
+
+
+def _copy_unescape(field):
+    if field == '\\N':
+        return None
+    if '\\' not in field:
+        return field
+    out = []
+    i = 0
+    while i < len(field):
+        c = field[i]
+        if c == '\\' and i + 1 < len(field):
+            out.append(_COPY_ESCAPES.get(field[i + 1], field[i + 1]))
+            i += 2
+        else:
+            out.append(c)
+            i += 1
+    return ''.join(out)
+
+
+def _copy_blocks(text):
+    """table -> list of {column: value} rows for every inline COPY ... FROM STDIN block."""
+    blocks = {}
+    for m in _COPY_RE.finditer(text):
+        cols = _columns(m.group(2))
+        rows = blocks.setdefault(m.group(1).lower(), [])
+        end = text.find('\n\\.', m.end())
+        body = text[m.end():end if end >= 0 else len(text)]
+        for line in body.split('\n'):
+            line = line.rstrip('\r')
+            if line:
+                rows.append(dict(zip(cols, (_copy_unescape(f) for f in line.split('\t')))))
+    return blocks
+
+
+_KEY_COLUMNS = ('plant_id', 'remision_number', 'tipo_remision')
+
+
+def _key(plant_id, number, tipo):
+    if isinstance(plant_id, str) and isinstance(number, str):
+        return plant_id, number.strip(), tipo if isinstance(tipo, str) else None
+    return None
+
+
+def _key_positions(cols):
+    """Index of plant_id / remision_number / tipo_remision in cols (None when absent)."""
+    return tuple(cols.index(c) if c in cols else None for c in _KEY_COLUMNS)
+
+
+def scan_sql(text):
+    """Yield (plant_id, remision_number, tipo_remision) for every remision a migration inserts."""
+    if 'remisiones' not in text.lower():
+        return
+    copies = None
+    positions = {}  # column list text -> key positions (one-row INSERTs repeat the same list)
+    for m in _INSERT_RE.finditer(text):
+        if m.group(2).upper() == 'VALUES':
+            pos = positions.get(m.group(1))
+            if pos is None:
+                pos = positions[m.group(1)] = _key_positions(_columns(m.group(1)))
+            if pos[0] is None or pos[1] is None:
+                continue
+            for fields in _iter_tuples(text, m.end()):
+                key = _key(*(_value(fields[i]) if i is not None and i < len(fields) else None for i in pos))
+                if key:
+                    yield key
+            continue
+
+        if copies is None:
+            copies = _copy_blocks(text)
+        exprs, table = _select_list(text, m.end())
+        if table is None or table == 'remisiones':
+            continue
+        if table in copies:
+            exprs = dict(zip(_columns(m.group(1)), (_value(e) for e in exprs)))
+            sources = [exprs.get(c) for c in _KEY_COLUMNS]
+            for staged in copies[table]:
+                key = _key(*(staged.get(e.name) if isinstance(e, _Ref) else e for e in sources))
+                if key:
+                    yield key
+    if copies is None:
+        copies = _copy_blocks(text) if 'from stdin' in text.lower() else {}
+    for staged in copies.get('remisiones', ()):
+        key = _key(*(staged.get(c) for c in _KEY_COLUMNS))
+        if key:
+            yield key
+
+
+class EmittedIndex:
+    """Persistent (plant_id, remision_number, tipo_remision) index over a migrations directory."""
+
+    def __init__(self, db_path=DEFAULT_INDEX_PATH):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.db_path))
+        if self.conn.execute('PRAGMA user_version').fetchone()[0] != SCANNER_VERSION:
+            self.conn.executescript('DROP TABLE IF EXISTS files; DROP TABLE IF EXISTS emitted;')
+            self.conn.execute(f'PRAGMA user_version = {SCANNER_VERSION}')
+        self.conn.executescript(_SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def refresh(self, migrations_dir=MIGRATIONS_DIR, pattern='*.sql'):
+        """Sync with the directory. Returns (files_on_disk, files_rescanned)."""
+        known = {row[0]: row[1:] for row in self.conn.execute('SELECT path, id, mtime_ns, size, sha256 FROM files')}
+        on_disk = {}
+        for path in sorted(Path(migrations_dir).glob(pattern)):
+            st = path.stat()
+            on_disk[str(path.resolve())] = (path, st.st_mtime_ns, st.st_size)
+
+        rescanned = 0
+        with self.conn:
+            for gone in known.keys() - on_disk.keys():
+                self.conn.execute('DELETE FROM emitted WHERE file_id = ?', (known[gone][0],))
+                self.conn.execute('DELETE FROM files WHERE id = ?', (known[gone][0],))
+            for key, (path, mtime_ns, size) in on_disk.items():
+                prev = known.get(key)
+                if prev and prev[1] == mtime_ns and prev[2] == size:
+                    continue
+                digest = file_digest(path)
+                if prev is not None and prev[3] == digest:
+                    self.conn.execute('UPDATE files SET mtime_ns = ?, size = ? WHERE id = ?', (mtime_ns, size, prev[0]))
+                    continue
+                if prev is None:
+                    file_id = self.conn.execute(
+                        'INSERT INTO files (path, mtime_ns, size, sha256) VALUES (?, ?, ?, ?)',
+                        (key, mtime_ns, size, digest),
+                    ).lastrowid
+                else:
+                    file_id = prev[0]
+                    self.conn.execute(
+                        'UPDATE files SET mtime_ns = ?, size = ?, sha256 = ? WHERE id = ?',
+                        (mtime_ns, size, digest, file_id),
+                    )
+                    self.conn.execute('DELETE FROM emitted WHERE file_id = ?', (file_id,))
+                text = path.read_text(encoding='utf-8', errors='replace')
+                self.conn.executemany(
+                    'INSERT OR IGNORE INTO emitted (tipo_remision, plant_id, remision_number, file_id) '
+                    'VALUES (?, ?, ?, ?)',
+                    ((tipo or '', plant_id, number, file_id) for plant_id, number, tipo in scan_sql(text)),
+                )
+                rescanned += 1
+        return len(on_disk), rescanned
+
+    def _ignored_ids(self, ignore_paths):
+        paths = [str(Path(p).resolve()) for p in ignore_paths]
+        if not paths:
+            return []
+        return [row[0] for row in self.conn.execute(
+            f"SELECT id FROM files WHERE path IN ({', '.join('?' * len(paths))})", paths,
+        )]
+
+    def emitted_among(self, keys, tipo_remision='BOMBEO', ignore_paths=()):
+        """
+        The subset of ``keys`` ({(plant_id, remision_number)}) some migration already inserts
+        as ``tipo_remision``, not counting ``ignore_paths`` (e.g. the file being regenerated).
+        Probes the primary key once per key, so cost follows the CSV, not the index size.
+        """
+        ignored = self._ignored_ids(ignore_paths)
+        self.conn.execute('CREATE TEMP TABLE IF NOT EXISTS probe (plant_id TEXT, remision_number TEXT)')
+        self.conn.execute('DELETE FROM probe')
+        self.conn.executemany('INSERT INTO probe VALUES (?, ?)', keys)
+        sql = (
+            # CROSS JOIN pins probe as the outer loop (SQLite has no stats for the temp table)
+            'SELECT p.plant_id, p.remision_number FROM probe AS p '
+            'CROSS JOIN emitted AS e ON e.tipo_remision = ? AND e.plant_id = p.plant_id '
+            'AND e.remision_number = p.remision_number'
+        )
+        if ignored:
+            sql += f" WHERE e.file_id NOT IN ({', '.join('?' * len(ignored))})"
+        return set(self.conn.execute(sql, (tipo_remision, *ignored)))
+
+    def sources(self, plant_id, remision_number, tipo_remision='BOMBEO'):
+        """Migration files that insert a given remision (for reports)."""
+        return [row[0] for row in self.conn.execute(
+            'SELECT f.path FROM emitted AS e JOIN files AS f ON f.id = e.file_id '
+            'WHERE e.tipo_remision = ? AND e.plant_id = ? AND e.remision_number = ?',
+            (tipo_remision, plant_id, remision_number),
+        )]
+
+
+def open_emitted_index(migrations_dir=MIGRATIONS_DIR, index_path=DEFAULT_INDEX_PATH, refresh=True):
+    """
+    Open (and by default refresh) the index for a generator run; caller closes it.
+
+    ``refresh=False`` only reads it (batch workers, after the parent refreshed it).
+    """
+    index = EmittedIndex(index_path)
+    if refresh:
+        files, rescanned = index.refresh(migrations_dir)
+        print(f"Emitted index: {files} migration files (re-scanned {rescanned})")
+    return index
+
+
+def add_incremental_args(parser):
+    parser.add_argument(
+        '--incremental',
+        action='store_true',
+        help='Skip remisiones already emitted as BOMBEO by another migration in --migrations-dir',
+    )
+    parser.add_argument('--migrations-dir', default=str(MIGRATIONS_DIR), help='Migrations scanned by --incremental')
+    parser.add_argument('--emitted-index', default=str(DEFAULT_INDEX_PATH),
+                        help='SQLite index kept by --incremental (safe to delete)')
@@ -0,0 +1,361 @@
+"""
+Orders snapshots for the generators, fetched from PostgREST (Supabase REST) with asyncio.
+
+Replaces the one-month scripts/fetch-*-orders.ts: any date range and plant set, same
+output shape (id, delivery_date, client_id, plant_id, plus updated_at; ``--with-items``
+adds total_amount + order_items for --validate, ``--with-concrete-remisiones`` adds
+concrete_remisiones + concrete_volume for the P004P solver).
+
+  python3 -m migration_tools.fetch_orders --env-file .env.local --plant P002 \\
+    --from 2026-03-01 --to 2026-03-31 --output archive/data/march_orders.json
+
+Pages (``limit``/``offset``, ordered by delivery_date, id) are requested concurrently, at
+most ``--concurrency`` in flight, in a sliding window; the first page asks for
+``Prefer: count=exact`` so the page count is known up front. Failed requests (connection
+errors, 429, 5xx) are retried with exponential backoff and jitter, honouring Retry-After.
+Pages are written to a temp file in order as they arrive and renamed over ``--output``
+at the end, so a failed fetch never leaves a half-written snapshot.
+
+``--incremental`` reads the existing snapshot, asks only for orders with ``updated_at``
+newer than its newest row (any plant / date / status, so orders moved out of the range or
+cancelled are dropped) and merges by id. Deleted orders are not detected; do a full fetch
+now and then.
+
+HTTP goes through urllib in worker threads (asyncio.to_thread): no third-party client.
+migration_tools/benchmarks/fetch_orders.py runs it against a local stub server.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import deque
+from itertools import count
+from pathlib import Path
+
+from migration_tools.ingest import PLANTS
+from migration_tools.orders import delivery_date_str
+
+PLANT_IDS = {code: plant.id for code, plant in PLANTS.items()}
+
+BASE_SELECT = 'id,delivery_date,client_id,plant_id,order_status,updated_at'
+ITEMS_SELECT = 'total_amount,order_items(product_type,volume,pump_volume,total_price)'
+CONCRETE_SELECT = 'remisiones(remision_number,fecha,volumen_fabricado,tipo_remision)'
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class FetchError(RuntimeError):
+    pass
+
+
+def postgrest_in(values):
+    return f"in.({','.join(values)})"
+
+
+def normalize_order(row):
+    """PostgREST order row -> snapshot record (the shape the fetch-*-orders.ts scripts write)."""
+    order = {
+        'id': row['id'],
+        'delivery_date': delivery_date_str(row['delivery_date']) if row.get('delivery_date') else row.get('delivery_date'),
+        'client_id': row.get('client_id'),
+        'plant_id': row.get('plant_id'),
+        'updated_at': row.get('updated_at'),
+    }
+    if 'order_items' in row:
+        order['total_amount'] = row.get('total_amount')
+        order['order_items'] = row.get('order_items') or []
+    if 'remisiones' in row:
+        concrete = [
+            {
+                'remision_number': r['remision_number'],
+                'fecha': delivery_date_str(r['fecha']) if r.get('fecha') else r.get('fecha'),
+                'volumen_fabricado': float(r['volumen_fabricado'] or 0),
+            }
+            for r in row.get('remisiones') or ()
+            if r.get('tipo_remision') == 'CONCRETO'
+        ]
+        order['concrete_volume'] = sum(r['volumen_fabricado'] for r in concrete)
+        order['concrete_remisiones'] = concrete
+    return order
+
+
+class PostgrestClient:
+    """GET pages from a PostgREST root (``{SUPABASE_URL}/rest/v1`` or a stub server)."""
+
+    def __init__(self, base_url, api_key=None, concurrency=8, page_size=1000, retries=5,
+                 backoff=0.5, timeout=30):
+        self.base_url = base_url.rstrip('/')
+        self.api_key = api_key
+        self.page_size = page_size
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.concurrency = concurrency
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self.requests = 0
+        self.retried = 0
+
+    def _request(self, url, headers):
+        req = urllib.request.Request(url, headers=headers)
+        with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+            return json.load(resp), resp.headers.get('Content-Range')
+
+    async def get(self, table, params, count_exact=False):
+        """(rows, total or None) for one request, retried on transient failures."""
+        url = f"{self.base_url}/{table}?{urllib.parse.urlencode(params, safe='(),.:*')}"
+        headers = {'Accept': 'application/json'}
+        if self.api_key:
+            headers['apikey'] = self.api_key
+            headers['Authorization'] = f'Bearer {self.api_key}'
+        if count_exact:
+            headers['Prefer'] = 'count=exact'
+        for attempt in range(self.retries + 1):
+            retry_after = None
+            async with self._semaphore:
+                self.requests += 1
+                try:
+                    rows, content_range = await asyncio.to_thread(self._request, url, headers)
+                    break
+                except urllib.error.HTTPError as e:
+                    if e.code not in RETRY_STATUSES or attempt == self.retries:
+                        body = e.read().decode('utf-8', 'replace')[:300]
+                        raise FetchError(f"GET {table} failed: HTTP {e.code} {body}") from e
+                    retry_after = e.headers.get('Retry-After')
+                except (urllib.error.URLError, OSError) as e:
+                    if attempt == self.retries:
+                        raise FetchError(f"GET {table} failed after {attempt + 1} attempts: {e}") from e
+            self.retried += 1
+            delay = self.backoff * (2 ** attempt) * (0.5 + random.random())
+            if retry_after and retry_after.isdigit():
+                delay = max(delay, float(retry_after))
+            await asyncio.sleep(delay)
+        total = None
+        if content_range and '/' in content_range:
+            tail = content_range.rsplit('/', 1)[1]
+            total = int(tail) if tail.isdigit() else None
+        return rows, total
+
+    async def iter_pages(self, table, params):
+        """
+        Yield pages of ``params`` ([(key, value)]) in offset order, keeping up to
+        2 x ``concurrency`` page requests scheduled. With a known total, a server-side
+        max-rows cap below ``page_size`` just shrinks the step.
+        """
+        first, total = await self.get(table, params + [('limit', self.page_size), ('offset', 0)], count_exact=True)
+        yield first
+        if not first or total is not None and total <= len(first):
+            return
+        if total is not None:
+            offsets = iter(range(len(first), total, len(first)))
+        elif len(first) < self.page_size:
+            return
+        else:
+            offsets = count(self.page_size, self.page_size)
+        window = deque()
+
+        def schedule():
+            while len(window) < self.concurrency * 2:
+                offset = next(offsets, None)
+                if offset is None:
+                    return
+                window.append(asyncio.ensure_future(
+                    self.get(table, params + [('limit', self.page_size), ('offset', offset)])
+                ))
+
+        schedule()
+        try:
+            while window:
+                rows, _ = await window.popleft()
+                yield rows
+                if total is None and len(rows) < self.page_size:
+                    return
+                schedule()
+        finally:
+            for task in window:
+                task.cancel()
+
+
+def order_filters(plant_ids=(), date_from=None, date_to=None, include_cancelled=False):
+    params = []
+    if plant_ids:
+        params.append(('plant_id', postgrest_in(plant_ids)))
+    if date_from:
+        params.append(('delivery_date', f'gte.{date_from}'))
+    if date_to:
+        params.append(('delivery_date', f'lte.{date_to}'))
+    if not include_cancelled:
+        params.append(('order_status', 'not.eq.CANCELLED'))
+    return params
+
+
+def _select(with_items=False, with_concrete=False):
+    return ','.join([BASE_SELECT] + [ITEMS_SELECT] * with_items + [CONCRETE_SELECT] * with_concrete)
+
+
+def _matches(row, plant_ids, date_from, date_to):
+    day = delivery_date_str(row['delivery_date']) if row.get('delivery_date') else ''
+    return (
+        row.get('order_status') != 'CANCELLED'
+        and (not plant_ids or row.get('plant_id') in plant_ids)
+        and (not date_from or day >= date_from)
+        and (not date_to or day <= date_to)
+    )
+
+
+class _SnapshotWriter:
+    """JSON array (2-space indent, like the TS scripts) written to a temp file, renamed on close."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, self.tmp = tempfile.mkstemp(dir=self.path.parent, suffix='.tmp')
+        self.f = os.fdopen(fd, 'w', encoding='utf-8')
+        self.f.write('[')
+        self.count = 0
+        self.seen = set()
+
+    def write(self, order):
+        if order['id'] in self.seen:  # offset paging can repeat a row that moved between pages
+            return
+        self.seen.add(order['id'])
+        body = json.dumps(order, indent=2, ensure_ascii=False).replace('\n', '\n  ')
+        self.f.write(('\n  ' if not self.count else ',\n  ') + body)
+        self.count += 1
+
+    def commit(self):
+        self.f.write('\n]' if self.count else ']')
+        self.f.close()
+        os.replace(self.tmp, self.path)
+
+    def abort(self):
+        self.f.close()
+        os.unlink(self.tmp)
+
+
+async def fetch_orders(client, output, plant_ids=(), date_from=None, date_to=None, with_items=False,
+                       with_concrete=False):
+    """Full fetch streamed to ``output``; returns the number of orders written."""
+    params = order_filters(plant_ids, date_from, date_to) + [
+        ('select', _select(with_items, with_concrete)), ('order', 'delivery_date.asc,id.asc'),
+    ]
+    writer = _SnapshotWriter(output)
+    try:
+        async for page in client.iter_pages('orders', params):
+            for row in page:
+                writer.write(normalize_order(row))
+    except BaseException:
+        writer.abort()
+        raise
+    writer.commit()
+    return writer.count
+
+
+async def refresh_orders(client, output, plant_ids=(), date_from=None, date_to=None, with_items=False,
+                         with_concrete=False):
+    """
+    Incremental refresh of an existing snapshot by updated_at. Returns (orders written,
+    changed rows fetched); falls back to a full fetch when the snapshot has no updated_at.
+    """
+    try:
+        with open(output, 'r', encoding='utf-8') as f:
+            existing = json.load(f)
+    except FileNotFoundError:
+        existing = []
+    stamps = [o['updated_at'] for o in existing if o.get('updated_at')]
+    if not stamps:
+        return await fetch_orders(client, output, plant_ids, date_from, date_to, with_items, with_concrete), None
+
+    params = [
+        ('updated_at', f'gt.{max(stamps)}'),
+        ('select', _select(with_items, with_concrete)), ('order', 'updated_at.asc,id.asc'),
+    ]
+    changed = {}
+    async for page in client.iter_pages('orders', params):
+        for row in page:
+            changed[row['id']] = row
+    kept = [o for o in existing if o['id'] not in changed]
+    kept.extend(normalize_order(r) for r in changed.values() if _matches(r, plant_ids, date_from, date_to))
+    kept.sort(key=lambda o: (o.get('delivery_date') or '', o['id']))
+
+    writer = _SnapshotWriter(output)
+    try:
+        for order in kept:
+            writer.write(order)
+    except BaseException:
+        writer.abort()
+        raise
+    writer.commit()
+    return writer.count, len(changed)
+
+
+def load_env_file(path):
+    """KEY=VALUE lines (like node --env-file) into os.environ, without overriding it."""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#') or '=' not in line:
+                continue
+            key, value = line.split('=', 1)
+            os.environ.setdefault(key.strip().removeprefix('export '), value.strip().strip('"\''))
+
+
+def plant_id(value):
+    return PLANT_IDS.get(value.upper(), value)
+
+
+def main():
+    ap = argparse.ArgumentParser(description='Fetch an orders snapshot from PostgREST')
+    ap.add_argument('--output', required=True, help='Snapshot JSON to write (e.g. archive/data/march_orders.json)')
+    ap.add_argument('--plant', action='append', default=[], type=plant_id,
+                    help=f"Plant code ({', '.join(PLANT_IDS)}) or id; repeatable (default: all plants)")
+    ap.add_argument('--from', dest='date_from', help='First delivery_date, YYYY-MM-DD')
+    ap.add_argument('--to', dest='date_to', help='Last delivery_date, YYYY-MM-DD')
+    ap.add_argument('--with-items', action='store_true', help='Add total_amount + order_items (for --validate)')
+    ap.add_argument('--with-concrete-remisiones', action='store_true',
+                    help='Add concrete_remisiones + concrete_volume (P004P --orders-json)')
+    ap.add_argument('--incremental', action='store_true', help='Merge orders updated since the existing --output')
+    ap.add_argument('--base-url', help='PostgREST root (default: $NEXT_PUBLIC_SUPABASE_URL/rest/v1)')
+    ap.add_argument('--env-file', help='Load NEXT_PUBLIC_SUPABASE_URL / SUPABASE_SERVICE_ROLE_KEY from this file')
+    ap.add_argument('--concurrency', type=int, default=8, help='Page requests in flight')
+    ap.add_argument('--page-size', type=int, default=1000, help='Rows per page (PostgREST max-rows caps it)')
+    ap.add_argument('--retries', type=int, default=5)
+    args = ap.parse_args()
+
+    if args.env_file:
+        load_env_file(args.env_file)
+    base_url = args.base_url
+    if not base_url:
+        supabase_url = os.environ.get('NEXT_PUBLIC_SUPABASE_URL')
+        if not supabase_url:
+            print('Missing NEXT_PUBLIC_SUPABASE_URL (or --base-url). Load .env.local with --env-file')
+            sys.exit(1)
+        base_url = supabase_url.rstrip('/') + '/rest/v1'
+    api_key = os.environ.get('SUPABASE_SERVICE_ROLE_KEY') or os.environ.get('NEXT_PUBLIC_SUPABASE_ANON_KEY')
+
+    async def run():
+        client = PostgrestClient(base_url, api_key, args.concurrency, args.page_size, args.retries)
+        fetch = refresh_orders if args.incremental else fetch_orders
+        result = await fetch(client, args.output, args.plant, args.date_from, args.date_to,
+                             args.with_items, args.with_concrete_remisiones)
+        return client, result
+
+    try:
+        client, result = asyncio.run(run())
+    except FetchError as e:
+        print(f"ERROR: {e}")
+        sys.exit(1)
+    if args.incremental and isinstance(result, tuple):
+        written, changed = result
+        detail = 'full fetch (no updated_at in snapshot)' if changed is None else f'{changed} changed orders merged'
+    else:
+        written, detail = result, 'full fetch'
+    print(f"Saved {written} orders to {args.output} ({detail}; {client.requests} requests, {client.retried} retried)")
+
+
+if __name__ == '__main__':
+    main()
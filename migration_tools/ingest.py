@@ -0,0 +1,244 @@
+"""
+One ingestion engine for the pumping CSVs (CSV row -> Remision), driven by profiles.
+
+Every export has the same columns (REMISION, FECHA, CLIENTE, M3, P.U, UNIDAD, OPERADOR and
+usually PLANTA); what changes from file to file is declared in an IngestProfile instead of
+being re-implemented in each generator:
+
+* ``year_map`` for exports that carry a wrong year (January 2026 was exported as 1/2/25:
+  ``{25: 2026}``); otherwise two-digit years are 20yy (migration_tools/values.py);
+* how the remision number is written (``raw``, or ``numeric`` for P004-006287 -> 6287);
+* unit and operator defaults for blank cells, and whether a blank P.U is 0 (``blank_price``)
+  or an unparseable row;
+* how a row finds its plant: the PLANTA column, a unit -> plant map (November's mixed
+  ``BOMBEO P2 Y P4.csv`` sends BP02 to P004), or the profile's ``default_plant``.
+
+Units are canonicalized with UNIT_ALIASES (BP-02 / BP2 -> BP02) and plants come from
+PLANTS, so a single pass over a mixed CSV can be split by plant with ``route_csv``.
+
+Hot path, shared by all generators: rows come from migration_tools/csv_reader.py as
+stripped value tuples in INGEST_COLUMNS order (header aliases resolved once per file, so
+' PLANTA  ', 'Remision' and October's BOMBA column match), and each tuple is parsed by a
+closure with the profile's rules bound as locals. FECHA, P.U and M3 go through per-file
+LRU-cached ColumnParsers (migration_tools/values.py), which also count parse failures per
+column.
+"""
+from migration_tools.csv_reader import CsvReader
+from migration_tools.records import Remision
+from migration_tools.values import DEFAULT_CACHE_SIZE, column_parsers, error_summary
+
+
+class Plant:
+    __slots__ = ('code', 'id', 'label')
+
+    def __init__(self, code, id, label):
+        self.code = code
+        self.id = id
+        self.label = label
+
+    def __repr__(self):
+        return f"Plant({self.code!r}, {self.label!r})"
+
+
+PLANTS = {
+    'P002': Plant('P002', '836cbbcf-67b2-4534-97cc-b83e71722ff7', 'Tijuana Planta 2'),
+    'P003': Plant('P003', 'baf175a7-fcf7-4e71-b18f-e952d8802129', 'Tijuana Planta 3'),
+    'P004': Plant('P004', '78fba7b9-645a-4006-96e7-e6c4d5a9d10e', 'Tijuana Planta 4'),
+    'P004P': Plant('P004P', 'af86c90f-c76f-44fb-9e2d-d5460ae51aca', 'Pitahaya'),
+}
+
+# Pump unit spellings seen in the exports -> canonical code. Anything else is kept upper-cased.
+UNIT_ALIASES = {
+    'BP1': 'BP01', 'BP-01': 'BP01', 'BP01': 'BP01',
+    'BP2': 'BP02', 'BP-02': 'BP02', 'BP02': 'BP02',
+    'BP3': 'BP03', 'BP-03': 'BP03', 'BP03': 'BP03',
+    'BP4': 'BP04', 'BP-04': 'BP04', 'BP04': 'BP04',
+}
+
+REMISION_NUMBER_STYLES = ('raw', 'numeric')
+
+
+class IngestProfile:
+    """
+    How to read one pumping export. ``units``: a spelling -> code map (None keeps units as
+    written). ``upper_units`` (opt-in) upper-cases the unit first, as the plant-2, January and
+    P004P February generators did; November and P004P March kept it as typed.
+    ``plant_by_unit`` wins over ``plant_column``; rows with neither fall back to
+    ``default_plant`` (or '' when there is none, which the generators report as an unknown
+    plant). ``blank_price``: the unit price of a row whose P.U is blank; None
+    (the default) rejects the row, so a price-less trip is reported instead of billed at 0.
+    """
+
+    def __init__(self, name, year_map=None, remision_number='raw', units=UNIT_ALIASES, default_unit=None,
+                 default_operator=None, plant_column='PLANTA', plant_by_unit=None, default_plant=None,
+                 blank_price=None, upper_units=False):
+        if remision_number not in REMISION_NUMBER_STYLES:
+            raise ValueError(f"Unknown remision_number {remision_number!r}; expected one of {REMISION_NUMBER_STYLES}")
+        self.name = name
+        self.year_map = year_map or {}
+        self.remision_number = remision_number
+        self.units = units
+        self.default_unit = default_unit
+        self.default_operator = default_operator
+        self.plant_column = plant_column
+        self.plant_by_unit = plant_by_unit or {}
+        self.default_plant = default_plant
+        self.blank_price = blank_price
+        self.upper_units = upper_units
+
+    def __repr__(self):
+        return f"IngestProfile({self.name!r})"
+
+
+PROFILES = {p.name: p for p in (
+    # Monthly RELACION / BOMBEO exports with a PLANTA column (generate_plant2_pumping_migration.py).
+    # The plant-column and P004P generators always read a blank P.U as 0; January and
+    # November rejected such rows.
+    IngestProfile('plant-column', default_unit='RENTADA', blank_price=0.0, upper_units=True),
+    IngestProfile('january-2026', year_map={25: 2026}, default_unit='RENTADA', upper_units=True),
+    IngestProfile('november-2025', plant_column=None, plant_by_unit={'BP02': 'P004'}, default_plant='P002'),
+    # BOMBEO PLANTA 3.csv: November 2025 trips of plant 3 only, no PLANTA column.
+    IngestProfile('p003-november-2025', plant_column=None, default_plant='P003', upper_units=True),
+    IngestProfile('p004p-february-2026', remision_number='numeric', units=None, default_unit='BP04',
+                  default_operator='OMAR SANCHEZ', plant_column=None, default_plant='P004P', blank_price=0.0,
+                  upper_units=True),
+    IngestProfile('p004p-march-2026', remision_number='numeric', units=None, default_unit='BP-04',
+                  default_operator='Omar Saucedo', plant_column=None, default_plant='P004P', blank_price=0.0),
+)}
+
+
+def get_profile(profile):
+    """IngestProfile or its name -> IngestProfile."""
+    if isinstance(profile, IngestProfile):
+        return profile
+    try:
+        return PROFILES[profile]
+    except KeyError:
+        raise ValueError(f"Unknown ingest profile {profile!r}; expected one of {sorted(PROFILES)}") from None
+
+
+def numeric_remision(value):
+    """'1857' -> '1857', 'P004-006287' -> '6287'."""
+    parts = str(value).strip().split('-')
+    return str(int(parts[-1]))
+
+
+# Record field -> header aliases (matched by csv_reader.header_key). 'planta' comes from the profile.
+INGEST_COLUMNS = {
+    'remision': 'remision',
+    'fecha': 'fecha',
+    'cliente': 'cliente',
+    'm3': 'm3',
+    'pu': 'p.u',
+    'unidad': ('unidad', 'bomba'),
+    'operador': 'operador',
+}
+REQUIRED_COLUMNS = ('remision', 'fecha', 'm3')
+
+
+def csv_reader(path, profile):
+    """CsvReader over INGEST_COLUMNS plus the profile's plant column."""
+    profile = get_profile(profile)
+    columns = dict(INGEST_COLUMNS, planta=profile.plant_column or ())
+    return CsvReader(path, columns, REQUIRED_COLUMNS)
+
+
+def row_parser(profile, parsers=None):
+    """
+    Compile ``profile``: returns parse(values) -> Remision for a csv_reader tuple, raising on
+    rows it cannot parse. ``parsers``: the values.column_parsers(...) to use (and whose
+    error counters to fill).
+    """
+    profile = get_profile(profile)
+    if parsers is None:
+        parsers = column_parsers(profile.year_map, blank_price=profile.blank_price)
+    parse_fecha, parse_price, parse_volume = parsers['FECHA'], parsers['P.U'], parsers['M3']
+    numeric = profile.remision_number == 'numeric'
+    units = profile.units
+    default_unit = profile.default_unit
+    default_operator = profile.default_operator
+    plant_by_unit = profile.plant_by_unit
+    default_plant = profile.default_plant or ''
+    upper_units = profile.upper_units
+
+    def parse(values):
+        number, fecha, cliente, m3, pu, unit, operador, plant = values
+        if numeric:
+            number = numeric_remision(number)
+        if upper_units:
+            unit = unit.upper()
+        if units is not None:
+            unit = units.get(unit, unit)
+        unit = unit or default_unit
+        return Remision(
+            number,
+            parse_fecha(fecha),
+            cliente,
+            parse_volume(m3),
+            parse_price(pu),
+            unit,
+            operador or default_operator,
+            plant_by_unit.get(unit) or plant or default_plant,
+        )
+
+    return parse
+
+
+class CsvSource:
+    """
+    One pumping CSV read through a profile. Iterating yields the stripped value tuples of the
+    rows that carry a REMISION; ``parse`` turns them into Remision objects. The two are
+    separate stages so generators can time them apart (migration_tools.profiling).
+    ``parsers`` holds the file's cached FECHA / P.U / M3 ColumnParsers (per-column error
+    counts, cache_info()) and ``failed`` the number of rows that could not be parsed.
+    """
+
+    def __init__(self, path, profile, cache_size=DEFAULT_CACHE_SIZE):
+        self.path = path
+        self.profile = get_profile(profile)
+        self.reader = csv_reader(path, self.profile)
+        self.parsers = column_parsers(self.profile.year_map, cache_size, self.profile.blank_price)
+        self.failed = 0
+
+    def __iter__(self):
+        return (values for values in self.reader.tuples() if values[0])
+
+    def parse(self, rows, errors=None):
+        """Yield a Remision per row; failures are printed (and appended to ``errors``) and skipped."""
+        parse = row_parser(self.profile, self.parsers)
+        for values in rows:
+            try:
+                yield parse(values)
+            except Exception as e:
+                self.failed += 1
+                message = f"Error parsing remision {values[0]}: {e}"
+                print(message)
+                if errors is not None:
+                    errors.append(message)
+        if self.failed:
+            by_column = error_summary(self.parsers)
+            print(f"{self.failed} unparseable row(s) in {self.path}" + (f" ({by_column})" if by_column else ''))
+
+    def remisiones(self, errors=None):
+        return self.parse(self, errors)
+
+
+def read_remisiones(path, profile, errors=None):
+    """Every parsed Remision of ``path``."""
+    return list(CsvSource(path, profile).remisiones(errors))
+
+
+def route(remisiones):
+    """{plant_code: [Remision]} in file order."""
+    by_plant = {}
+    for r in remisiones:
+        rows = by_plant.get(r.planta)
+        if rows is None:
+            rows = by_plant[r.planta] = []
+        rows.append(r)
+    return by_plant
+
+
+def route_csv(path, profile, errors=None):
+    """Read a (possibly mixed-plant) CSV once and split its remisiones by plant code."""
+    return route(CsvSource(path, profile).remisiones(errors))
@@ -0,0 +1,95 @@
+"""
+Order snapshot index for matching pumping groups to orders.
+
+Orders come from ``archive/data/*_orders.json`` (``fetch-*-orders.ts``): dicts with
+``id``, ``delivery_date`` (``YYYY-MM-DD`` or ISO timestamp), ``client_id`` and ``plant_id``,
+held as migration_tools.records.OrderRef. The index is built once per run; lookups are
+dict hits plus a bisect per group.
+"""
+from bisect import bisect_left
+from datetime import date, datetime
+
+from migration_tools.records import order_refs
+
+
+def delivery_date_str(value):
+    """'2026-03-01' / '2026-03-01T00:00:00' / date -> '2026-03-01'."""
+    if isinstance(value, str):
+        return value.split('T')[0] if 'T' in value else value
+    return value.strftime('%Y-%m-%d')
+
+
+def to_ordinal(value):
+    """Date string or date -> proleptic ordinal (days)."""
+    if isinstance(value, datetime):
+        return value.date().toordinal()
+    if isinstance(value, date):
+        return value.toordinal()
+    return date.fromisoformat(delivery_date_str(value)).toordinal()
+
+
+class OrderIndex:
+    """
+    Orders bucketed by (client_id, plant_id) with pre-parsed, sorted delivery ordinals.
+
+    ``exact`` keeps the first order per (date, client, plant) in snapshot order, like the
+    old ``orders_by_key[key][0]``. ``closest`` reproduces ``find_closest_order``: minimum
+    day distance, and on a tie the latest (snapshot order) order *before* the target date
+    wins over the one after it.
+    """
+
+    def __init__(self, orders_data):
+        """``orders_data``: OrderRefs, or raw snapshot dicts (converted here)."""
+        self._by_key = {}
+        buckets = {}
+        ordinal_cache = {}
+        for pos, order in enumerate(order_refs(orders_data)):
+            date_str = delivery_date_str(order.delivery_date)
+            key = (date_str, order.client_id, order.plant_id)
+            if key not in self._by_key:
+                self._by_key[key] = order
+            ordinal = ordinal_cache.get(date_str)
+            if ordinal is None:
+                ordinal = ordinal_cache[date_str] = to_ordinal(date_str)
+            buckets.setdefault((order.client_id, order.plant_id), []).append((ordinal, pos, order))
+
+        self._ordinals = {}
+        self._orders = {}
+        for bucket_key, entries in buckets.items():
+            entries.sort(key=lambda e: (e[0], e[1]))  # pos breaks ties; never compares orders
+            self._ordinals[bucket_key] = [e[0] for e in entries]
+            self._orders[bucket_key] = [e[2] for e in entries]
+
+    def __len__(self):
+        return sum(len(v) for v in self._orders.values())
+
+    def exact(self, date_str, client_id, plant_id):
+        return self._by_key.get((date_str, client_id, plant_id))
+
+    def closest(self, target_date, client_id, plant_id):
+        """Return (order, day_diff) or (None, None) when the client/plant has no orders."""
+        ordinals = self._ordinals.get((client_id, plant_id))
+        if not ordinals:
+            return None, None
+        orders = self._orders[(client_id, plant_id)]
+        target = to_ordinal(target_date)
+
+        i = bisect_left(ordinals, target)
+        after = i if i < len(ordinals) else None
+        before = i - 1 if i > 0 else None
+
+        if after is not None and ordinals[after] == target:
+            return orders[after], 0
+        if before is None:
+            return orders[after], ordinals[after] - target
+        before_diff = target - ordinals[before]
+        if after is None or before_diff <= ordinals[after] - target:
+            return orders[before], before_diff
+        return orders[after], ordinals[after] - target
+
+    def match(self, date_str, client_id, plant_id):
+        """Exact (date, client, plant) hit first, then nearest date. Returns (order, day_diff)."""
+        order = self.exact(date_str, client_id, plant_id)
+        if order is not None:
+            return order, 0
+        return self.closest(date_str, client_id, plant_id)
@@ -0,0 +1,294 @@
+"""
+Stage timing for the migration generators (--profile).
+
+A run is split into named stages (read_csv, parse, group, match, render, write, ...). Each
+stage records calls, wall time, rows in / out and peak traced memory:
+
+  with profiler.stage('group', rows_in=len(remisiones)) as st:
+      groups = group_remisiones(remisiones)
+      st.rows_out = len(groups)
+
+  rows = profiler.iter_stage('parse', iter_parsed(rows), upstream='read_csv')
+
+``seconds`` is self time: time spent in nested stages (e.g. the parse generator pulled by
+group in --stream mode) is charged to the nested stage only, so the stage seconds add up
+to the instrumented wall time. ``peak_bytes`` is the tracemalloc peak while the stage (or
+anything it calls) was running; tracing slows Python allocation down, so use
+--profile-no-memory for clean wall times.
+
+With ``enabled=False`` (the default, NULL_PROFILER) stage() hands back a shared no-op
+context and iter_stage() returns the iterable unchanged, so instrumented code costs one
+attribute lookup per stage when --profile is off.
+
+With ``cprofile=True`` every stage gets its own cProfile.Profile (switched on only while
+that stage's own code runs); dump_hottest() writes the one with the most self time.
+"""
+import cProfile
+import json
+import sys
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+_perf = time.perf_counter
+
+
+class StageStats:
+    __slots__ = ('name', 'calls', 'seconds', 'inclusive_seconds', 'rows_in', 'rows_out', 'peak_bytes',
+                 'upstream', 'profile')
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.seconds = 0.0
+        self.inclusive_seconds = 0.0
+        self.rows_in = None
+        self.rows_out = None
+        self.peak_bytes = None
+        self.upstream = None
+        self.profile = None
+
+    def as_dict(self):
+        return {
+            'name': self.name,
+            'calls': self.calls,
+            'seconds': round(self.seconds, 6),
+            'inclusive_seconds': round(self.inclusive_seconds, 6),
+            'rows_in': self.rows_in,
+            'rows_out': self.rows_out,
+            'peak_bytes': self.peak_bytes,
+        }
+
+
+class _Frame:
+    __slots__ = ('stats', 'start', 'child_seconds', 'peak')
+
+    def __init__(self, stats, start, peak):
+        self.stats = stats
+        self.start = start
+        self.child_seconds = 0.0
+        self.peak = peak
+
+
+class _StageContext:
+    __slots__ = ('profiler', 'stats')
+
+    def __init__(self, profiler, stats):
+        self.profiler = profiler
+        self.stats = stats
+
+    def __enter__(self):
+        self.profiler._enter(self.stats)
+        return self.stats
+
+    def __exit__(self, *exc):
+        self.profiler._exit()
+        return False
+
+
+class _NullContext:
+    """Disabled stage(): yields a throwaway StageStats so ``st.rows_out = n`` still works."""
+
+    __slots__ = ('stats',)
+
+    def __init__(self):
+        self.stats = StageStats('disabled')
+
+    def __enter__(self):
+        return self.stats
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_CONTEXT = _NullContext()
+
+
+class Profiler:
+    def __init__(self, enabled=True, memory=True, cprofile=False):
+        self.enabled = enabled
+        self.memory = enabled and memory
+        self.cprofile = enabled and cprofile
+        self.stages = {}
+        self._stack = []
+        self._started = _perf()
+        self._own_tracing = False
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._own_tracing = True
+
+    def stats(self, name):
+        s = self.stages.get(name)
+        if s is None:
+            s = self.stages[name] = StageStats(name)
+            if self.cprofile:
+                s.profile = cProfile.Profile()
+        return s
+
+    def stage(self, name, rows_in=None):
+        """Context manager timing one block; returns the StageStats to fill rows_out on."""
+        if not self.enabled:
+            return _NULL_CONTEXT
+        stats = self.stats(name)
+        if rows_in is not None:
+            stats.rows_in = (stats.rows_in or 0) + rows_in
+        return _StageContext(self, stats)
+
+    def iter_stage(self, name, iterable, upstream=None, rows_in=None):
+        """
+        Wrap a generator stage: each next() is timed as one call and items are counted as
+        rows_out. rows_in is ``rows_in`` or, in the report, the ``upstream`` stage's rows_out.
+        """
+        if not self.enabled:
+            return iterable
+        stats = self.stats(name)
+        stats.upstream = upstream
+        if rows_in is not None:
+            stats.rows_in = (stats.rows_in or 0) + rows_in
+        if stats.rows_out is None:
+            stats.rows_out = 0
+        return self._iter(stats, iter(iterable))
+
+    def _iter(self, stats, it):
+        enter = self._enter
+        leave = self._exit
+        while True:
+            enter(stats)
+            try:
+                item = next(it)
+            except StopIteration:
+                return
+            finally:
+                leave()
+            stats.rows_out += 1
+            yield item
+
+    def _enter(self, stats):
+        stack = self._stack
+        peak = 0
+        if self.memory:
+            current, peak = tracemalloc.get_traced_memory()
+            if stack:
+                parent = stack[-1]
+                if peak > parent.peak:
+                    parent.peak = peak
+            tracemalloc.reset_peak()
+            peak = current
+        if self.cprofile:
+            if stack:
+                stack[-1].stats.profile.disable()
+            stats.profile.enable()
+        stack.append(_Frame(stats, _perf(), peak))
+
+    def _exit(self):
+        now = _perf()
+        stack = self._stack
+        frame = stack.pop()
+        stats = frame.stats
+        elapsed = now - frame.start
+        stats.calls += 1
+        stats.inclusive_seconds += elapsed
+        stats.seconds += elapsed - frame.child_seconds
+        if self.cprofile:
+            stats.profile.disable()
+            if stack:
+                stack[-1].stats.profile.enable()
+        if stack:
+            stack[-1].child_seconds += elapsed
+        if self.memory:
+            peak = max(frame.peak, tracemalloc.get_traced_memory()[1])
+            if stats.peak_bytes is None or peak > stats.peak_bytes:
+                stats.peak_bytes = peak
+            if stack and peak > stack[-1].peak:
+                stack[-1].peak = peak
+
+    def hottest(self):
+        if not self.stages:
+            return None
+        return max(self.stages.values(), key=lambda s: s.seconds).name
+
+    def report(self, **meta):
+        stages = []
+        for s in self.stages.values():
+            entry = s.as_dict()
+            if s.upstream and s.upstream in self.stages:
+                entry['rows_in'] = self.stages[s.upstream].rows_out
+            stages.append(entry)
+        total = _perf() - self._started
+        return {
+            **meta,
+            'argv': sys.argv,
+            'wall_seconds': round(total, 6),
+            'stage_seconds': round(sum(s.seconds for s in self.stages.values()), 6),
+            'max_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss if resource else None,
+            'memory_traced': self.memory,
+            'hottest_stage': self.hottest(),
+            'stages': stages,
+        }
+
+    def write_report(self, path, **meta):
+        report = self.report(**meta)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+            f.write('\n')
+        return report
+
+    def dump_hottest(self, path):
+        """Write the hottest stage's cProfile stats (pstats format). Returns the stage name."""
+        name = self.hottest()
+        if name is None or self.stages[name].profile is None:
+            return None
+        self.stages[name].profile.dump_stats(path)
+        return name
+
+    def close(self):
+        if self._own_tracing:
+            tracemalloc.stop()
+            self._own_tracing = False
+
+
+NULL_PROFILER = Profiler(enabled=False)
+
+
+def print_report(report):
+    print(f"\nProfile: {report['wall_seconds']:.3f} s wall, {report['stage_seconds']:.3f} s in stages"
+          f" (hottest: {report['hottest_stage']})")
+    for s in report['stages']:
+        peak = f"{s['peak_bytes'] / (1 << 20):9.1f} MB" if s['peak_bytes'] is not None else ' ' * 12
+        rows_in = '' if s['rows_in'] is None else s['rows_in']
+        rows_out = '' if s['rows_out'] is None else s['rows_out']
+        print(f"  {s['name']:<14} {s['seconds']:9.3f} s {peak}  in={rows_in} out={rows_out}")
+
+
+def add_profile_args(parser):
+    parser.add_argument('--profile', metavar='REPORT_JSON', default=None,
+                        help='Write per-stage wall time / rows / peak memory to this JSON file')
+    parser.add_argument('--profile-no-memory', action='store_true',
+                        help='With --profile: skip tracemalloc (cleaner wall times, no peak_bytes)')
+    parser.add_argument('--profile-cprofile', metavar='PSTATS', default=None,
+                        help='With --profile: cProfile every stage and dump the hottest one here')
+
+
+def profiler_from_args(args):
+    if not args.profile:
+        return NULL_PROFILER
+    return Profiler(memory=not args.profile_no_memory, cprofile=bool(args.profile_cprofile))
+
+
+def finish_profile(profiler, args, **meta):
+    """Write the --profile report (and cProfile dump) and print a summary; no-op when off."""
+    if not profiler.enabled:
+        return None
+    report = profiler.write_report(args.profile, **meta)
+    print_report(report)
+    print(f"Profile report: {args.profile}")
+    if args.profile_cprofile:
+        name = profiler.dump_hottest(args.profile_cprofile)
+        if name:
+            print(f"cProfile of stage '{name}': {args.profile_cprofile}")
+    profiler.close()
+    return report
@@ -0,0 +1,97 @@
+"""
+Slotted record types shared by the pumping generators.
+
+Full-year backfills keep every CSV row in memory, so rows are ``__slots__`` objects rather
+than dicts, and the values that repeat on almost every row (client / plant ids and names,
+plant codes, units, operators, dates) are interned so each distinct value is stored once.
+"""
+import sys
+
+_intern = sys.intern
+_DATES = {}
+
+
+def intern_str(value):
+    return _intern(value) if type(value) is str else value
+
+
+def intern_date(value):
+    """One shared date object per calendar day."""
+    if value is None:
+        return None
+    return _DATES.setdefault(value, value)
+
+
+class Remision:
+    """One pumping CSV row after parsing."""
+
+    __slots__ = (
+        'remision_number', 'fecha', 'cliente', 'volumen_fabricado', 'unit_price', 'unidad', 'operador', 'planta',
+    )
+
+    def __init__(self, remision_number, fecha, cliente, volumen_fabricado, unit_price, unidad, operador, planta):
+        self.remision_number = remision_number
+        self.fecha = intern_date(fecha)
+        self.cliente = intern_str(cliente)
+        self.volumen_fabricado = volumen_fabricado
+        self.unit_price = unit_price
+        self.unidad = intern_str(unidad)
+        self.operador = intern_str(operador)
+        self.planta = intern_str(planta)
+
+    def astuple(self):
+        return (
+            self.remision_number, self.fecha, self.cliente, self.volumen_fabricado,
+            self.unit_price, self.unidad, self.operador, self.planta,
+        )
+
+    def __repr__(self):
+        return f"Remision({self.remision_number!r}, {self.fecha!r}, {self.cliente!r}, {self.volumen_fabricado!r})"
+
+
+class PumpGroup:
+    """Remisiones that become one pumping order_item (same date / client / plant, or same order)."""
+
+    __slots__ = ('date', 'client_id', 'client_name', 'plant_code', 'plant_id', 'unit_price', 'total_volume', 'remisiones')
+
+    def __init__(self, date=None, client_id=None, client_name=None, plant_code=None, plant_id=None, unit_price=0.0):
+        self.date = date
+        self.client_id = intern_str(client_id)
+        self.client_name = intern_str(client_name)
+        self.plant_code = intern_str(plant_code)
+        self.plant_id = intern_str(plant_id)
+        self.unit_price = unit_price
+        self.total_volume = 0.0
+        self.remisiones = []
+
+    def add(self, remision):
+        self.remisiones.append(remision)
+        self.total_volume += remision.volumen_fabricado
+
+    def __repr__(self):
+        return f"PumpGroup({self.date!r}, {self.client_name!r}, {self.plant_code!r}, {len(self.remisiones)} remisiones)"
+
+
+class OrderRef:
+    """The four order fields the generators read from an orders snapshot."""
+
+    __slots__ = ('id', 'delivery_date', 'client_id', 'plant_id')
+
+    def __init__(self, id, delivery_date, client_id, plant_id):
+        self.id = id
+        self.delivery_date = intern_str(delivery_date)
+        self.client_id = intern_str(client_id)
+        self.plant_id = intern_str(plant_id)
+
+    @classmethod
+    def from_json(cls, order):
+        return cls(order['id'], order['delivery_date'], order.get('client_id'), order.get('plant_id'))
+
+    def __repr__(self):
+        return f"OrderRef({self.id!r}, {self.delivery_date!r})"
+
+
+def order_refs(orders_data):
+    """Orders JSON (list of dicts) -> list of OrderRef; OrderRefs pass through."""
+    return [o if isinstance(o, OrderRef) else OrderRef.from_json(o) for o in orders_data]
+
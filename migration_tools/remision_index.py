@@ -0,0 +1,212 @@
+"""
+Index of concrete remisiones by normalized number, for attaching pump remisiones to the
+order of the concrete load they pumped (P004-006287 -> concrete 6287 -> its order).
+
+Input is a concrete remisiones export for the plant: JSON (a list of remision dicts, or an
+orders snapshot whose orders carry ``concrete_remisiones``, see
+scripts/fetch-p004p-march-orders.ts) or CSV. Recognized columns, case-insensitive:
+remision_number / remision, order_id / pedido, fecha, volumen_fabricado / m3, plant_id,
+tipo_remision (rows that are not CONCRETO are skipped when the column is present).
+
+Exact lookups are one dict hit on the integer number. Numbers are also kept sorted, so
+``nearest`` / ``between`` answer gap queries (pump 6303 when the export jumps 6301 -> 6306)
+with a bisect.
+"""
+import json
+from bisect import bisect_left, bisect_right
+
+from migration_tools.csv_reader import CsvReader
+from migration_tools.orders import delivery_date_str
+
+_COLUMNS = {
+    'remision_number': ('remision_number', 'remision', 'remisión', 'folio'),
+    'order_id': ('order_id', 'pedido', 'order'),
+    'fecha': ('fecha', 'date', 'delivery_date'),
+    'volumen_fabricado': ('volumen_fabricado', 'm3', 'volumen'),
+    'plant_id': ('plant_id',),
+    'tipo_remision': ('tipo_remision', 'tipo'),
+}
+
+
+def normalize_remision_number(value):
+    """'P004-006287' / '006287' / 6287 -> 6287; None when there is no numeric part."""
+    if value is None:
+        return None
+    tail = str(value).strip().rsplit('-', 1)[-1].strip()
+    return int(tail) if tail.isdigit() else None
+
+
+class ConcreteRemision:
+    __slots__ = ('number', 'remision_number', 'order_id', 'fecha', 'volume', 'plant_id')
+
+    def __init__(self, number, remision_number, order_id, fecha=None, volume=None, plant_id=None):
+        self.number = number
+        self.remision_number = remision_number
+        self.order_id = order_id
+        self.fecha = fecha
+        self.volume = volume
+        self.plant_id = plant_id
+
+    def __repr__(self):
+        return f"ConcreteRemision({self.remision_number!r}, order={self.order_id!r})"
+
+
+class ConcreteRemisionIndex:
+    """
+    Concrete remisiones keyed by normalized number. On a duplicate number the first row
+    wins and the number is recorded in ``duplicates`` (the export should not have any).
+    """
+
+    def __init__(self, remisiones):
+        self._by_number = {}
+        self.duplicates = []
+        for rem in remisiones:
+            if rem.number in self._by_number:
+                self.duplicates.append(rem.number)
+                continue
+            self._by_number[rem.number] = rem
+        self._numbers = sorted(self._by_number)
+
+    def __len__(self):
+        return len(self._by_number)
+
+    def get(self, value):
+        number = value if type(value) is int else normalize_remision_number(value)
+        return self._by_number.get(number)
+
+    def between(self, lo, hi):
+        """Concrete remisiones numbered lo..hi (inclusive), in number order."""
+        numbers = self._numbers
+        return [self._by_number[n] for n in numbers[bisect_left(numbers, lo):bisect_right(numbers, hi)]]
+
+    def nearest(self, value, max_gap):
+        """
+        (remision, gap) for the closest number within ``max_gap`` (exact match -> gap 0);
+        on a tie the lower number wins (a gap usually continues the previous load's order).
+        (None, None) when nothing is that close.
+        """
+        number = value if type(value) is int else normalize_remision_number(value)
+        if number is None:
+            return None, None
+        hit = self._by_number.get(number)
+        if hit is not None:
+            return hit, 0
+        if max_gap <= 0:
+            return None, None
+        numbers = self._numbers
+        i = bisect_left(numbers, number)
+        best = None
+        if i > 0 and number - numbers[i - 1] <= max_gap:
+            best = numbers[i - 1]
+        if i < len(numbers) and numbers[i] - number <= max_gap and (best is None or numbers[i] - number < number - best):
+            best = numbers[i]
+        if best is None:
+            return None, None
+        return self._by_number[best], abs(number - best)
+
+
+def _pick(row, field):
+    for name in _COLUMNS[field]:
+        value = row.get(name)
+        if value not in (None, ''):
+            return value
+    return None
+
+
+def _rows_from_json(data):
+    for item in data:
+        if 'concrete_remisiones' in item:
+            for rem in item.get('concrete_remisiones') or ():
+                yield {'order_id': item.get('id'), 'plant_id': item.get('plant_id'), **rem}
+        else:
+            yield item
+
+
+def _rows_from_csv(path):
+    """One {field: value} per row; each _COLUMNS field read from its first matching header."""
+    reader = CsvReader(path, _COLUMNS)
+    fields = reader.fields
+    for values in reader.tuples():
+        yield dict(zip(fields, values))
+
+
+def load_concrete_remisiones(path, plant_id=None, month=None):
+    """
+    Concrete remisiones from a JSON or CSV export, optionally limited to ``plant_id`` and
+    ``month`` ('YYYY-MM', matched against fecha). Rows without a numeric remision number or
+    an order_id are skipped.
+    """
+    path = str(path)
+    if path.lower().endswith('.json'):
+        with open(path, 'r', encoding='utf-8') as f:
+            rows = _rows_from_json(json.load(f))
+    else:
+        rows = _rows_from_csv(path)
+
+    remisiones = []
+    for row in rows:
+        tipo = _pick(row, 'tipo_remision')
+        if tipo is not None and str(tipo).upper() != 'CONCRETO':
+            continue
+        row_plant = _pick(row, 'plant_id')
+        if plant_id and row_plant and row_plant != plant_id:
+            continue
+        fecha = _pick(row, 'fecha')
+        fecha = delivery_date_str(fecha) if fecha else None
+        if month and fecha and not fecha.startswith(month):
+            continue
+        raw_number = _pick(row, 'remision_number')
+        number = normalize_remision_number(raw_number)
+        order_id = _pick(row, 'order_id')
+        if number is None or not order_id:
+            continue
+        volume = _pick(row, 'volumen_fabricado')
+        remisiones.append(ConcreteRemision(
+            number, str(raw_number).strip(), order_id, fecha,
+            float(volume) if volume is not None else None, row_plant,
+        ))
+    return remisiones
+
+
+def match_pump_remisiones(remisiones, index, max_gap=0):
+    """
+    Pump remisiones -> ({remision_number: order_id}, nearby, unmatched). ``nearby`` lists
+    (pump number, concrete number, gap) for matches that were not exact.
+    """
+    remision_to_order = {}
+    nearby = []
+    unmatched = []
+    lookup = index.nearest
+    for r in remisiones:
+        hit, gap = lookup(r.remision_number, max_gap)
+        if hit is None:
+            unmatched.append(r.remision_number)
+            continue
+        remision_to_order[r.remision_number] = hit.order_id
+        if gap:
+            nearby.append((r.remision_number, hit.remision_number, gap))
+    return remision_to_order, nearby, unmatched
+
+
+def add_concrete_index_args(parser):
+    parser.add_argument('--concrete-remisiones', default=None,
+                        help='Concrete remisiones export (JSON/CSV) for the plant: attach each pump '
+                             'remision to the order of the concrete remision with the same number')
+    parser.add_argument('--max-number-gap', type=int, default=0,
+                        help='With --concrete-remisiones: also accept the nearest concrete number '
+                             'up to this far away (numbering gaps)')
+    parser.add_argument('--month', default=None, help='With --concrete-remisiones: only rows of this YYYY-MM')
+
+
+def remision_map_from_export(remisiones, path, plant_id, month=None, max_gap=0):
+    """--concrete-remisiones: {remision_number: order_id}, printing what did not match exactly."""
+    index = ConcreteRemisionIndex(load_concrete_remisiones(path, plant_id, month))
+    print(f"Concrete remision index: {len(index)} remisiones from {path}")
+    if index.duplicates:
+        print(f"WARNING: duplicate concrete remision numbers (first kept): {sorted(set(index.duplicates))}")
+    remision_to_order, nearby, unmatched = match_pump_remisiones(remisiones, index, max_gap)
+    for pump, concrete, gap in nearby:
+        print(f"  NEAR {pump} -> concrete {concrete} (gap {gap})")
+    if unmatched:
+        print(f"  {len(unmatched)} pump remisiones without a concrete remision within {max_gap}: {unmatched}")
+    return remision_to_order
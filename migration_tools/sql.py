@@ -0,0 +1,283 @@
+"""
+SQL renderers for pumping migrations (STEP 1 order_items, STEP 2 remisiones).
+
+Three output formats, selected with ``--sql-format`` in the generators:
+
+- ``insert``: one INSERT per row (the historical output, pasteable in the Supabase SQL editor).
+- ``values``: multi-row ``INSERT ... VALUES (...), (...)`` in batches of ``batch_size``.
+- ``copy``: ``COPY ... FROM STDIN`` into an ON COMMIT DROP staging table, then one
+  ``INSERT ... SELECT``. Needs ``psql -f`` (inline COPY data is a psql feature).
+
+STEP 3 ("Update order totals") is shared too: ``per-order`` keeps one correlated-subquery
+UPDATE per order, ``set`` recomputes every touched order in a single UPDATE ... FROM.
+
+Every renderer yields chunks meant to be joined with newlines, so callers can either
+``'\\n'.join`` them or stream them to disk. Row order is preserved in every format; the
+STEP ordering (order_items before remisiones, so the remisiones triggers see the pump
+item) stays the caller's job.
+"""
+import argparse
+from itertools import islice
+
+SQL_FORMATS = ('insert', 'values', 'copy')
+DEFAULT_BATCH_SIZE = 500
+ORDER_TOTALS_MODES = ('per-order', 'set')
+
+ORDER_ITEM_COLUMNS = (
+    'order_id',
+    'product_type',
+    'volume',
+    'unit_price',
+    'total_price',
+    'has_pump_service',
+    'pump_price',
+    'pump_volume',
+    'quote_detail_id',
+    'created_at',
+    'pump_volume_delivered',
+)
+
+REMISION_COLUMNS = (
+    'order_id',
+    'remision_number',
+    'fecha',
+    'hora_carga',
+    'volumen_fabricado',
+    'tipo_remision',
+    'conductor',
+    'unidad',
+    'plant_id',
+    'created_at',
+)
+
+
+def sql_str_literal(value):
+    """Escape single quotes for PostgreSQL string literals."""
+    if value is None:
+        return None
+    return str(value).replace("'", "''")
+
+
+def _quoted_or_null(value):
+    return f"'{sql_str_literal(value)}'" if value else 'NULL'
+
+
+def _copy_field(value):
+    """COPY text-format field: \\N for NULL, backslash escapes for control characters."""
+    if value is None:
+        return '\\N'
+    return (
+        str(value)
+        .replace('\\', '\\\\')
+        .replace('\t', '\\t')
+        .replace('\n', '\\n')
+        .replace('\r', '\\r')
+    )
+
+
+def _batches(rows, batch_size):
+    """Lists of up to batch_size rows; checked on call, before any SQL is rendered."""
+    if batch_size < 1:
+        raise ValueError(f"batch_size must be at least 1, got {batch_size}")
+    return _iter_batches(iter(rows), batch_size)
+
+
+def _iter_batches(it, batch_size):
+    while True:
+        batch = list(islice(it, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+# ── order_items ──────────────────────────────────────────────────────────────
+# Row: (order_id, total_volume, unit_price, total_price)
+
+def order_item_insert_sql(order_id, total_volume, unit_price, total_price):
+    return f"""
+INSERT INTO order_items (
+  order_id,
+  product_type,
+  volume,
+  unit_price,
+  total_price,
+  has_pump_service,
+  pump_price,
+  pump_volume,
+  quote_detail_id,
+  created_at,
+  pump_volume_delivered
+)
+VALUES (
+  '{order_id}',
+  'SERVICIO DE BOMBEO',
+  {total_volume:.2f},
+  {unit_price:.2f},
+  {total_price:.2f},
+  true,
+  {unit_price:.2f},
+  {total_volume:.2f},
+  NULL,
+  NOW(),
+  NULL
+);"""
+
+
+def _order_item_values_row(order_id, total_volume, unit_price, total_price):
+    return (
+        f"  ('{order_id}', 'SERVICIO DE BOMBEO', {total_volume:.2f}, {unit_price:.2f}, {total_price:.2f}, "
+        f"true, {unit_price:.2f}, {total_volume:.2f}, NULL, NOW(), NULL)"
+    )
+
+
+def iter_order_items_sql(rows, sql_format='insert', batch_size=DEFAULT_BATCH_SIZE):
+    if sql_format == 'insert':
+        for row in rows:
+            yield order_item_insert_sql(*row)
+    elif sql_format == 'values':
+        for batch in _batches(rows, batch_size):
+            values = ',\n'.join(_order_item_values_row(*row) for row in batch)
+            yield f"\nINSERT INTO order_items ({', '.join(ORDER_ITEM_COLUMNS)})\nVALUES\n{values};"
+    elif sql_format == 'copy':
+        yield "\nCREATE TEMP TABLE _pump_order_items (seq int, order_id uuid, volume numeric, unit_price numeric, total_price numeric) ON COMMIT DROP;"
+        yield "COPY _pump_order_items (seq, order_id, volume, unit_price, total_price) FROM STDIN;"
+        for seq, (order_id, total_volume, unit_price, total_price) in enumerate(rows):
+            yield f"{seq}\t{_copy_field(order_id)}\t{total_volume:.2f}\t{unit_price:.2f}\t{total_price:.2f}"
+        yield "\\."
+        yield f"""INSERT INTO order_items ({', '.join(ORDER_ITEM_COLUMNS)})
+SELECT order_id, 'SERVICIO DE BOMBEO', volume, unit_price, total_price, true, unit_price, volume, NULL, NOW(), NULL
+FROM _pump_order_items
+ORDER BY seq;"""
+    else:
+        raise ValueError(f"Unknown sql_format {sql_format!r}; expected one of {SQL_FORMATS}")
+
+
+# ── remisiones ───────────────────────────────────────────────────────────────
+# Row: (order_id, remision_number, date_str, volumen_fabricado, conductor, unidad, plant_id)
+
+def remision_insert_sql(order_id, remision_number, date_str, volumen, conductor, unidad, plant_id):
+    return f"""
+INSERT INTO remisiones ({', '.join(REMISION_COLUMNS)})
+VALUES ('{order_id}', '{sql_str_literal(remision_number)}', '{date_str}'::date, '08:00:00'::time, {volumen:.2f}, 'BOMBEO', {_quoted_or_null(conductor)}, '{sql_str_literal(unidad)}', '{plant_id}', NOW());"""
+
+
+def _remision_values_row(order_id, remision_number, date_str, volumen, conductor, unidad, plant_id):
+    return (
+        f"  ('{order_id}', '{sql_str_literal(remision_number)}', '{date_str}'::date, '08:00:00'::time, {volumen:.2f}, "
+        f"'BOMBEO', {_quoted_or_null(conductor)}, '{sql_str_literal(unidad)}', '{plant_id}', NOW())"
+    )
+
+
+def iter_remisiones_sql(rows, sql_format='insert', batch_size=DEFAULT_BATCH_SIZE):
+    if sql_format == 'insert':
+        for row in rows:
+            yield remision_insert_sql(*row)
+    elif sql_format == 'values':
+        for batch in _batches(rows, batch_size):
+            values = ',\n'.join(_remision_values_row(*row) for row in batch)
+            yield f"\nINSERT INTO remisiones ({', '.join(REMISION_COLUMNS)})\nVALUES\n{values};"
+    elif sql_format == 'copy':
+        yield (
+            "\nCREATE TEMP TABLE _pump_remisiones (seq int, order_id uuid, remision_number text, fecha date, "
+            "volumen_fabricado numeric, conductor text, unidad text, plant_id uuid) ON COMMIT DROP;"
+        )
+        yield "COPY _pump_remisiones (seq, order_id, remision_number, fecha, volumen_fabricado, conductor, unidad, plant_id) FROM STDIN;"
+        for seq, (order_id, remision_number, date_str, volumen, conductor, unidad, plant_id) in enumerate(rows):
+            yield '\t'.join((
+                str(seq),
+                _copy_field(order_id),
+                _copy_field(remision_number),
+                date_str,
+                f"{volumen:.2f}",
+                _copy_field(conductor or None),
+                _copy_field(unidad),
+                _copy_field(plant_id),
+            ))
+        yield "\\."
+        yield f"""INSERT INTO remisiones ({', '.join(REMISION_COLUMNS)})
+SELECT order_id, remision_number, fecha, '08:00:00'::time, volumen_fabricado, 'BOMBEO', conductor, unidad, plant_id, NOW()
+FROM _pump_remisiones
+ORDER BY seq;"""
+    else:
+        raise ValueError(f"Unknown sql_format {sql_format!r}; expected one of {SQL_FORMATS}")
+
+
+# ── orders.total_amount ──────────────────────────────────────────────────────
+
+def order_total_update_sql(order_id):
+    return f"""
+UPDATE orders
+SET total_amount = (
+  SELECT COALESCE(SUM(total_price), 0)
+  FROM order_items
+  WHERE order_id = '{order_id}'
+)
+WHERE id = '{order_id}';"""
+
+
+def order_totals_set_sql(order_ids):
+    """One UPDATE for all orders; LEFT JOIN keeps the COALESCE(..., 0) of the per-order form."""
+    values = ',\n'.join(f"    ('{order_id}'::uuid)" for order_id in order_ids)
+    return f"""
+UPDATE orders AS o
+SET total_amount = t.total_amount
+FROM (
+  SELECT v.order_id, COALESCE(SUM(oi.total_price), 0) AS total_amount
+  FROM (VALUES
+{values}
+  ) AS v(order_id)
+  LEFT JOIN order_items AS oi ON oi.order_id = v.order_id
+  GROUP BY v.order_id
+) AS t
+WHERE o.id = t.order_id;"""
+
+
+def iter_order_totals_sql(order_ids, mode='per-order'):
+    """STEP 3 statements for the given (already sorted) order ids."""
+    if mode == 'per-order':
+        for order_id in order_ids:
+            yield order_total_update_sql(order_id)
+    elif mode == 'set':
+        order_ids = list(order_ids)
+        if order_ids:
+            yield order_totals_set_sql(order_ids)
+    else:
+        raise ValueError(f"Unknown order totals mode {mode!r}; expected one of {ORDER_TOTALS_MODES}")
+
+
+def add_order_totals_arg(parser):
+    parser.add_argument(
+        '--order-totals',
+        choices=ORDER_TOTALS_MODES,
+        default='per-order',
+        help="STEP 3: per-order correlated UPDATE per order (default) or one set-based UPDATE ... FROM",
+    )
+
+
+def batch_size_arg(value):
+    """argparse type for --batch-size: an int >= 1."""
+    try:
+        size = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid int value: {value!r}") from None
+    if size < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {size}")
+    return size
+
+
+def add_sql_format_args(parser):
+    """Shared --sql-format / --batch-size flags for the generators."""
+    parser.add_argument(
+        '--sql-format',
+        choices=SQL_FORMATS,
+        default='insert',
+        help="insert: one statement per row (default, SQL editor friendly); values: batched "
+             "multi-row INSERT; copy: COPY FROM STDIN staging (apply with psql -f)",
+    )
+    parser.add_argument(
+        '--batch-size',
+        type=batch_size_arg,
+        default=DEFAULT_BATCH_SIZE,
+        help=f'Rows per INSERT with --sql-format values (default {DEFAULT_BATCH_SIZE})',
+    )
+    add_order_totals_arg(parser)
@@ -0,0 +1,212 @@
+"""
+Dry-run validation of a pumping migration before it is written (--validate).
+
+Works on the rows the generator is about to render (order_item rows
+``(order_id, total_volume, unit_price, total_price)`` and remision rows
+``(order_id, remision_number, date_str, volumen, conductor, unidad, plant_id)``, see
+migration_tools.sql), with values rounded to 2 decimals as the SQL literals are.
+
+Internal checks (always):
+  * per order, the pump order_item volume equals the sum of its remisiones
+    (what the pump_volume_delivered trigger will arrive at);
+  * total_price = volume x unit_price, within literal rounding;
+  * no remision number twice for a plant, no remision without its order's pump item.
+
+Snapshot checks (orders JSON whose orders carry ``total_amount`` and ``order_items`` with
+``product_type`` / ``volume`` / ``pump_volume`` / ``total_price``, e.g. from
+scripts/fetch-march-orders.ts):
+  * every order exists in the snapshot and has no pump order_item yet;
+  * the STEP 3 result ``orders.total_amount`` = existing items + new pump item, and its
+    delta against the snapshot ``total_amount`` (a stale snapshot total is a warning).
+
+Every check is one pass over the rows with dict accumulators (a year of remisiones
+validates in well under a second; migration_tools.benchmarks.validate). Errors are
+collected and raised together as ValidationError before anything is written.
+"""
+import json
+
+PUMP_PRODUCT_TYPE = 'SERVICIO DE BOMBEO'
+
+
+class ValidationError(ValueError):
+    def __init__(self, report):
+        self.report = report
+        super().__init__(f"{len(report.errors)} validation error(s); first: {report.errors[0]}")
+
+
+class SnapshotOrder:
+    __slots__ = ('id', 'total_amount', 'items_total', 'pump_items')
+
+    def __init__(self, id, total_amount, items_total, pump_items):
+        self.id = id
+        self.total_amount = total_amount
+        self.items_total = items_total
+        self.pump_items = pump_items
+
+
+class OrderTotals:
+    """What the migration does to one order."""
+
+    __slots__ = ('order_id', 'pump_volume', 'pump_total', 'remision_volume', 'remisiones',
+                 'total_before', 'total_after')
+
+    def __init__(self, order_id):
+        self.order_id = order_id
+        self.pump_volume = 0.0
+        self.pump_total = 0.0
+        self.remision_volume = 0.0
+        self.remisiones = 0
+        self.total_before = None
+        self.total_after = None
+
+    @property
+    def delta(self):
+        if self.total_after is None or self.total_before is None:
+            return None
+        return self.total_after - self.total_before
+
+
+class ValidationReport:
+    def __init__(self):
+        self.orders = {}
+        self.errors = []
+        self.warnings = []
+        self.remisiones = 0
+        self.snapshot_checked = False
+
+    @property
+    def ok(self):
+        return not self.errors
+
+    @property
+    def total_delta(self):
+        return sum(o.delta for o in self.orders.values() if o.delta is not None)
+
+    def summary(self):
+        volume = sum(o.pump_volume for o in self.orders.values())
+        line = (f"Validation: {len(self.orders)} orders, {self.remisiones} remisiones, "
+                f"{volume:.2f} m³ pumped, order_items ${sum(o.pump_total for o in self.orders.values()):,.2f}")
+        if self.snapshot_checked:
+            line += f", orders.total_amount delta ${self.total_delta:,.2f}"
+        return line + (" - OK" if self.ok else f" - {len(self.errors)} error(s)")
+
+
+def load_validation_snapshot(path):
+    """order_id -> SnapshotOrder, or None when the file has no order_items / total_amount."""
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if not any('order_items' in o or 'total_amount' in o for o in data):
+        return None
+    snapshot = {}
+    for o in data:
+        items = o.get('order_items') or ()
+        items_total = 0.0
+        pump_items = 0
+        for item in items:
+            items_total += float(item.get('total_price') or 0)
+            if item.get('product_type') == PUMP_PRODUCT_TYPE or float(item.get('pump_volume') or 0) > 0:
+                pump_items += 1
+        total = o.get('total_amount')
+        snapshot[o['id']] = SnapshotOrder(o['id'], float(total) if total is not None else None, items_total, pump_items)
+    return snapshot
+
+
+def validate_migration(order_item_rows, remision_rows, snapshot=None, tolerance=0.01):
+    """Recompute per-order pump volume / price / total_amount and check them. Returns a ValidationReport."""
+    report = ValidationReport()
+    orders = report.orders
+    errors = report.errors
+    tol = round(tolerance * 100)
+
+    # Integer cents: the SQL literals are .2f, and cent sums do not drift.
+    item_volume, item_total = {}, {}
+    for order_id, volume, unit_price, total_price in order_item_rows:
+        v, p, t = round(volume * 100), round(unit_price * 100), round(total_price * 100)
+        item_volume[order_id] = item_volume.get(order_id, 0) + v
+        item_total[order_id] = item_total.get(order_id, 0) + t
+        if abs(t - v * p / 100) > (v + p) / 200 + tol:
+            errors.append(f"order {order_id}: total_price {t / 100:.2f} != {v / 100:.2f} m³ x ${p / 100:.2f}")
+
+    remision_rows = list(remision_rows)
+    rem_volume, rem_count = {}, {}
+    for order_id, _, _, volumen, _, _, _ in remision_rows:
+        rem_volume[order_id] = rem_volume.get(order_id, 0) + round(volumen * 100)
+        rem_count[order_id] = rem_count.get(order_id, 0) + 1
+    keys = {(r[6], r[1]) for r in remision_rows}
+    report.remisiones = len(keys)
+    if len(keys) != len(remision_rows):
+        seen = set()
+        for r in remision_rows:
+            key = (r[6], r[1])
+            if key in seen:
+                errors.append(f"remision {r[1]} (plant {r[6]}) emitted twice")
+            seen.add(key)
+
+    for order_id in rem_volume.keys() - item_volume.keys():
+        errors.append(f"order {order_id}: {rem_count[order_id]} remision(s) but no pump order_item in this migration")
+
+    for order_id, v in item_volume.items():
+        o = orders[order_id] = OrderTotals(order_id)
+        r = rem_volume.get(order_id, 0)
+        o.pump_volume = v / 100
+        o.pump_total = item_total[order_id] / 100
+        o.remision_volume = r / 100
+        o.remisiones = rem_count.get(order_id, 0)
+        if abs(v - r) > tol:
+            errors.append(f"order {order_id}: pump_volume {v / 100:.2f} != remisiones {r / 100:.2f} m³")
+
+    if snapshot is not None:
+        report.snapshot_checked = True
+        for o in orders.values():
+            snap = snapshot.get(o.order_id)
+            if snap is None:
+                errors.append(f"order {o.order_id}: not in the orders snapshot")
+                continue
+            if snap.pump_items:
+                errors.append(f"order {o.order_id}: already has {snap.pump_items} pump order_item(s) in the snapshot")
+            o.total_after = snap.items_total + o.pump_total
+            if snap.total_amount is None:
+                o.total_before = snap.items_total
+            else:
+                o.total_before = snap.total_amount
+                if abs(snap.total_amount - snap.items_total) > tolerance:
+                    report.warnings.append(
+                        f"order {o.order_id}: snapshot total_amount {snap.total_amount:,.2f} != "
+                        f"SUM(order_items.total_price) {snap.items_total:,.2f} (STEP 3 recomputes it)"
+                    )
+    return report
+
+
+def check_migration(order_item_rows, remision_rows, snapshot=None, tolerance=0.01, max_lines=20):
+    """validate_migration + print; raises ValidationError when anything is off."""
+    report = validate_migration(order_item_rows, remision_rows, snapshot, tolerance)
+    for line in report.warnings[:max_lines]:
+        print(f"WARNING: {line}")
+    for line in report.errors[:max_lines]:
+        print(f"ERROR: {line}")
+    if len(report.errors) > max_lines:
+        print(f"ERROR: ... {len(report.errors) - max_lines} more")
+    print(report.summary())
+    if report.errors:
+        raise ValidationError(report)
+    return report
+
+
+def snapshot_for_validation(path):
+    """--validate: the snapshot at ``path`` (None -> internal checks only, which is printed)."""
+    if not path:
+        print("No orders snapshot given: internal checks only")
+        return None
+    snapshot = load_validation_snapshot(path)
+    if snapshot is None:
+        print(f"{path} has no total_amount / order_items: internal checks only")
+    return snapshot
+
+
+def add_validate_args(parser):
+    parser.add_argument('--validate', action='store_true',
+                        help='Reconcile per-order pump volume / total_price / total_amount before writing; '
+                             'abort on mismatches')
+    parser.add_argument('--validate-snapshot', default=None,
+                        help='Orders JSON with total_amount + order_items to diff against '
+                             '(default: the orders snapshot, when it carries them)')
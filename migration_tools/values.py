@@ -0,0 +1,89 @@
+"""
+Cell-value parsing shared by the pumping CSV readers (migration_tools/ingest.py).
+
+FECHA, P.U and M3 repeat heavily: a month of pump reports has ~30 distinct dates, a
+handful of prices and a few dozen volumes. Each column gets a ColumnParser: a bounded LRU
+cache (functools.lru_cache) in front of the parse function, plus a counter of values
+that failed to parse, so a date string is split and turned into a ``date`` once per file
+rather than once per row.
+
+Year inference lives here and nowhere else: ``infer_year`` maps a written year through
+the profile's ``year_map`` first (exports that carry a wrong year, e.g. January 2026
+exported as 1/2/25), then reads two-digit years as 20yy.
+"""
+from datetime import date
+from functools import lru_cache
+
+DEFAULT_CACHE_SIZE = 1024
+
+
+def infer_year(written, year_map=None):
+    """Year as written in FECHA (25, 2026) -> four-digit year, after ``year_map``."""
+    if year_map and written in year_map:
+        return year_map[written]
+    return written + 2000 if written < 100 else written
+
+
+def parse_fecha(value, year_map=None):
+    """'M/D/YY' or 'M/D/YYYY' -> date."""
+    month, day, year = value.strip().split('/')
+    return date(infer_year(int(year), year_map), int(month), int(day))
+
+
+def parse_price(value, blank=None):
+    """' $3,216.00 ' -> 3216.0; a blank cell -> ``blank``, or ValueError when ``blank`` is None."""
+    s = value.replace('$', '').replace(',', '').replace(' ', '')
+    if s:
+        return float(s)
+    if blank is None:
+        raise ValueError('blank P.U')
+    return blank
+
+
+def parse_volume(value):
+    return float(value.strip())
+
+
+class ColumnParser:
+    """
+    ``fn`` behind an LRU cache of ``maxsize`` entries (0 disables caching). Failures are
+    counted in ``errors`` and re-raised; they are not cached.
+    """
+
+    __slots__ = ('name', 'errors', '_cached')
+
+    def __init__(self, name, fn, maxsize=DEFAULT_CACHE_SIZE):
+        self.name = name
+        self.errors = 0
+        self._cached = lru_cache(maxsize=maxsize)(fn) if maxsize else fn
+
+    def __call__(self, value):
+        try:
+            return self._cached(value)
+        except Exception:
+            self.errors += 1
+            raise
+
+    def cache_info(self):
+        info = getattr(self._cached, 'cache_info', None)
+        return info() if info else None
+
+    def __repr__(self):
+        return f"ColumnParser({self.name!r}, errors={self.errors}, {self.cache_info()})"
+
+
+def column_parsers(year_map=None, maxsize=DEFAULT_CACHE_SIZE, blank_price=None):
+    """
+    Fresh {column: ColumnParser} for one file (FECHA with the profile's year_map; a blank
+    P.U is ``blank_price``, or a parse error when None).
+    """
+    return {
+        'FECHA': ColumnParser('FECHA', lambda v: parse_fecha(v, year_map), maxsize),
+        'P.U': ColumnParser('P.U', lambda v: parse_price(v, blank_price), maxsize),
+        'M3': ColumnParser('M3', parse_volume, maxsize),
+    }
+
+
+def error_summary(parsers):
+    """'FECHA=2, P.U=1' for the columns that had failures ('' when none)."""
+    return ', '.join(f"{p.name}={p.errors}" for p in parsers.values() if p.errors)
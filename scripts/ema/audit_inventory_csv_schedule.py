@@ -4,6 +4,8 @@ EMA inventory CSV → schedule audit (dry-run by default).
 
 Conservative matching: strong matches need serial OR (name + location + service type)
 with corroboration; code-only matches are flagged for manual review.
+An instrument goes to at most one CSV row: the best total over all rows (``resolve_matches``),
+not first come in CSV order (``--greedy``).
 
 When the inventario uses legacy codes ``DC-P01-02-01`` and the DB uses ``DC-02-01``,
 ``score_match`` also awards a **legacy_code** tier (exact mapped codigo + matching
@@ -30,15 +32,26 @@ Export instruments JSON from Supabase (PostgREST), e.g.:
 from __future__ import annotations
 
 import argparse
-import csv
+import heapq
 import json
+import math
+import multiprocessing
 import re
 import sys
 import unicodedata
-from dataclasses import dataclass, asdict
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field, fields
 from pathlib import Path
 from typing import Any, Iterable, Optional
 
+_REPO_ROOT = Path(__file__).resolve().parents[2]
+if str(_REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(_REPO_ROOT))
+
+from migration_tools.assignment import UNMATCHED, solve_assignment  # noqa: E402
+from migration_tools.csv_reader import CsvReader  # noqa: E402
+
 
 def norm_text(s: str | None) -> str:
     if not s:
@@ -81,6 +94,20 @@ def norm_code_hint(code: str | None) -> str:
     return c
 
 
+def code_key(code: str | None) -> str:
+    """Codigo compared as in the legacy tier: normalized, spaces removed."""
+    return norm_text(code).replace(" ", "")
+
+
+def _shadow() -> Any:
+    return field(default="", init=False, repr=False, compare=False)
+
+
+def public_dict(record: Any) -> dict[str, Any]:
+    """A record's constructor fields (the normalized shadow fields left out), for reports."""
+    return {f.name: getattr(record, f.name) for f in fields(record) if f.init}
+
+
 def parse_service(cell: str | None) -> str:
     t = norm_text(cell or "")
     if "calib" in t:
@@ -132,57 +159,57 @@ class CsvRow:
     servicio: str
     fecha_vigente: Optional[str]
     proxima: Optional[str]
+    # Normalized once here instead of per (csv_row, instrument) pair in score_match.
+    legacy_codigo: str = _shadow()
+    n_legacy_codigo: str = _shadow()
+    n_hint: str = _shadow()
+    n_serial: str = _shadow()
+    n_nombre: str = _shadow()
+    n_ubicacion: str = _shadow()
+    n_descripcion: str = _shadow()
+
+    def __post_init__(self) -> None:
+        self.legacy_codigo = legacy_dc_codigo_to_db(self.codigo_csv)
+        self.n_legacy_codigo = code_key(self.legacy_codigo)
+        self.n_hint = norm_code_hint(self.codigo_csv)
+        self.n_serial = norm_serial(self.serial)
+        self.n_nombre = norm_text(self.nombre)
+        self.n_ubicacion = norm_text(self.ubicacion)
+        self.n_descripcion = norm_text(self.descripcion)
+
+
+# CsvRow field -> inventario header aliases (matched accent/case-insensitively by CsvReader).
+CSV_COLUMNS = {
+    "codigo": ("codigo", "código", "clave"),
+    "nombre": ("nombre",),
+    "descripcion": ("descripcion", "descripción", "modelo"),
+    "ubicacion": ("ubicacion", "ubicación", "planta", "ubicacion dentro de planta"),
+    "serial": ("no. de serie", "no de serie", "numero de serie", "número de serie", "serie"),
+    "servicio": ("verificacion/calibracion", "verificación/calibración", "verificacion calibracion"),
+    "fecha_vigente": ("fecha vigente verificación/calibración", "fecha vigente"),
+    "proxima": ("próxima verificación/calibración", "proxima verificación/calibración", "proxima"),
+}
 
 
 def read_csv(path: Path) -> list[CsvRow]:
+    reader = CsvReader(path, CSV_COLUMNS, errors="replace")
     rows: list[CsvRow] = []
-    with path.open(newline="", encoding="utf-8-sig", errors="replace") as f:
-        reader = csv.DictReader(f)
-        fieldmap = {norm_text(k): k for k in reader.fieldnames or []}
-
-        def col(*names: str) -> Optional[str]:
-            for n in names:
-                nk = norm_text(n)
-                if nk in fieldmap:
-                    return fieldmap[nk]
-            return None
-
-        c_codigo = col("codigo", "código", "clave")
-        c_nombre = col("nombre")
-        c_desc = col("descripcion", "descripción", "modelo")
-        c_ubi = col("ubicacion", "ubicación", "planta", "ubicacion dentro de planta")
-        c_serial = col("no. de serie", "no de serie", "numero de serie", "número de serie", "serie")
-        c_serv = col("verificacion/calibracion", "verificación/calibración", "verificacion calibracion")
-        c_fvig = col("fecha vigente verificación/calibración", "fecha vigente")
-        c_prox = col("próxima verificación/calibración", "proxima verificación/calibración", "proxima")
-
-        for raw in reader:
-            def get(key: Optional[str]) -> str:
-                if not key:
-                    return ""
-                return (raw.get(key) or "").strip()
-
-            codigo = get(c_codigo)
-            nombre = get(c_nombre)
-            descripcion = get(c_desc)
-            ubicacion = get(c_ubi)
-            serial = get(c_serial)
-            servicio = parse_service(get(c_serv))
-            fv = parse_date_ymd(get(c_fvig))
-            px = parse_date_ymd(get(c_prox))
-            rows.append(
-                CsvRow(
-                    raw={k: v for k, v in raw.items()},
-                    codigo_csv=codigo,
-                    nombre=nombre,
-                    descripcion=descripcion,
-                    ubicacion=ubicacion,
-                    serial=norm_serial(serial) and get(c_serial).strip() or "",
-                    servicio=servicio,
-                    fecha_vigente=fv,
-                    proxima=px,
-                )
+    # raw_rows keeps csv.DictReader's rows (blank ones included) and raw dicts for the report.
+    for raw in reader.raw_rows():
+        rec = reader.record(reader.padded(raw))
+        rows.append(
+            CsvRow(
+                raw=reader.raw_dict(raw),
+                codigo_csv=rec.codigo,
+                nombre=rec.nombre,
+                descripcion=rec.descripcion,
+                ubicacion=rec.ubicacion,
+                serial=norm_serial(rec.serial) and rec.serial or "",
+                servicio=parse_service(rec.servicio),
+                fecha_vigente=parse_date_ymd(rec.fecha_vigente),
+                proxima=parse_date_ymd(rec.proxima),
             )
+        )
     return rows
 
 
@@ -200,6 +227,22 @@ class DbInstrument:
     nombre_conjunto: str
     categoria: str
     tipo_servicio: Optional[str]
+    n_codigo: str = _shadow()
+    n_hint: str = _shadow()
+    n_serial: str = _shadow()
+    n_nombre: str = _shadow()
+    n_ubicacion: str = _shadow()
+    n_descripcion: str = _shadow()
+    servicio: str = _shadow()
+
+    def __post_init__(self) -> None:
+        self.n_codigo = code_key(self.codigo)
+        self.n_hint = norm_code_hint(self.codigo)
+        self.n_serial = norm_serial(self.numero_serie)
+        self.n_nombre = norm_text(self.nombre)
+        self.n_ubicacion = norm_text(self.ubicacion_dentro_planta or "")
+        self.n_descripcion = norm_text(self.nombre + " " + (self.categoria or ""))
+        self.servicio = self.tipo_servicio or "ninguno"
 
 
 def load_db_instruments(path: Path) -> list[DbInstrument]:
@@ -235,41 +278,154 @@ def load_mapping(path: Path) -> dict[str, str]:
     return {str(k): str(v) for k, v in j.get("mappings", j).items()}
 
 
-def score_match(csv_row: CsvRow, db: DbInstrument, mapping_id: Optional[str]) -> tuple[str, int, dict[str, Any]]:
+def trigrams(text: str) -> Counter[str]:
+    """Character trigrams of each space-padded word: word order does not matter, typos cost a few."""
+    grams: Counter[str] = Counter()
+    for word in text.split():
+        w = f" {word} "
+        grams.update(w[i:i + 3] for i in range(len(w) - 2))
+    return grams
+
+
+class TrigramIndex:
+    """
+    TF-IDF cosine over ``trigrams`` of a set of distinct strings, with an inverted index:
+    a query only touches the postings of its own trigrams, so its cost depends on how
+    many indexed strings share them, not on how many strings there are.
+    """
+
+    def __init__(self, texts: Iterable[str]):
+        self.texts = list(dict.fromkeys(t for t in texts if t))
+        counts = [trigrams(t) for t in self.texts]
+        df = Counter(g for c in counts for g in c)
+        n = len(self.texts)
+        self.idf = {g: math.log((1 + n) / (1 + d)) + 1 for g, d in df.items()}
+        self.unseen_idf = math.log(1 + n) + 1  # trigrams no indexed string has
+        postings: dict[str, list[tuple[int, float]]] = defaultdict(list)
+        for doc, c in enumerate(counts):
+            for g, w in self._vector(c).items():
+                postings[g].append((doc, w))
+        self.postings = dict(postings)
+
+    def _vector(self, counts: Counter[str]) -> dict[str, float]:
+        vec = {g: tf * self.idf.get(g, self.unseen_idf) for g, tf in counts.items()}
+        norm = math.sqrt(sum(w * w for w in vec.values()))
+        return {g: w / norm for g, w in vec.items()} if norm else {}
+
+    def search(self, query: str, k: Optional[int] = None, threshold: float = 0.0) -> list[tuple[str, float]]:
+        """Indexed strings with cosine >= ``threshold`` to ``query``, best first (at most ``k``)."""
+        scores: dict[int, float] = defaultdict(float)
+        for g, qw in self._vector(trigrams(query)).items():
+            for doc, w in self.postings.get(g, ()):
+                scores[doc] += qw * w
+        hits = [(sc, doc) for doc, sc in scores.items() if sc >= threshold]
+        rank = lambda h: (h[0], -h[1])  # noqa: E731 -- ties: first indexed string wins
+        hits = heapq.nlargest(k, hits, key=rank) if k else sorted(hits, key=rank, reverse=True)
+        return [(self.texts[doc], sc) for sc, doc in hits]
+
+
+class SimilarityIndex:
+    """
+    Fuzzy name + location matching for the **similar** tier of score_match.
+
+    Instrument names (``nombre`` + ``categoria``; TF-IDF keeps a shared categoria from
+    dominating) and ``ubicacion_dentro_planta`` each get a TrigramIndex over their distinct
+    values. For a CSV row, its nombre (plus descripción) picks the ``top_k`` most similar
+    instrument names at cosine >= ``threshold``, and its ubicación every location at
+    cosine >= ``threshold``; both are computed once per distinct CSV text. An instrument
+    is similar when its name and its location are both in those sets, so "piso báscula"
+    finds "bascula de piso" where the substring tiers do not.
+    """
+
+    def __init__(self, db_rows: Iterable[DbInstrument], threshold: float = 0.6, top_k: int = 5):
+        self.db_rows = list(db_rows)
+        self.threshold = threshold
+        self.top_k = top_k
+        self.names = TrigramIndex(db.n_descripcion for db in self.db_rows)
+        self.locations = TrigramIndex(db.n_ubicacion for db in self.db_rows)
+        by_pair: dict[tuple[str, str], list[int]] = defaultdict(list)
+        for i, db in enumerate(self.db_rows):
+            by_pair[db.n_descripcion, db.n_ubicacion].append(i)
+        self.by_pair = dict(by_pair)
+        self._name_cache: dict[str, dict[str, float]] = {}
+        self._location_cache: dict[str, dict[str, float]] = {}
+
+    def matches(self, csv_row: CsvRow) -> tuple[dict[str, float], dict[str, float]]:
+        """({instrument name: cosine}, {location: cosine}) passing for this CSV row."""
+        query = " ".join(t for t in (csv_row.n_nombre, csv_row.n_descripcion) if t)
+        names = self._name_cache.get(query)
+        if names is None:
+            names = dict(self.names.search(query, self.top_k, self.threshold)) if query else {}
+            self._name_cache[query] = names
+        if not names or not csv_row.n_ubicacion:
+            return names, {}
+        locs = self._location_cache.get(csv_row.n_ubicacion)
+        if locs is None:
+            locs = dict(self.locations.search(csv_row.n_ubicacion, None, self.threshold))
+            self._location_cache[csv_row.n_ubicacion] = locs
+        return names, locs
+
+    def score(self, csv_row: CsvRow, db: DbInstrument) -> Optional[tuple[float, float]]:
+        """(name, location) cosine when ``db`` is similar to the CSV row, else None."""
+        names, locs = self.matches(csv_row)
+        name_sim = names.get(db.n_descripcion)
+        loc_sim = locs.get(db.n_ubicacion)
+        if name_sim is None or loc_sim is None:
+            return None
+        return name_sim, loc_sim
+
+    def candidates(self, csv_row: CsvRow) -> list[int]:
+        names, locs = self.matches(csv_row)
+        by_pair = self.by_pair
+        return [i for name in names for loc in locs for i in by_pair.get((name, loc), ())]
+
+
+def score_match(
+    csv_row: CsvRow,
+    db: DbInstrument,
+    mapping_id: Optional[str],
+    similarity: Optional[SimilarityIndex] = None,
+) -> tuple[str, int, dict[str, Any]]:
     details: dict[str, Any] = {}
     if mapping_id and db.id == mapping_id:
         return "mapping", 1000, {"via": "explicit_mapping"}
 
-    ldb = legacy_dc_codigo_to_db(csv_row.codigo_csv)
-    if ldb and norm_text(ldb).replace(" ", "") == norm_text(db.codigo).replace(" ", ""):
-        if csv_row.servicio != "ninguno" and (db.tipo_servicio or "ninguno") == csv_row.servicio:
+    serv_match = csv_row.servicio != "ninguno" and db.servicio == csv_row.servicio
+
+    ldb = csv_row.legacy_codigo
+    if ldb and csv_row.n_legacy_codigo == db.n_codigo:
+        if serv_match:
             return "legacy_code", 480, {"mapped_codigo": ldb}
 
-    s_csv = norm_serial(csv_row.serial)
-    s_db = norm_serial(db.numero_serie)
-    code_only = norm_code_hint(csv_row.codigo_csv) == norm_code_hint(db.codigo) and norm_code_hint(csv_row.codigo_csv)
+    s_csv = csv_row.n_serial
+    s_db = db.n_serial
+    code_only = csv_row.n_hint == db.n_hint and csv_row.n_hint
 
     if s_csv and s_db and s_csv == s_db:
-        if csv_row.servicio != "ninguno" and (db.tipo_servicio or "ninguno") == csv_row.servicio:
+        if serv_match:
             return "strong", 500, {"serial": s_csv, "servicio": csv_row.servicio}
         return "medium", 350, {"serial": s_csv, "servicio_mismatch": (db.tipo_servicio, csv_row.servicio)}
 
-    n_csv = norm_text(csv_row.nombre)
-    n_db = norm_text(db.nombre)
-    u_csv = norm_text(csv_row.ubicacion)
-    u_db = norm_text(db.ubicacion_dentro_planta or "")
+    n_csv = csv_row.n_nombre
+    n_db = db.n_nombre
+    u_csv = csv_row.n_ubicacion
+    u_db = db.n_ubicacion
     name_match = n_csv and n_db and (n_csv in n_db or n_db in n_csv or n_csv == n_db)
     loc_match = u_csv and u_db and (u_csv in u_db or u_db in u_csv or u_csv == u_db)
-    serv_match = csv_row.servicio != "ninguno" and (db.tipo_servicio or "ninguno") == csv_row.servicio
 
     if name_match and loc_match and serv_match:
         return "strong", 400, {"name": csv_row.nombre, "ubicacion": csv_row.ubicacion}
 
-    d_csv = norm_text(csv_row.descripcion)
-    d_db = norm_text(db.nombre + " " + (db.categoria or ""))
+    d_csv = csv_row.n_descripcion
+    d_db = db.n_descripcion
     if d_csv and len(d_csv) > 4 and d_csv in d_db and serv_match and loc_match:
         return "medium", 280, {"descripcion": csv_row.descripcion}
 
+    if similarity is not None and serv_match:
+        sim = similarity.score(csv_row, db)
+        if sim:
+            return "similar", 260, {"name_similarity": round(sim[0], 3), "location_similarity": round(sim[1], 3)}
+
     if code_only:
         return "code_only", 50, {"csv_code": csv_row.codigo_csv, "db_codigo": db.codigo}
 
@@ -315,17 +471,245 @@ def emit_legacy_inventory_sql(rows: list[tuple[str, str, str]]) -> str:
     )
 
 
-def best_matches(csv_row: CsvRow, db_rows: Iterable[DbInstrument], mapping: dict[str, str]) -> list[tuple[DbInstrument, str, int, dict]]:
-    mid = mapping.get(csv_row.codigo_csv) or mapping.get(norm_code_hint(csv_row.codigo_csv))
+def _contains_either(a: str, b: str) -> bool:
+    return bool(a and b and (a in b or b in a))
+
+
+class CandidateIndex:
+    """
+    Blocking index over the DB instruments, built once per run.
+
+    ``candidates`` returns, in ``db_rows`` order, every instrument that can score > 0 in
+    ``score_match`` against a CSV row: the explicit mapping id, the same mapped legacy
+    codigo, the same normalized serial, the same code hint, or the same ``tipo_servicio``
+    with a location and a name / descripción passing score_match's substring tests. The
+    substring tests run once per distinct DB location and name, not once per instrument.
+    Every other instrument scores 0, so ranking the candidates gives exactly the
+    exhaustive scan's result.
+    """
+
+    def __init__(self, db_rows: Iterable[DbInstrument]):
+        self.db_rows = list(db_rows)
+        self.by_id: dict[str, list[int]] = defaultdict(list)
+        self.by_codigo: dict[str, list[int]] = defaultdict(list)
+        self.by_serial: dict[str, list[int]] = defaultdict(list)
+        self.by_hint: dict[str, list[int]] = defaultdict(list)
+        # tipo_servicio -> location -> (nombre, nombre + categoria) -> rows
+        by_service: dict[str, dict[str, dict[tuple[str, str], list[int]]]] = defaultdict(
+            lambda: defaultdict(lambda: defaultdict(list))
+        )
+        self._text_cache: dict[tuple[str, str, str, str], tuple[int, ...]] = {}
+        for i, db in enumerate(self.db_rows):
+            self.by_id[db.id].append(i)
+            for table, key in (
+                (self.by_codigo, db.n_codigo),
+                (self.by_serial, db.n_serial),
+                (self.by_hint, db.n_hint),
+            ):
+                if key:
+                    table[key].append(i)
+            if db.n_ubicacion:
+                by_service[db.servicio][db.n_ubicacion][db.n_nombre, db.n_descripcion].append(i)
+        # plain dicts so the index pickles (process pools without fork)
+        self.by_service = {s: {u: dict(names) for u, names in locs.items()} for s, locs in by_service.items()}
+
+    def _text_candidates(self, csv_row: CsvRow) -> tuple[int, ...]:
+        """Rows passing the name + location (+ servicio) or descripción tiers' preconditions."""
+        if csv_row.servicio == "ninguno":
+            return ()
+        u_csv = csv_row.n_ubicacion
+        if not u_csv:
+            return ()
+        n_csv = csv_row.n_nombre
+        d_csv = csv_row.n_descripcion
+        key = (csv_row.servicio, u_csv, n_csv, d_csv)
+        hit = self._text_cache.get(key)
+        if hit is None:
+            rows: list[int] = []
+            for u_db, by_names in self.by_service.get(csv_row.servicio, {}).items():
+                if not _contains_either(u_csv, u_db):
+                    continue
+                for (n_db, d_db), idx in by_names.items():
+                    if _contains_either(n_csv, n_db) or (len(d_csv) > 4 and d_csv in d_db):
+                        rows.extend(idx)
+            hit = self._text_cache[key] = tuple(rows)
+        return hit
+
+    def candidates(
+        self, csv_row: CsvRow, mapping_id: Optional[str], similarity: Optional[SimilarityIndex] = None
+    ) -> list[DbInstrument]:
+        found: set[int] = set(self._text_candidates(csv_row))
+        if similarity is not None:
+            found.update(similarity.candidates(csv_row))
+        if mapping_id:
+            found.update(self.by_id.get(mapping_id, ()))
+        for table, key in (
+            (self.by_codigo, csv_row.n_legacy_codigo),
+            (self.by_serial, csv_row.n_serial),
+            (self.by_hint, csv_row.n_hint),
+        ):
+            if key:
+                found.update(table.get(key, ()))
+        rows = self.db_rows
+        return [rows[i] for i in sorted(found)]
+
+
+def best_matches(
+    csv_row: CsvRow,
+    db_rows: Iterable[DbInstrument],
+    mapping: dict[str, str],
+    index: Optional[CandidateIndex] = None,
+    similarity: Optional[SimilarityIndex] = None,
+) -> list[tuple[DbInstrument, str, int, dict]]:
+    """
+    Instruments scoring > 0, best first; with ``index``, only its candidates are scored.
+    ``similarity`` enables the similar tier.
+    """
+    mid = mapping.get(csv_row.codigo_csv) or mapping.get(csv_row.n_hint)
+    if index is not None:
+        db_rows = index.candidates(csv_row, mid, similarity)
     ranked: list[tuple[DbInstrument, str, int, dict]] = []
     for db in db_rows:
-        tier, sc, det = score_match(csv_row, db, mid)
+        tier, sc, det = score_match(csv_row, db, mid, similarity)
         if sc > 0:
             ranked.append((db, tier, sc, det))
     ranked.sort(key=lambda x: -x[2])
     return ranked
 
 
+TOP_MATCHES = 3
+
+# Read-only state for rank_rows' pool workers: inherited by fork, or sent once per worker
+# through the pool initializer, never pickled per task.
+_SHARED: dict[str, Any] = {}
+
+
+def needs_match(csv_row: CsvRow) -> bool:
+    return not (csv_row.servicio == "ninguno" and not csv_row.proxima and not csv_row.fecha_vigente)
+
+
+def _share(csv_rows, db_rows, mapping, index, similarity) -> None:
+    _SHARED.update(
+        csv_rows=csv_rows,
+        db_rows=db_rows,
+        mapping=mapping,
+        index=index,
+        similarity=similarity,
+        positions={id(db): i for i, db in enumerate(db_rows)},
+    )
+
+
+def _rank_shard(bounds: tuple[int, int]) -> list[list[tuple[int, str, int, dict]]]:
+    """Top matches of csv_rows[start:stop] as (db_rows position, tier, score, detail)."""
+    start, stop = bounds
+    db_rows, mapping, index, similarity, positions = (
+        _SHARED[k] for k in ("db_rows", "mapping", "index", "similarity", "positions")
+    )
+    out = []
+    for cr in _SHARED["csv_rows"][start:stop]:
+        top = best_matches(cr, db_rows, mapping, index, similarity)[:TOP_MATCHES] if needs_match(cr) else []
+        out.append([(positions[id(db)], tier, sc, det) for db, tier, sc, det in top])
+    return out
+
+
+def rank_rows(
+    csv_rows: list[CsvRow],
+    db_rows: list[DbInstrument],
+    mapping: dict[str, str],
+    index: Optional[CandidateIndex] = None,
+    workers: int = 1,
+    similarity: Optional[SimilarityIndex] = None,
+) -> list[list[tuple[DbInstrument, str, int, dict]]]:
+    """
+    best_matches(...)[:TOP_MATCHES] for every CSV row that needs a match ([] otherwise), in
+    CSV order. With ``workers`` > 1 the rows are split into contiguous shards scored in a
+    process pool; shards come back in order, so the result equals the serial one.
+    """
+    _share(csv_rows, db_rows, mapping, index, similarity)
+    shards = max(1, workers) * 4
+    step = -(-len(csv_rows) // shards) or 1
+    bounds = [(i, min(i + step, len(csv_rows))) for i in range(0, len(csv_rows), step)]
+    if workers <= 1 or len(bounds) <= 1:
+        ranked = [r for b in bounds for r in _rank_shard(b)]
+    else:
+        start_methods = multiprocessing.get_all_start_methods()
+        ctx = multiprocessing.get_context("fork" if "fork" in start_methods else None)
+        pool_args: dict[str, Any] = {}
+        if ctx.get_start_method() != "fork":
+            pool_args = {"initializer": _share, "initargs": (csv_rows, db_rows, mapping, index, similarity)}
+        with ProcessPoolExecutor(max_workers=min(workers, len(bounds)), mp_context=ctx, **pool_args) as pool:
+            ranked = [r for shard in pool.map(_rank_shard, bounds) for r in shard]
+    _SHARED.clear()
+    return [[(db_rows[i], tier, sc, det) for i, tier, sc, det in top] for top in ranked]
+
+
+TRUSTED_TIERS = ("strong", "mapping", "legacy_code")
+AMBIGUOUS_RATIO = 0.85
+# resolve_matches minimizes sum(ASSIGNMENT_BASE - score): a row left without an instrument
+# costs ASSIGNMENT_BASE (score 0), so the solution maximizes the total matched score.
+ASSIGNMENT_BASE = 1000
+
+
+def is_ambiguous(
+    top: list[tuple[DbInstrument, str, int, dict]],
+    choice: tuple[DbInstrument, str, int, dict],
+) -> bool:
+    """
+    Another candidate of the row scores >= AMBIGUOUS_RATIO of the chosen one, whether or
+    not that candidate was assigned to another row.
+    """
+    second = max((m[2] for m in top if m[0].id != choice[0].id), default=0)
+    return second > 0 and second >= choice[2] * AMBIGUOUS_RATIO
+
+
+def resolve_matches(
+    csv_rows: list[CsvRow],
+    ranked: list[list[tuple[DbInstrument, str, int, dict]]],
+    mapping: dict[str, str],
+    greedy: bool = False,
+) -> list[Optional[tuple[DbInstrument, str, int, dict]]]:
+    """
+    The match each CSV row whose best tier is trusted ends up with, one row per instrument
+    (None: its candidates went to other rows, or the row is not trusted).
+
+    Default: explicit-mapping rows keep their instrument; the other rows get a maximum
+    total score one-to-one assignment over their trusted candidates (sparse min-cost
+    matching, migration_tools.assignment.solve_assignment), so a better match later in
+    the CSV is not lost to an earlier, weaker one. ``greedy`` is the previous CSV-order
+    resolution: the first row wins, rows ambiguous on their best match claim nothing.
+    """
+    chosen: list[Optional[tuple[DbInstrument, str, int, dict]]] = [None] * len(csv_rows)
+    rows = [i for i, top in enumerate(ranked) if top and top[0][1] in TRUSTED_TIERS and needs_match(csv_rows[i])]
+
+    if greedy:
+        used_db_ids: set[str] = set()
+        for i in rows:
+            best = ranked[i][0]
+            if is_ambiguous(ranked[i], best):
+                chosen[i] = best
+            elif best[0].id not in used_db_ids or mapping.get(csv_rows[i].codigo_csv) == best[0].id:
+                used_db_ids.add(best[0].id)
+                chosen[i] = best
+        return chosen
+
+    taken: set[str] = set()
+    free: list[int] = []
+    for i in rows:
+        if ranked[i][0][1] == "mapping":
+            chosen[i] = ranked[i][0]
+            taken.add(ranked[i][0][0].id)
+        else:
+            free.append(i)
+    columns: dict[str, int] = {}
+    options = [[m for m in ranked[i] if m[1] in TRUSTED_TIERS and m[0].id not in taken] for i in free]
+    edges = [[(columns.setdefault(m[0].id, len(columns)), ASSIGNMENT_BASE - m[2]) for m in opts] for opts in options]
+    picked = solve_assignment(edges, [1] * len(columns), ASSIGNMENT_BASE)
+    for i, opts, out, j in zip(free, options, edges, picked):
+        if j != UNMATCHED:
+            chosen[i] = opts[[col for col, _ in out].index(j)]
+    return chosen
+
+
 def main() -> int:
     ap = argparse.ArgumentParser(description="EMA CSV schedule audit / dry-run matcher")
     ap.add_argument("--csv", required=True, type=Path)
@@ -337,6 +721,29 @@ def main() -> int:
         action="store_true",
         help="Print UPDATE … FROM VALUES for DC-P…→DC-… + próxima fecha (no DB JSON needed); review before running in SQL",
     )
+    ap.add_argument(
+        "--exhaustive",
+        action="store_true",
+        help="Score every CSV row against every instrument instead of the blocking index (same report, slower)",
+    )
+    ap.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Process pool size for scoring CSV rows (1 = serial; same report either way)",
+    )
+    ap.add_argument(
+        "--similarity-threshold",
+        type=float,
+        help="Enable the 'similar' tier: trigram TF-IDF cosine >= this (e.g. 0.6) on name and location, "
+             "same tipo_servicio; reported for review, never applied (off by default)",
+    )
+    ap.add_argument("--similarity-top-k", type=int, default=5, help="Instrument names kept per CSV row for the similar tier")
+    ap.add_argument(
+        "--greedy",
+        action="store_true",
+        help="Resolve instruments claimed by several CSV rows first-come in CSV order instead of the optimal assignment",
+    )
     args = ap.parse_args()
 
     if args.emit_legacy_inventory_sql:
@@ -372,21 +779,23 @@ def main() -> int:
         "proposed_updates": [],
     }
 
-    used_db_ids: set[str] = set()
+    index = None if args.exhaustive else CandidateIndex(db_rows)
+    similarity = None
+    if args.similarity_threshold is not None:
+        similarity = SimilarityIndex(db_rows, args.similarity_threshold, args.similarity_top_k)
+    ranked = rank_rows(csv_rows, db_rows, mapping, index, args.workers, similarity)
+    chosen = resolve_matches(csv_rows, ranked, mapping, args.greedy)
+    claimed = {c[0].id for c in chosen if c is not None}
 
-    for cr in csv_rows:
-        if cr.servicio == "ninguno" and not cr.proxima and not cr.fecha_vigente:
+    for cr, top, choice in zip(csv_rows, ranked, chosen):
+        if not needs_match(cr):
             continue
 
-        matches = best_matches(cr, db_rows, mapping)
-        top = matches[:3]
-
         if not top or top[0][2] == 0:
-            report["unmatched_csv"].append(asdict(cr))
+            report["unmatched_csv"].append(public_dict(cr))
             continue
 
         best, tier, sc, det = top[0]
-        second_sc = top[1][2] if len(top) > 1 else 0
 
         if tier == "code_only":
             report["code_only"].append(
@@ -394,24 +803,26 @@ def main() -> int:
             )
             continue
 
-        if tier in ("strong", "mapping", "legacy_code") and second_sc > 0 and second_sc >= sc * 0.85 and top[1][0].id != best.id:
+        if tier in TRUSTED_TIERS and choice is None:
+            report["ambiguous"].append(
+                {"csv_row": cr.codigo_csv, "reason": "db_row_already_matched_elsewhere", "match_id": best.id}
+            )
+            continue
+
+        if tier in TRUSTED_TIERS and is_ambiguous(top, choice):
             report["ambiguous"].append(
                 {
                     "csv_row": cr.codigo_csv,
                     "serial": cr.serial,
                     "nombre": cr.nombre,
                     "top": [{"id": m[0].id, "codigo": m[0].codigo, "tier": m[1], "score": m[2]} for m in top[:3]],
+                    "claimed_elsewhere": [m[0].id for m in top[:3] if m[0].id in claimed and m[0].id != choice[0].id],
                 }
             )
             continue
 
-        if tier in ("strong", "mapping", "legacy_code"):
-            if best.id in used_db_ids and mapping.get(cr.codigo_csv) != best.id:
-                report["ambiguous"].append(
-                    {"csv_row": cr.codigo_csv, "reason": "db_row_already_matched_elsewhere", "match_id": best.id}
-                )
-                continue
-            used_db_ids.add(best.id)
+        if tier in TRUSTED_TIERS:
+            best, tier, sc, det = choice
             if cr.proxima and cr.proxima != (best.fecha_proximo_evento or ""):
                 report["proposed_updates"].append(
                     {
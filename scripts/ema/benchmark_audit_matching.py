@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Blocking index vs exhaustive scan for audit_inventory_csv_schedule.best_matches.
+
+  python3 scripts/ema/benchmark_audit_matching.py --csv-rows 50000 --instruments 50000
+
+Builds a synthetic multi-plant inventory (instruments with codes DC-gg-nn per plant,
+serials on most, a few dozen locations and names per plant) and CSV rows drawn from it
+the way the VCM inventario looks: legacy DC-Pnn-… codes, serials with '.0' or missing,
+renamed or unknown instruments. Every CSV row is matched through CandidateIndex; a
+``--sample`` of rows is also matched exhaustively, which must give the same ranked
+matches, and its time is extrapolated to all rows. ``--workers N`` also times rank_rows
+with a process pool of N, which must equal the serial ranking; ``--similarity-threshold``
+turns on the similar tier (SimilarityIndex) in every mode. Finally the ranked rows go
+through resolve_matches, optimal assignment vs the greedy CSV-order resolution.
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import time
+
+from audit_inventory_csv_schedule import (
+    TOP_MATCHES, CandidateIndex, CsvRow, DbInstrument, SimilarityIndex, best_matches, norm_code_hint, rank_rows,
+    is_ambiguous, resolve_matches,
+)
+
+NAMES = ["balanza", "bascula", "termometro", "flexometro", "cono de revenimiento", "prensa",
+         "vernier", "horno", "molde cilindrico", "varilla", "cronometro", "tamiz", "olla washington"]
+LOCATIONS = ["laboratorio", "patio", "caseta de control", "planta dosificadora", "bodega", "oficina",
+             "cuarto de curado", "area de muestreo"]
+SERVICES = ["calibracion", "verificacion", None]
+
+
+def synthetic_instruments(n: int, rng: random.Random) -> list[DbInstrument]:
+    plants = max(1, n // 1000)
+    rows = []
+    for i in range(n):
+        plant = i % plants
+        name = f"{rng.choice(NAMES)} {rng.randint(1, 20)}"
+        rows.append(DbInstrument(
+            id=f"inst-{i}",
+            codigo=f"DC-{plant:03d}-{i // plants % 97:02d}-{i // plants // 97:02d}",
+            nombre=name,
+            numero_serie=f"SN{rng.randint(0, 10 ** 9)}" if rng.random() < 0.7 else None,
+            ubicacion_dentro_planta=f"{rng.choice(LOCATIONS)} p{plant}",
+            fecha_proximo_evento="2026-01-01",
+            estado="vigente",
+            plant_id=f"plant-{plant}",
+            codigo_conjunto="",
+            nombre_conjunto=name,
+            categoria="medicion",
+            tipo_servicio=rng.choice(SERVICES),
+        ))
+    return rows
+
+
+def synthetic_csv(n: int, instruments: list[DbInstrument], rng: random.Random) -> list[CsvRow]:
+    rows = []
+    for _ in range(n):
+        db = rng.choice(instruments)
+        codigo = db.codigo.replace("DC-", f"DC-P{rng.randint(1, 9):02d}-", 1) if rng.random() < 0.5 else db.codigo
+        serial = (db.numero_serie or "") + (".0" if rng.random() < 0.1 else "") if rng.random() < 0.6 else "N/A"
+        nombre = db.nombre if rng.random() < 0.8 else f"{rng.choice(NAMES)} {rng.randint(1, 20)}"
+        servicio = db.tipo_servicio or "ninguno" if rng.random() < 0.9 else rng.choice(["calibracion", "verificacion"])
+        rows.append(CsvRow(
+            raw={}, codigo_csv=codigo, nombre=nombre, descripcion=db.nombre if rng.random() < 0.3 else "",
+            ubicacion=db.ubicacion_dentro_planta or "", serial=serial, servicio=servicio,
+            fecha_vigente=None, proxima="2026-06-01",
+        ))
+    return rows
+
+
+def ranked_key(matches):
+    return [(db.id, tier, score, det) for db, tier, score, det in matches]
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="best_matches: blocking index vs exhaustive scan")
+    ap.add_argument("--csv-rows", type=int, default=50_000)
+    ap.add_argument("--instruments", type=int, default=50_000)
+    ap.add_argument("--sample", type=int, default=100, help="CSV rows also matched exhaustively")
+    ap.add_argument("--seed", type=int, default=11)
+    ap.add_argument("--workers", type=int, default=1, help="Also time rank_rows with this many processes")
+    ap.add_argument("--similarity-threshold", type=float, help="Enable the similar tier at this cosine")
+    args = ap.parse_args()
+
+    rng = random.Random(args.seed)
+    instruments = synthetic_instruments(args.instruments, rng)
+    csv_rows = synthetic_csv(args.csv_rows, instruments, rng)
+    mapping = {norm_code_hint(instruments[0].codigo): instruments[0].id}
+
+    t0 = time.perf_counter()
+    index = CandidateIndex(instruments)
+    similarity = None
+    if args.similarity_threshold is not None:
+        similarity = SimilarityIndex(instruments, args.similarity_threshold)
+    t_build = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    blocked = [best_matches(cr, instruments, mapping, index, similarity) for cr in csv_rows]
+    t_blocked = time.perf_counter() - t0
+
+    sample = rng.sample(range(len(csv_rows)), min(args.sample, len(csv_rows)))
+    t0 = time.perf_counter()
+    exhaustive = {i: best_matches(csv_rows[i], instruments, mapping, None, similarity) for i in sample}
+    t_sample = time.perf_counter() - t0
+    t_exhaustive = t_sample / max(len(sample), 1) * len(csv_rows)
+
+    same = all(ranked_key(exhaustive[i]) == ranked_key(blocked[i]) for i in sample)
+    if args.workers > 1:
+        t0 = time.perf_counter()
+        pooled = rank_rows(csv_rows, instruments, mapping, CandidateIndex(instruments), args.workers, similarity)
+        t_pooled = time.perf_counter() - t0
+        same &= all(ranked_key(p) == ranked_key(b[:TOP_MATCHES]) for p, b in zip(pooled, blocked))
+    top = [m[:TOP_MATCHES] for m in blocked]
+    resolved = {}
+    for mode in ("greedy", "optimal"):
+        t0 = time.perf_counter()
+        chosen = resolve_matches(csv_rows, top, mapping, greedy=mode == "greedy")
+        seconds = time.perf_counter() - t0
+        strong = [c for m, c in zip(top, chosen) if c is not None and not is_ambiguous(m, c)]
+        resolved[mode] = (seconds, len(strong), sum(c[2] for c in strong))
+    ids = [c[0].id for c in chosen if c is not None and c[1] != "mapping"]
+    same &= len(ids) == len(set(ids))
+
+    matched = sum(1 for m in blocked if m)
+    similar = sum(1 for m in blocked if m and m[0][1] == "similar")
+    print(f"{args.csv_rows:,} CSV rows x {args.instruments:,} instruments; {matched:,} rows with a match ({similar:,} best only similar)")
+    print(f"index build  {t_build:8.3f} s")
+    print(f"blocked      {t_blocked:8.3f} s")
+    if args.workers > 1:
+        label = f"{args.workers} workers"
+        print(f"{label:<12} {t_pooled:8.3f} s  (index build included)")
+    print(f"exhaustive   {t_exhaustive:8.1f} s  (extrapolated from {len(sample)} rows, {t_sample:.2f} s)")
+    for mode, (seconds, n, score) in resolved.items():
+        print(f"{mode:<12} {seconds:8.3f} s  {n:,} strong matches, total score {score:,}")
+    print(f"speedup {t_exhaustive / (t_build + t_blocked):,.0f}x  identical: {'OK' if same else 'MISMATCH'}")
+    return 0 if same else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
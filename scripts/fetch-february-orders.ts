@@ -4,6 +4,9 @@
  *
  * Run: npx ts-node --project tsconfig.json scripts/fetch-february-orders.ts
  * Or: node --loader ts-node/esm scripts/fetch-february-orders.ts
+ *
+ * Any range / plant set (paginated, concurrent, --incremental):
+ *   python3 -m migration_tools.fetch_orders --env-file .env.local --plant P002 --from 2026-02-01 --to 2026-02-28 --output archive/data/february_orders.json
  */
 
 import { createClient } from '@supabase/supabase-js';
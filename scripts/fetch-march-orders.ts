@@ -1,8 +1,12 @@
 /**
  * Fetches March 2026 orders for Plant 2 (Tijuana) and saves to archive/data/march_orders.json.
- * Same shape as fetch-february-orders.ts for use with generate_plant2_pumping_migration.py.
+ * Same shape as fetch-february-orders.ts for use with generate_plant2_pumping_migration.py,
+ * plus total_amount and order_items so the same file works for --validate.
  *
  * Run: node --env-file=.env.local -r ts-node/register scripts/fetch-march-orders.ts
+ *
+ * Any range / plant set (paginated, concurrent, --incremental):
+ *   python3 -m migration_tools.fetch_orders --env-file .env.local --plant P002 --from 2026-03-01 --to 2026-03-31 --with-items --output archive/data/march_orders.json
  */
 
 import { createClient } from '@supabase/supabase-js';
@@ -24,7 +28,7 @@ async function main() {
 
   const { data: orders, error } = await supabase
     .from('orders')
-    .select('id, delivery_date, client_id, plant_id')
+    .select('id, delivery_date, client_id, plant_id, total_amount, order_items(product_type, volume, pump_volume, total_price)')
     .eq('plant_id', PLANT_2_ID)
     .gte('delivery_date', '2026-03-01')
     .lte('delivery_date', '2026-03-31')
@@ -41,6 +45,8 @@ async function main() {
     delivery_date: o.delivery_date?.split('T')[0] ?? o.delivery_date,
     client_id: o.client_id,
     plant_id: o.plant_id,
+    total_amount: o.total_amount,
+    order_items: o.order_items ?? [],
   }));
 
   const outPath = path.join(process.cwd(), 'archive', 'data', 'march_orders.json');
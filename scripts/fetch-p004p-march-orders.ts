@@ -1,6 +1,9 @@
 /**
  * Fetches March 2026 orders for Plant P004P (Pitahaya / Bajío) for bombeo migration.
  * Output: archive/data/p004p_march_orders.json (shape for generate_plant2_pumping_migration.py)
+ * Each order also carries its CONCRETO remisiones (concrete_remisiones) and their total
+ * (concrete_volume), used by `generate_p004p_march_migration.py --orders-json` to solve
+ * the pump remision -> order map (migration_tools/assignment.py).
  *
  * Run: npm run fetch:p004p-march-orders
  */
@@ -24,7 +27,7 @@ async function main() {
 
   const { data: orders, error } = await supabase
     .from('orders')
-    .select('id, delivery_date, client_id, plant_id')
+    .select('id, delivery_date, client_id, plant_id, remisiones(remision_number, fecha, volumen_fabricado, tipo_remision)')
     .eq('plant_id', PLANT_P004P_ID)
     .gte('delivery_date', '2026-03-01')
     .lte('delivery_date', '2026-03-31')
@@ -36,12 +39,23 @@ async function main() {
     process.exit(1);
   }
 
-  const normalized = (orders || []).map((o) => ({
-    id: o.id,
-    delivery_date: o.delivery_date?.split('T')[0] ?? o.delivery_date,
-    client_id: o.client_id,
-    plant_id: o.plant_id,
-  }));
+  const normalized = (orders || []).map((o) => {
+    const concrete = (o.remisiones || [])
+      .filter((r) => r.tipo_remision === 'CONCRETO')
+      .map((r) => ({
+        remision_number: r.remision_number,
+        fecha: r.fecha?.split('T')[0] ?? r.fecha,
+        volumen_fabricado: Number(r.volumen_fabricado),
+      }));
+    return {
+      id: o.id,
+      delivery_date: o.delivery_date?.split('T')[0] ?? o.delivery_date,
+      client_id: o.client_id,
+      plant_id: o.plant_id,
+      concrete_volume: concrete.reduce((sum, r) => sum + r.volumen_fabricado, 0),
+      concrete_remisiones: concrete,
+    };
+  });
 
   const outPath = path.join(process.cwd(), 'archive', 'data', 'p004p_march_orders.json');
   fs.writeFileSync(outPath, JSON.stringify(normalized, null, 2), 'utf-8');